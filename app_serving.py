@@ -0,0 +1,309 @@
+# Import Dependencies
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+import flask
+
+from request_tracing import metrics, current_trace, RequestTrace, \
+    SamplingProfiler, REQUEST_METRIC, REQUEST_COUNT_METRIC
+
+# Types worth gzipping (images and the like are already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json",
+                      "image/svg+xml")
+
+# Shown to clients turned away by a ConcurrencyLimiter
+OVERLOADED_MESSAGE = ("Quikipedia is busy right now, try again in a few "
+                      "seconds.")
+
+
+# Overload protection
+class ServerOverloaded(Exception):
+    """
+    Raised when a summarization can't start because too many are already
+    running; answered with 503 and a Retry-After header.
+    """
+
+    def __init__(self, retry_after):
+        """
+        In:
+            retry_after = Seconds the client should wait before retrying
+        """
+        super().__init__("Too many summaries in progress")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded semaphore capping how many summarizations run at once in a
+    process. Requests past the cap wait at most `queue_timeout` seconds for a
+    slot, then are turned away (see ServerOverloaded), so under a spike
+    latency stays bounded rather than every request slowing down together.
+    """
+
+    def __init__(self, max_concurrent, queue_timeout=0.5, retry_after=2):
+        """
+        In:
+            max_concurrent = Maximum number of summarizations running at once
+            queue_timeout = Seconds a request waits for a free slot
+            retry_after = Seconds overloaded clients are told to wait
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """
+        Out:
+            Takes a slot, waiting up to queue_timeout seconds for one; raises
+                ServerOverloaded if none frees up
+        """
+        if not self.semaphore.acquire(timeout=self.queue_timeout):
+            with self.lock:
+                self.rejected += 1
+            raise ServerOverloaded(self.retry_after)
+
+        with self.lock:
+            self.active += 1
+            self.admitted += 1
+
+    def release(self):
+        """
+        Out:
+            Frees a slot taken by acquire
+        """
+        with self.lock:
+            self.active -= 1
+        self.semaphore.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the slot count, slots in use, and the number of
+                summarizations admitted and turned away
+        """
+        with self.lock:
+            return {"max_concurrent": self.max_concurrent,
+                    "active": self.active, "admitted": self.admitted,
+                    "rejected": self.rejected}
+
+
+def make_overloaded_response(error):
+    """
+    In:
+        error = ServerOverloaded raised while handling the request
+
+    Out:
+        503 JSON response with a Retry-After header
+    """
+    response = flask.jsonify({"error": OVERLOADED_MESSAGE})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+# Static files
+class StaticAsset:
+    """
+    File read into memory once, with its ETag and (for text types) a gzipped
+    copy of its contents.
+    """
+
+    def __init__(self, filename):
+        """
+        In:
+            filename = File to read
+        """
+        self.filename = filename
+        self.mimetype = mimetypes.guess_type(filename)[0] or \
+            "application/octet-stream"
+        self.load()
+
+    def load(self):
+        """
+        Out:
+            (Re)reads the file, its modification time, ETag and gzipped copy
+        """
+        with open(self.filename, "rb") as assetfile:
+            self.modified = os.fstat(assetfile.fileno()).st_mtime
+            self.body = assetfile.read()
+
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.gzip_body = None
+        if self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if len(gzip_body) < len(self.body):
+                self.gzip_body = gzip_body
+
+
+class StaticAssets:
+    """
+    Files served from memory rather than read from disk on every request,
+    gzipped when the client accepts it, and answered with 304 Not Modified
+    when the client already has the current version (ETag / If-None-Match).
+    """
+
+    def __init__(self, root, filenames, max_age=0, check_modified=False):
+        """
+        In:
+            root = Directory the files are in
+            filenames = Files (paths relative to root, e.g. "static/js/a.js")
+                to serve
+            max_age = Seconds clients may use their copy before checking it
+                is still current (0 to always check)
+            check_modified = Re-read files changed on disk since they were
+                read (for development)
+        """
+        self.max_age = max_age
+        self.check_modified = check_modified
+        self.assets = {filename.replace(os.sep, "/"):
+                       StaticAsset(os.path.join(root, filename))
+                       for filename in filenames}
+
+    @classmethod
+    def from_directory(cls, root, directories, filenames=(), **kwargs):
+        """
+        In:
+            root = Directory the files are in
+            directories = Directories (relative to root) to serve every file
+                under
+            filenames = Further files (relative to root) to serve
+            kwargs = Options for StaticAssets (max_age, check_modified)
+
+        Out:
+            StaticAssets serving the files
+        """
+        filenames = list(filenames)
+        for directory in directories:
+            for dirpath, _, dir_filenames in os.walk(os.path.join(root,
+                                                                  directory)):
+                filenames.extend(
+                    os.path.relpath(os.path.join(dirpath, filename), root)
+                    for filename in sorted(dir_filenames))
+
+        return cls(root, filenames, **kwargs)
+
+    def make_response(self, filename):
+        """
+        In:
+            filename = Served file (relative to root, with "/" separators)
+
+        Out:
+            Response for the current request: the file (gzipped if the client
+                accepts it), 304 if the client's copy is current, or 404
+        """
+        asset = self.assets.get(filename)
+        if asset is None:
+            flask.abort(404)
+        if self.check_modified and \
+                os.path.getmtime(asset.filename) != asset.modified:
+            asset.load()
+
+        request = flask.request
+        if asset.gzip_body is not None and \
+                "gzip" in request.accept_encodings:
+            response = flask.Response(asset.gzip_body,
+                                      mimetype=asset.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+            response.set_etag(asset.etag + "-gzip")
+        else:
+            response = flask.Response(asset.body, mimetype=asset.mimetype)
+            response.set_etag(asset.etag)
+        if asset.gzip_body is not None:
+            response.vary.add("Accept-Encoding")
+
+        response.cache_control.public = True
+        if self.max_age:
+            response.cache_control.max_age = self.max_age
+        else:
+            response.cache_control.no_cache = True
+
+        return response.make_conditional(request)
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of files served and their total bytes
+                held in memory
+        """
+        return {"files": len(self.assets),
+                "bytes": sum(len(asset.body) + len(asset.gzip_body or b"")
+                             for asset in self.assets.values())}
+
+
+# Request tracing
+def install_request_tracing(app, server_timing=False, profile_directory=None):
+    """
+    In:
+        app = Flask app
+        server_timing = Add a Server-Timing header with each stage's time to
+            (non streamed) responses
+        profile_directory = Directory to write sampling profiles of requests
+            asking for one (with a "profile=1" query parameter) to; None to
+            not allow profiling
+
+    Out:
+        Traces every request: its stages are timed (see timed_stage), and its
+            latency and status recorded in `metrics` once the response closes
+            (streamed responses included)
+    """
+    def start_trace():
+        flask.g.request_started = time.perf_counter()
+        current_trace.set(RequestTrace())
+
+        flask.g.profiler = None
+        if profile_directory is not None and \
+                flask.request.args.get("profile") == "1":
+            flask.g.profiler = SamplingProfiler()
+            flask.g.profiler.start()
+
+    def finish_trace(response):
+        trace = current_trace.get()
+        started = flask.g.get("request_started", time.perf_counter())
+        labels = (("endpoint", flask.request.endpoint or "none"),)
+        status = response.status_code
+
+        if server_timing and trace is not None and not response.is_streamed:
+            response.headers["Server-Timing"] = trace.get_server_timing(
+                time.perf_counter() - started)
+
+        profiler = flask.g.get("profiler")
+        profile_filename = None
+        if profiler is not None:
+            profile_filename = os.path.join(
+                profile_directory, "%s-%d-%d.folded" % (
+                    labels[0][1], os.getpid(), time.time_ns()))
+            response.headers["X-Profile"] = os.path.basename(profile_filename)
+
+        def close_trace():
+            metrics.observe(REQUEST_METRIC, labels,
+                            time.perf_counter() - started)
+            metrics.increment(REQUEST_COUNT_METRIC,
+                              labels + (("status", status),))
+            current_trace.set(None)
+            if profiler is not None:
+                profiler.stop()
+                os.makedirs(profile_directory, exist_ok=True)
+                profiler.write_folded(profile_filename)
+
+        response.call_on_close(close_trace)
+        return response
+
+    app.before_request(start_trace)
+    app.after_request(finish_trace)
@@ -0,0 +1,126 @@
+# Import Dependencies
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from wikipedia_page_cleaning import clean_wiki_page
+from wiki_summarization import get_article_features, \
+    summarize_article_features, get_model_version
+from summary_cache import make_summary_key
+from wiki_fetch import format_topic
+
+
+def summarize_topics(topics, fetch_article, summary_cache=None,
+                     batch_size=50, max_workers=10,
+                     resolve_topic=format_topic):
+    """
+    In:
+        topics = List of topics (as entered by users) to summarize
+        fetch_article = Function taking a formatted topic and returning a
+            (wiki_topic, raw_text) tuple, following redirects (e.g.
+            WikiClient.fetch_article)
+        summary_cache = SummaryCache to read / store summaries in; None to
+            always summarize
+        batch_size = Maximum number of articles classified by a single
+            model.predict call
+        max_workers = Number of articles fetched concurrently
+        resolve_topic = Function taking a topic as entered and returning it
+            formatted for fetch_article (e.g. resolved with a title index)
+
+    Out:
+        Generator of result dictionaries, one per topic, in the order they
+            finish (not the order of topics):
+                topic = Topic as requested
+                wiki_topic = Wikipedia topic summarized (after redirects)
+                summary = Summary HTML
+                    OR
+                error = Why the topic couldn't be summarized
+
+        Articles are fetched concurrently; as they arrive they are cleaned and
+            featurized, and every batch_size articles are classified together
+            and their results yielded
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        resolved_topics = [(topic, resolve_topic(topic)) for topic in topics]
+        futures = {executor.submit(fetch_article, resolved): (topic, resolved)
+                   for topic, resolved in resolved_topics}
+        batch = []
+
+        for future in as_completed(futures):
+            topic, resolved = futures[future]
+            try:
+                wiki_topic, raw_text = future.result()
+            except Exception as error:
+                yield make_error_result(topic, resolved, error)
+                continue
+
+            summary_key = None
+            if summary_cache is not None:
+                summary_key = make_summary_key(wiki_topic, raw_text,
+                                               get_model_version())
+                summary = summary_cache.get(summary_key)
+                if summary is not None:
+                    yield {"topic": topic, "wiki_topic": wiki_topic,
+                           "summary": summary}
+                    continue
+
+            try:
+                article_features = get_article_features(
+                    clean_wiki_page(raw_text), wiki_topic)
+                if len(article_features[0]) == 0:
+                    raise ValueError("Article has no sentences")
+            except Exception as error:
+                yield make_error_result(topic, wiki_topic, error)
+                continue
+
+            batch.append((topic, wiki_topic, summary_key, article_features))
+            if len(batch) >= batch_size:
+                yield from summarize_batch(batch, summary_cache)
+                batch = []
+
+        if batch:
+            yield from summarize_batch(batch, summary_cache)
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_batch(batch, summary_cache=None):
+    """
+    In:
+        batch = List of (topic, wiki_topic, summary_key, article_features)
+            tuples
+        summary_cache = SummaryCache to store the summaries in, or None
+
+    Out:
+        List of result dictionaries (see summarize_topics); all the articles
+            are classified with a single model.predict call
+    """
+    try:
+        summaries = summarize_article_features(
+            [article_features for _, _, _, article_features in batch])
+    except Exception as error:
+        return [make_error_result(topic, wiki_topic, error)
+                for topic, wiki_topic, _, _ in batch]
+
+    results = []
+    for (topic, wiki_topic, summary_key, _), summary in zip(batch, summaries):
+        if summary_cache is not None:
+            summary_cache.put(summary_key, summary)
+        results.append({"topic": topic, "wiki_topic": wiki_topic,
+                        "summary": summary})
+
+    return results
+
+
+def make_error_result(topic, wiki_topic, error):
+    """
+    In:
+        topic = Topic as requested
+        wiki_topic = Wikipedia topic (after any redirects)
+        error = Exception raised while fetching / summarizing the topic
+
+    Out:
+        Result dictionary for a topic that couldn't be summarized
+    """
+    return {"topic": topic, "wiki_topic": wiki_topic,
+            "error": "%s: %s" % (type(error).__name__, error)}
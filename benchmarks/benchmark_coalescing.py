@@ -0,0 +1,133 @@
+# Import Dependencies
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from summary_cache import SummaryCache
+
+from benchmark_pipeline import load_corpus, use_model
+from make_fixture_corpus import FIXTURE_CORPUS
+
+
+def count_calls(module, name, counts):
+    """
+    In:
+        module = Module whose function to count calls of
+        name = Function name
+        counts = Dictionary to count the calls in, by name
+
+    Out:
+        Replaces the function with one counting its calls
+    """
+    function = getattr(module, name)
+    lock = threading.Lock()
+
+    def counted(*args, **kwargs):
+        with lock:
+            counts[name] = counts.get(name, 0) + 1
+        return function(*args, **kwargs)
+
+    setattr(module, name, counted)
+
+
+def read_stream(client, topic):
+    """
+    In:
+        client = Flask test client
+        topic = Topic to stream the summary of
+
+    Out:
+        The summary of the stream's "done" event, or its "error"
+    """
+    body = client.get("/summarize/stream",
+                      query_string={"topic": topic}).get_data(as_text=True)
+    for event in body.split("\n\n"):
+        lines = event.split("\n")
+        if lines[0] in ("event: done", "event: error"):
+            data = json.loads(lines[1][len("data: "):])
+            return data.get("summary", data.get("error"))
+
+
+def run_benchmark(dump_path=FIXTURE_CORPUS, request_counts=(1, 8, 32),
+                  model_filename="prediction_model.pkl"):
+    """
+    In:
+        dump_path = Wikipedia XML dump to take the article from (its largest)
+        request_counts = Numbers of concurrent requests to time
+        model_filename = Model pack to use (see use_model)
+
+    Out:
+        Prints, for each number of concurrent requests for one article with
+            a cold summary cache (half of them /summarize/stream, half
+            /summarize), how many summarizations ran and how long the
+            requests took, checking they all got the same summary
+    """
+    print("Model: %s" % use_model(os.path.abspath(model_filename)))
+    article = max(load_corpus(dump_path), key=lambda article: article["bytes"])
+    print("Article: %s (%d bytes)\n" % (article["title"], article["bytes"]))
+
+    # The app's caches and lock files go in a scratch directory
+    os.chdir(tempfile.mkdtemp())
+    import summarize_app
+
+    summarize_app.fetch_article = lambda topic: (article["topic"],
+                                                 article["wikitext"])
+    counts = {}
+    count_calls(summarize_app, "summarize_article", counts)
+    count_calls(summarize_app, "summarize_article_by_section", counts)
+    app = summarize_app.create_app()
+
+    print("%-10s %15s %10s" % ("requests", "summarizations", "time (s)"))
+    for request_count in request_counts:
+        summarize_app.summary_cache = SummaryCache()
+        counts.clear()
+        summaries = []
+
+        def request(streamed):
+            client = app.test_client()
+            if streamed:
+                summaries.append(read_stream(client, article["topic"]))
+            else:
+                summaries.append(client.post(
+                    "/summarize", json={"topic": article["topic"]}
+                ).get_json()["summary"])
+
+        threads = [threading.Thread(target=request, args=(i % 2 == 0,))
+                   for i in range(request_count)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        assert len(summaries) == request_count and \
+            len(set(summaries)) == 1, "Requests got different summaries"
+        print("%-10d %15d %10.3f" % (request_count, sum(counts.values()),
+                                     seconds))
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python benchmarks/benchmark_coalescing.py
+    parser = argparse.ArgumentParser(
+        description="Check concurrent requests for one article summarize "
+                    "it once, and time them")
+    parser.add_argument("--dump", default=FIXTURE_CORPUS,
+                        help="Wikipedia XML dump to take the article from")
+    parser.add_argument("--requests", type=int, nargs="+",
+                        default=[1, 8, 32],
+                        help="Numbers of concurrent requests")
+    parser.add_argument("--model", default="prediction_model.pkl",
+                        help="Model pack to use (a stand-in forest is "
+                             "trained if it doesn't exist)")
+    args = parser.parse_args()
+
+    run_benchmark(args.dump, args.requests, args.model)
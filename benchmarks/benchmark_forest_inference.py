@@ -0,0 +1,90 @@
+# Import Dependencies
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_forest import CompiledForest
+from model_registry import load_model_pack
+
+
+def load_or_train_forest(model_filename="prediction_model.pkl", seed=0):
+    """
+    In:
+        model_filename = Model pack to benchmark, if it exists
+        seed = Random seed for the stand-in forest
+
+    Out:
+        forest = The model pack's forest, or (if there is no model pack) a
+            stand-in forest trained like the Modeling notebook's on
+            synthetic sentence data
+    """
+    if os.path.exists(model_filename):
+        return load_model_pack(model_filename)["model"]
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.RandomState(seed)
+    X = rng.rand(100000, 30) * 100
+    y = ((X[:, 3] < 30) & (X[:, 27] > 20)) | (rng.rand(len(X)) < 0.1)
+    return RandomForestClassifier(min_samples_leaf=30, random_state=seed,
+                                  n_jobs=-1).fit(X, y).set_params(n_jobs=None)
+
+
+def time_per_call(function, X, repeat):
+    """
+    In:
+        function = Prediction function to time
+        X = Samples to predict
+        repeat = Number of calls
+
+    Out:
+        result = Function's return value
+        seconds = Median seconds per call
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(X)
+        times.append(time.perf_counter() - start)
+
+    return result, float(np.median(times))
+
+
+def run_benchmark(article_sizes=(10, 50, 200, 300, 1000, 5000), repeat=20):
+    """
+    In:
+        article_sizes = Numbers of sentences (rows) per prediction call
+        repeat = Number of calls timed per size
+
+    Out:
+        Prints the median latency of the scikit-learn forest's and the
+            compiled forest's predict for each article size, checking their
+            predictions are identical
+    """
+    forest = load_or_train_forest()
+    compiled = CompiledForest(forest)
+    rng = np.random.RandomState(1)
+
+    print("%d trees, %d nodes, max depth %d"
+          % (len(compiled.roots), len(compiled.feature), compiled.max_depth))
+    print("%10s %14s %14s %8s"
+          % ("sentences", "sklearn_ms", "compiled_ms", "speedup"))
+    for article_size in article_sizes:
+        X = rng.rand(article_size, compiled.n_features_in_) * 100
+
+        expected, sklearn_seconds = time_per_call(forest.predict, X, repeat)
+        predictions, compiled_seconds = time_per_call(compiled.predict, X,
+                                                      repeat)
+        assert np.array_equal(predictions, expected)
+
+        print("%10d %14.3f %14.3f %7.1fx"
+              % (article_size, sklearn_seconds * 1000,
+                 compiled_seconds * 1000, sklearn_seconds / compiled_seconds))
+
+
+if __name__ == "__main__":
+    run_benchmark()
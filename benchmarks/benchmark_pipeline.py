@@ -0,0 +1,442 @@
+# Import Dependencies
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from model_registry import save_model_pack
+from summary_cache import get_file_hash
+from wiki_dump import iter_dump_pages
+from wiki_fetch import format_topic
+from wiki_summarization import model_registry, SUMMARY_MODEL, \
+    FEATURE_COLUMNS, PARAGRAPH_NUMBER_COLUMN, convert_article_to_data, \
+    summarize_article, build_summary, get_article_model, \
+    sentence_feature_cache
+from wiki_summary_html import add_html_tages_to_summary
+from wikipedia_page_cleaning import clean_wiki_page
+
+from benchmark_forest_inference import load_or_train_forest
+from make_fixture_corpus import FIXTURE_CORPUS
+
+STAGES = ["clean", "featurize", "predict", "summarize", "html"]
+
+# Size classes by raw article bytes: (name, upper bound)
+SIZE_CLASSES = [("stub", 8 * 2 ** 10), ("medium", 100 * 2 ** 10),
+                ("featured", 300 * 2 ** 10), ("giant", float("inf"))]
+
+
+# Corpus
+def get_size_class(raw_bytes):
+    """
+    In:
+        raw_bytes = Size of the raw article wikitext in bytes
+
+    Out:
+        Name of the article's size class (see SIZE_CLASSES)
+    """
+    for size_class, upper_bound in SIZE_CLASSES:
+        if raw_bytes < upper_bound:
+            return size_class
+
+
+def load_corpus(dump_path=FIXTURE_CORPUS, limit=None):
+    """
+    In:
+        dump_path = Wikipedia XML dump to benchmark on (bz2 compressed or
+            plain); the generated fixture corpus by default (see
+            make_fixture_corpus.py)
+        limit = Most articles to take (None for all)
+
+    Out:
+        articles = List of dictionaries of each non-empty article's "title",
+            "topic" (formatted for the API / url), "wikitext", size in
+            "bytes" and "size_class"
+    """
+    articles = []
+    for title, wikitext in iter_dump_pages(dump_path):
+        if not wikitext.strip():
+            continue
+        raw_bytes = len(wikitext.encode("UTF-8"))
+        articles.append({"title": title, "topic": format_topic(title),
+                         "wikitext": wikitext, "bytes": raw_bytes,
+                         "size_class": get_size_class(raw_bytes)})
+        if len(articles) == limit:
+            break
+
+    return articles
+
+
+def use_model(model_filename="prediction_model.pkl"):
+    """
+    In:
+        model_filename = Model pack to benchmark with, if it exists
+
+    Out:
+        Registers the model pack as the summarization model (or, if it
+            doesn't exist, a stand-in forest; see load_or_train_forest) and
+            returns a description of it
+    """
+    if os.path.exists(model_filename):
+        model_registry.register(SUMMARY_MODEL, model_filename)
+        return model_filename
+
+    stand_in_filename = os.path.join(tempfile.mkdtemp(), "stand_in.pkl")
+    save_model_pack({"model": load_or_train_forest(model_filename)},
+                    stand_in_filename)
+    model_registry.register(SUMMARY_MODEL, stand_in_filename)
+    return "stand-in forest"
+
+
+# Running the pipeline
+def run_pipeline(article, on_stage):
+    """
+    In:
+        article = Corpus article (see load_corpus)
+        on_stage = Function called as on_stage(stage, run), where run() runs
+            the stage and returns its result; on_stage returns that result
+
+    Out:
+        Runs every stage of the article's summarization in turn: cleaning
+            the wikitext, converting it to sentence data, classifying the
+            sentences, the whole summarize_article, and adding the summary's
+            HTML tags (the model stages are skipped if there are no
+            sentences). Returns a dictionary of each stage's input bytes
+    """
+    wikitext, topic = article["wikitext"], article["topic"]
+    cleaned = on_stage("clean", lambda: clean_wiki_page(wikitext))
+    sentence_data = on_stage(
+        "featurize", lambda: convert_article_to_data(cleaned, topic))
+
+    cleaned_bytes = len(cleaned.encode("UTF-8"))
+    input_bytes = {"clean": article["bytes"], "featurize": cleaned_bytes}
+    if not len(sentence_data):
+        return input_bytes
+
+    X = sentence_data[FEATURE_COLUMNS].to_numpy()
+    model = get_article_model()
+    predictions = on_stage("predict", lambda: model.predict(X))
+    on_stage("summarize", lambda: summarize_article(cleaned, topic))
+
+    summary = build_summary(sentence_data["sentence"].tolist(),
+                            X[:, PARAGRAPH_NUMBER_COLUMN], predictions)
+    on_stage("html", lambda: add_html_tages_to_summary(summary))
+
+    input_bytes.update({"predict": cleaned_bytes,
+                        "summarize": cleaned_bytes,
+                        "html": len(summary.encode("UTF-8"))})
+    return input_bytes
+
+
+def time_pipeline(articles, repeat=3):
+    """
+    In:
+        articles = Corpus articles (see load_corpus)
+        repeat = Number of timed runs per article
+
+    Out:
+        timings = List of (stage, size class, seconds, input bytes) tuples,
+            one per stage run
+    """
+    timings = []
+    for article in articles:
+        for _ in range(repeat):
+            seconds = {}
+
+            def on_stage(stage, run):
+                # Every stage scores its sentences from scratch
+                sentence_feature_cache.clear()
+                start = time.perf_counter()
+                result = run()
+                seconds[stage] = time.perf_counter() - start
+                return result
+
+            input_bytes = run_pipeline(article, on_stage)
+            timings.extend((stage, article["size_class"], seconds[stage],
+                            input_bytes[stage]) for stage in seconds)
+
+    return timings
+
+
+def measure_memory(articles):
+    """
+    In:
+        articles = Corpus articles (see load_corpus)
+
+    Out:
+        Dictionary of each stage's peak memory allocated (bytes above what
+            was allocated when it started, traced by tracemalloc) over all
+            the articles, overall and per size class
+    """
+    peaks = {}
+
+    def on_stage(stage, run):
+        sentence_feature_cache.clear()
+        tracemalloc.reset_peak()
+        started = tracemalloc.get_traced_memory()[0]
+        result = run()
+        peak = tracemalloc.get_traced_memory()[1] - started
+        for key in (stage, (stage, size_class)):
+            peaks[key] = max(peaks.get(key, 0), peak)
+        return result
+
+    tracemalloc.start()
+    try:
+        for article in articles:
+            size_class = article["size_class"]
+            run_pipeline(article, on_stage)
+    finally:
+        tracemalloc.stop()
+
+    return peaks
+
+
+# Results
+def summarize_timings(timings):
+    """
+    In:
+        timings = List of (seconds, input bytes) tuples of a stage's runs
+
+    Out:
+        Dictionary of the runs' count, total seconds, throughput (articles
+            and input MB per second) and mean / p50 / p99 latency in
+            milliseconds
+    """
+    seconds = np.array([run_seconds for run_seconds, _ in timings])
+    total_seconds = float(seconds.sum())
+    total_mb = sum(run_bytes for _, run_bytes in timings) / 2 ** 20
+    p50, p99 = np.percentile(seconds, [50, 99]) * 1000
+
+    return {"runs": len(timings), "total_seconds": total_seconds,
+            "articles_per_second": len(timings) / total_seconds,
+            "mb_per_second": total_mb / total_seconds,
+            "mean_ms": float(seconds.mean() * 1000),
+            "p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+def get_commit():
+    """
+    Out:
+        Git commit the repository is at (with "-dirty" if it has uncommitted
+            changes), or None outside a git checkout
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain",
+                                "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True,
+                               check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit + "-dirty" if dirty else commit
+
+
+def run_benchmark(dump_path=FIXTURE_CORPUS, repeat=3, limit=None,
+                  model_filename="prediction_model.pkl", memory=True):
+    """
+    In:
+        dump_path = Wikipedia XML dump to benchmark on
+        repeat = Number of timed runs per article
+        limit = Most articles to take (None for all)
+        model_filename = Model pack to benchmark with (a stand-in forest is
+            trained if it doesn't exist)
+        memory = Whether to also measure each stage's peak memory (in an
+            extra, untimed pass, as tracing allocations slows it down)
+
+    Out:
+        results = JSON serializable dictionary of the run's "metadata", each
+            stage's timings overall ("stages") and per size class
+            ("size_classes"), each stage's "peak_memory_bytes", and the
+            process's "max_rss_mb"
+    """
+    model = use_model(model_filename)
+    articles = load_corpus(dump_path, limit)
+
+    # Untimed first pass, so loading the model, tokenizer and lexicon isn't
+    # counted
+    run_pipeline(articles[0], lambda stage, run: run())
+    timings = time_pipeline(articles, repeat)
+
+    stages = {}
+    size_classes = {}
+    for stage in STAGES:
+        stage_timings = [(seconds, input_bytes) for timing_stage, _, seconds,
+                         input_bytes in timings if timing_stage == stage]
+        if stage_timings:
+            stages[stage] = summarize_timings(stage_timings)
+        for size_class, _ in SIZE_CLASSES:
+            class_timings = [(seconds, input_bytes)
+                             for timing_stage, timing_class, seconds,
+                             input_bytes in timings
+                             if timing_stage == stage and
+                             timing_class == size_class]
+            if class_timings:
+                size_classes.setdefault(size_class, {})[stage] = \
+                    summarize_timings(class_timings)
+
+    results = {
+        "metadata": {
+            "commit": get_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": os.path.basename(dump_path),
+            "corpus_hash": get_file_hash(dump_path),
+            "articles": len(articles),
+            "articles_per_size_class": {
+                size_class: sum(article["size_class"] == size_class
+                                for article in articles)
+                for size_class, _ in SIZE_CLASSES},
+            "corpus_mb": sum(article["bytes"] for article in articles)
+            / 2 ** 20,
+            "model": model,
+            "repeat": repeat},
+        "stages": stages,
+        "size_classes": size_classes}
+
+    if memory:
+        peaks = measure_memory(articles)
+        results["peak_memory_bytes"] = {
+            stage: {"all": peaks[stage],
+                    **{size_class: peaks[stage, size_class]
+                       for size_class, _ in SIZE_CLASSES
+                       if (stage, size_class) in peaks}}
+            for stage in STAGES if stage in peaks}
+
+    results["max_rss_mb"] = \
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def print_results(results):
+    """
+    In:
+        results = Benchmark results (see run_benchmark)
+
+    Out:
+        Prints a table of each stage's throughput, latency and peak memory,
+            overall and per size class
+    """
+    metadata = results["metadata"]
+    print("%d articles (%.1f MB, %s), %d runs each, model: %s" % (
+        metadata["articles"], metadata["corpus_mb"],
+        ", ".join("%d %s" % (count, size_class) for size_class, count
+                  in metadata["articles_per_size_class"].items() if count),
+        metadata["repeat"], metadata["model"]))
+    print("%-10s %-9s %10s %8s %10s %10s %10s" % (
+        "stage", "size", "articles/s", "MB/s", "p50_ms", "p99_ms",
+        "peak_MB"))
+
+    peaks = results.get("peak_memory_bytes", {})
+    for stage in results["stages"]:
+        rows = [("all", results["stages"][stage])]
+        rows += [(size_class, stages[stage]) for size_class, stages
+                 in results["size_classes"].items() if stage in stages]
+        for size_class, stats in rows:
+            peak = peaks.get(stage, {}).get(size_class)
+            print("%-10s %-9s %10.1f %8.2f %10.2f %10.2f %10s" % (
+                stage, size_class, stats["articles_per_second"],
+                stats["mb_per_second"], stats["p50_ms"], stats["p99_ms"],
+                "-" if peak is None else "%.1f" % (peak / 2 ** 20)))
+    print("max RSS: %.0f MB" % results["max_rss_mb"])
+
+
+def compare_results(results, baseline, threshold=0.1):
+    """
+    In:
+        results = Benchmark results (see run_benchmark)
+        baseline = Benchmark results to compare against (e.g. from an
+            earlier commit)
+        threshold = Fraction slower (p50 latency) a stage may be before it
+            counts as a regression
+
+    Out:
+        regressions = List of the stages that got slower than the threshold
+            allows; prints each stage's p50 latency and peak memory against
+            the baseline's
+    """
+    print("compared with %s:" % (baseline["metadata"].get("commit") or
+                                 "baseline"))
+    if baseline["metadata"].get("corpus_hash") != \
+            results["metadata"]["corpus_hash"]:
+        print("  (different corpus, so the numbers may not be comparable)")
+
+    regressions = []
+    for stage, stats in results["stages"].items():
+        baseline_stats = baseline["stages"].get(stage)
+        if baseline_stats is None:
+            continue
+
+        ratio = stats["p50_ms"] / baseline_stats["p50_ms"]
+        line = "  %-10s p50 %8.2f -> %8.2f ms (%+.0f%%)" % (
+            stage, baseline_stats["p50_ms"], stats["p50_ms"],
+            (ratio - 1) * 100)
+
+        peak = results.get("peak_memory_bytes", {}).get(stage)
+        baseline_peak = baseline.get("peak_memory_bytes", {}).get(stage)
+        if peak and baseline_peak:
+            line += "  peak %.1f -> %.1f MB" % (baseline_peak["all"] / 2 ** 20,
+                                                peak["all"] / 2 ** 20)
+
+        if ratio > 1 + threshold:
+            line += "  REGRESSION"
+            regressions.append(stage)
+        print(line)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python benchmarks/benchmark_pipeline.py --output before.json
+    #     (change something)
+    #     python benchmarks/benchmark_pipeline.py --compare before.json
+    parser = argparse.ArgumentParser(
+        description="Benchmark cleaning, featurizing, classifying and "
+                    "summarizing a corpus of wikitext articles")
+    parser.add_argument("--dump", default=FIXTURE_CORPUS,
+                        help="Wikipedia XML dump to benchmark on")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per article")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Most articles to take")
+    parser.add_argument("--model", default="prediction_model.pkl",
+                        help="Model pack to use (a stand-in forest is "
+                             "trained if it doesn't exist)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip measuring peak memory")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare",
+                        help="JSON results file to compare against; exits "
+                             "with status 1 if a stage regressed")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Fraction slower a stage may get before it "
+                             "counts as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.dump, args.repeat, args.limit, args.model,
+                            not args.no_memory)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare_results(results, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,115 @@
+# Import Dependencies
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from wiki_summarization import get_article_features, sentence_feature_cache
+from wikipedia_page_cleaning import clean_wiki_page
+
+from benchmark_pipeline import load_corpus, SIZE_CLASSES
+from make_fixture_corpus import FIXTURE_CORPUS
+
+
+def edit_article(wikitext, title):
+    """
+    In:
+        wikitext = Raw article wikitext
+        title = Article title
+
+    Out:
+        The wikitext with a small edit, like most revisions of a popular
+            article: a sentence added to the end of the lead's first
+            paragraph, and a word changed halfway through
+    """
+    lead_end = wikitext.find("\n\n")
+    if lead_end == -1:
+        lead_end = len(wikitext)
+    wikitext = wikitext[:lead_end] + " The %s was recently edited." % title + \
+        wikitext[lead_end:]
+
+    middle = wikitext.find(" the ", len(wikitext) // 2)
+    if middle != -1:
+        wikitext = wikitext[:middle] + " a " + wikitext[middle + 5:]
+
+    return wikitext
+
+
+def time_features(article, topic):
+    """
+    In:
+        article = Cleaned article
+        topic = Article topic
+
+    Out:
+        seconds = Time get_article_features took
+        features = Its feature array
+    """
+    start = time.perf_counter()
+    features = get_article_features(article, topic)[1]
+    return time.perf_counter() - start, features
+
+
+def run_benchmark(dump_path=FIXTURE_CORPUS):
+    """
+    In:
+        dump_path = Wikipedia XML dump to benchmark on
+
+    Out:
+        Prints, per size class, the time featurizing each article's edited
+            version takes from scratch and after featurizing the original
+            (so only its changed sentences are scored), checking both give
+            identical features
+    """
+    totals = {}
+    for article in load_corpus(dump_path):
+        topic = article["topic"]
+        original = clean_wiki_page(article["wikitext"])
+        edited = clean_wiki_page(edit_article(article["wikitext"],
+                                              article["title"]))
+
+        sentence_feature_cache.clear()
+        cold_seconds, expected = time_features(edited, topic)
+
+        sentence_feature_cache.clear()
+        get_article_features(original, topic)
+        misses = sentence_feature_cache.stats()["misses"]
+        warm_seconds, features = time_features(edited, topic)
+        assert np.array_equal(features, expected), \
+            "Features differ for %s" % article["title"]
+
+        total = totals.setdefault(article["size_class"], [0, 0, 0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += len(features)
+        total[2] += sentence_feature_cache.stats()["misses"] - misses
+        total[3] += cold_seconds
+        total[4] += warm_seconds
+
+    print("Edited articles featurize identically with the cache\n")
+    print("%-10s %8s %10s %10s %12s %12s %8s" % (
+        "size", "articles", "sentences", "rescored", "scratch (s)",
+        "cached (s)", "speedup"))
+    for size_class, _ in SIZE_CLASSES:
+        if size_class in totals:
+            articles, sentences, rescored, cold, warm = totals[size_class]
+            print("%-10s %8d %10d %10d %12.4f %12.4f %7.1fx" % (
+                size_class, articles, sentences, rescored, cold, warm,
+                cold / warm))
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python benchmarks/benchmark_sentence_cache.py
+    parser = argparse.ArgumentParser(
+        description="Time featurizing edited articles with and without the "
+                    "sentence feature cache")
+    parser.add_argument("--dump", default=FIXTURE_CORPUS,
+                        help="Wikipedia XML dump to benchmark on")
+    args = parser.parse_args()
+
+    run_benchmark(args.dump)
@@ -0,0 +1,98 @@
+# Import Dependencies
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentence_labeling import select_sentences_from_english, \
+    select_sentences_from_english_reference
+
+
+def generate_article_pair(english_sentences, seed=0, vocabulary_size=5000):
+    """
+    In:
+        english_sentences = Number of sentences in the english article
+        seed = Random seed
+        vocabulary_size = Number of distinct words (made of random
+            syllables, and drawn with a Zipf-like distribution, as in real
+            text)
+
+    Out:
+        english = List of english sentences
+        simple = List of simple sentences (about one per five english
+            sentences): mostly shortened, reworded copies of english
+            sentences, the rest unrelated
+    """
+    rng = random.Random(seed)
+    syllables = [consonant + vowel for consonant in "bcdfghklmnprstvw"
+                 for vowel in ["a", "e", "i", "o", "u", "ou", "ea"]]
+    vocabulary = sorted({"".join(rng.choices(syllables,
+                                             k=rng.choice((1, 1, 2, 2, 3, 4))))
+                         for _ in range(vocabulary_size)})
+    rng.shuffle(vocabulary)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def make_sentence(length):
+        words = rng.choices(vocabulary, weights, k=length)
+        return " ".join(words).capitalize() + "."
+
+    english = [make_sentence(rng.randint(8, 35))
+               for _ in range(english_sentences)]
+
+    simple = []
+    for _ in range(max(1, english_sentences // 5)):
+        if rng.random() < 0.7:
+            words = rng.choice(english)[:-1].split()
+            words = [word if rng.random() < 0.7 else rng.choice(vocabulary)
+                     for word in words if rng.random() < 0.6]
+            simple.append(" ".join(words) + ".")
+        else:
+            simple.append(make_sentence(rng.randint(5, 20)))
+
+    return english, simple
+
+
+def time_function(function, *args):
+    """
+    In:
+        function = Function to time
+        args = Arguments to call it with
+
+    Out:
+        result = Function's return value
+        seconds = Seconds the call took
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(sentence_counts=(50, 200, 500, 1000)):
+    """
+    In:
+        sentence_counts = English article sizes (in sentences) to time
+
+    Out:
+        Prints the time the fuzzywuzzy scan and the indexed labeler take to
+            label each article, checking they select the same sentences
+    """
+    print("%10s %10s %12s %12s %8s"
+          % ("english", "simple", "reference_s", "indexed_s", "speedup"))
+    for english_sentences in sentence_counts:
+        english, simple = generate_article_pair(english_sentences)
+
+        expected, reference_seconds = time_function(
+            select_sentences_from_english_reference, english, simple)
+        selected, indexed_seconds = time_function(
+            select_sentences_from_english, english, simple)
+        assert selected == expected
+
+        print("%10d %10d %12.3f %12.3f %7.1fx"
+              % (len(english), len(simple), reference_seconds,
+                 indexed_seconds, reference_seconds / indexed_seconds))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,124 @@
+# Import Dependencies
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+FIXTURE_DUMP = os.path.join(REPO_DIR, "benchmarks", "fixtures",
+                            "sample_pages_articles.xml")
+
+# Run in a fresh interpreter, so every import and load is cold
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import wiki_summarization
+imported = time.perf_counter()
+
+model_filename = sys.argv[1]
+if model_filename:
+    wiki_summarization.model_registry.register(
+        wiki_summarization.SUMMARY_MODEL, model_filename)
+wiki_summarization.get_model()
+loaded = time.perf_counter()
+wiki_summarization.get_model_version()
+hashed = time.perf_counter()
+
+from wikipedia_page_cleaning import clean_wiki_page
+from wiki_dump import iter_dump_pages
+title, wikitext = next(iter_dump_pages(sys.argv[2]))
+article = clean_wiki_page(wikitext)
+summary_start = time.perf_counter()
+wiki_summarization.summarize_article(article, title.replace(" ", "_"))
+summarized = time.perf_counter()
+
+print(json.dumps({
+    "import_seconds": imported - start,
+    "model_load_seconds": loaded - imported,
+    "model_hash_seconds": hashed - loaded,
+    "first_summary_seconds": summarized - summary_start,
+    "max_rss_mb": __import__("resource").getrusage(
+        __import__("resource").RUSAGE_SELF).ru_maxrss / 1024,
+    "startup_timings": wiki_summarization.get_startup_timings()}))
+"""
+
+
+def measure_startup(model_filename=None):
+    """
+    In:
+        model_filename = Model pack file to load instead of the registered
+            one (e.g. a ".joblib" dump to load memory mapped); None for the
+            default
+
+    Out:
+        Dictionary of seconds taken to import wiki_summarization, load and
+            hash the model, and summarize a first article, in a fresh
+            interpreter run from the current directory
+    """
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [REPO_DIR] + [path for path in [environment.get("PYTHONPATH")]
+                      if path])
+
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT, model_filename or "",
+         FIXTURE_DUMP], env=environment, check=True, capture_output=True,
+        text=True).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    results["process_seconds"] = time.perf_counter() - start
+    return results
+
+
+def run_benchmark(repeat=3):
+    """
+    In:
+        repeat = Number of cold starts to measure per model format
+
+    Out:
+        results = Dictionary of each model format ("pickle", and "joblib
+            mmap" loaded from a joblib copy of the model) to its list of
+            measurements (see measure_startup)
+    """
+    from model_registry import load_model_pack, save_model_pack
+    from wiki_summarization import MODEL_FILENAME
+
+    results = {"pickle": [measure_startup() for _ in range(repeat)]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        joblib_filename = os.path.join(directory, "prediction_model.joblib")
+        save_model_pack(load_model_pack(MODEL_FILENAME), joblib_filename)
+        results["joblib mmap"] = [measure_startup(joblib_filename)
+                                  for _ in range(repeat)]
+
+    return results
+
+
+if __name__ == "__main__":
+    # Run from the directory holding prediction_model.pkl
+    parser = argparse.ArgumentParser(
+        description="Measure cold start (import, model load, first summary)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="Print the raw measurements as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        columns = ["import_seconds", "model_load_seconds",
+                   "model_hash_seconds", "first_summary_seconds",
+                   "process_seconds", "max_rss_mb"]
+        print("%-12s" % "model" + "".join("%22s" % column
+                                          for column in columns))
+        for model_format, measurements in results.items():
+            print("%-12s" % model_format + "".join(
+                "%22.3f" % min(measurement[column]
+                               for measurement in measurements)
+                for column in columns))
@@ -0,0 +1,151 @@
+# Import Dependencies
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from title_suggest import SuggestionIndex
+
+# Words synthetic titles are made of
+WORD_COUNT = 5000
+
+
+def generate_titles(count, seed=0):
+    """
+    In:
+        count = Number of titles to generate
+        seed = Random seed
+
+    Out:
+        List of (title, popularity) tuples: one to four word titles, with
+            heavy tailed (Pareto) popularities, like page views
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz")
+                     for _ in range(rng.randint(2, 10)))
+             for _ in range(WORD_COUNT)]
+    return [(" ".join(rng.choice(words)
+                      for _ in range(rng.randint(1, 4))).capitalize(),
+             rng.paretovariate(1.0)) for _ in range(count)]
+
+
+def generate_queries(titles, count, seed=1):
+    """
+    In:
+        titles = List of (title, popularity) tuples
+        count = Number of queries to generate
+        seed = Random seed
+
+    Out:
+        List of prefixes of titles, as typed one keystroke at a time (so
+            short prefixes, matching the most titles, are common)
+    """
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        title = rng.choice(titles)[0].lower()
+        queries.extend(title[:length]
+                       for length in range(1, min(len(title), 12) + 1))
+
+    return queries[:count]
+
+
+def time_lookups(suggest, queries):
+    """
+    In:
+        suggest = Function taking a query
+        queries = Queries to time it on
+
+    Out:
+        Sorted list of the seconds each lookup took
+    """
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        suggest(query)
+        timings.append(time.perf_counter() - start)
+
+    return sorted(timings)
+
+
+def print_timings(label, timings):
+    """
+    In:
+        label = Row label
+        timings = Sorted lookup times in seconds
+    """
+    print("%-10s %10.3f %10.3f %10.3f %12.0f" % (
+        label, timings[len(timings) // 2] * 1000,
+        timings[int(len(timings) * 0.99)] * 1000, timings[-1] * 1000,
+        len(timings) / sum(timings)))
+
+
+def run_benchmark(titles, query_count=50000, endpoint=False):
+    """
+    In:
+        titles = List of (title, popularity) tuples to index
+        query_count = Number of lookups to time
+        endpoint = Whether to also time the /suggest endpoint (through
+            Flask's test client, so request handling is included but not the
+            network)
+
+    Out:
+        Prints how long building and loading the index took, and the p50,
+            p99 and slowest lookup times (ms) and lookups per second
+    """
+    start = time.perf_counter()
+    index = SuggestionIndex.build(titles)
+    print("Built %d titles in %.2fs: %s"
+          % (len(index), time.perf_counter() - start, index.stats()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "suggestions.npz")
+        index.save(path)
+        start = time.perf_counter()
+        index = SuggestionIndex.load(path)
+        print("Loaded in %.3fs (%.1f MB file)" % (
+            time.perf_counter() - start, os.path.getsize(path) / 2 ** 20))
+
+    queries = generate_queries(titles, query_count)
+    print("\n%-10s %10s %10s %10s %12s"
+          % ("", "p50 (ms)", "p99 (ms)", "max (ms)", "lookups/s"))
+    print_timings("index", time_lookups(index.suggest, queries))
+
+    if endpoint:
+        import summarize_app
+        summarize_app.suggestion_index = index
+        client = summarize_app.create_app().test_client()
+        print_timings("/suggest", time_lookups(
+            lambda query: client.get("/suggest", query_string={"q": query}),
+            queries[:query_count // 10]))
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python benchmarks/benchmark_suggest.py
+    #     python benchmarks/benchmark_suggest.py --titles title_popularity.tsv
+    parser = argparse.ArgumentParser(
+        description="Benchmark autocomplete lookups")
+    parser.add_argument("--titles",
+                        help="Tab separated titles and popularities to index "
+                             "(default: synthetic titles)")
+    parser.add_argument("--count", type=int, default=1000000,
+                        help="Number of synthetic titles")
+    parser.add_argument("--queries", type=int, default=50000)
+    parser.add_argument("--endpoint", action="store_true",
+                        help="Also time the /suggest endpoint")
+    args = parser.parse_args()
+
+    if args.titles:
+        with open(args.titles, encoding="UTF-8") as title_file:
+            titles = [(title, float(views)) for title, _, views in
+                      (line.rstrip("\r\n").rpartition("\t")
+                       for line in title_file) if title.strip()]
+    else:
+        titles = generate_titles(args.count)
+
+    run_benchmark(titles, args.queries, args.endpoint)
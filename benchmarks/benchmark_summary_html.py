@@ -0,0 +1,89 @@
+# Import Dependencies
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wiki_summary_html import add_html_tages_to_summary, \
+    add_html_tages_to_summary_reference
+
+# Paragraph templates; each has 2 markup spans
+MARKUP_PARAGRAPHS = [
+    "The '''topic %d''' is a ''thing'' found in many places.",
+    "== Section %d == It was first described in ''The Book''.",
+    "=== Subsection %d === Later work by '''someone''' expanded on it.",
+    "* Bullet point %d about the '''topic''' in ''context''",
+    "# Numbered point %d about the '''topic'''",
+]
+
+
+def generate_summary(spans):
+    """
+    In:
+        spans = Approximate number of wiki markup spans to include
+
+    Out:
+        summary = Summary string with wiki markup, paragraphs separated by
+            "<br><br>"
+    """
+    paragraphs = [MARKUP_PARAGRAPHS[i % len(MARKUP_PARAGRAPHS)] % i
+                  for i in range(max(spans // 2, 1))]
+    return "<br><br>".join(paragraphs)
+
+
+def time_function(function, summary, repeats=3):
+    """
+    In:
+        function = Function to time
+        summary = Summary string to pass to the function
+        repeats = Number of runs; the fastest is reported
+
+    Out:
+        Tuple of (fastest run time in seconds, function output)
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = function(summary)
+        best = min(best, time.perf_counter() - start)
+
+    return best, output
+
+
+def run_benchmark(span_counts=(250, 500, 1000, 2000, 4000, 8000, 16000),
+                  reference_max_spans=4000):
+    """
+    In:
+        span_counts = Numbers of markup spans to benchmark
+        reference_max_spans = Largest summary to also run the (quadratic)
+            reference implementation on
+
+    Out:
+        Prints a table of run times for each summary size; raises an
+            AssertionError if the two implementations disagree
+    """
+    print("%8s %10s %14s %14s" % ("spans", "chars", "reference (s)",
+                                  "single pass (s)"))
+    for spans in span_counts:
+        summary = generate_summary(spans)
+        new_time, new_output = time_function(add_html_tages_to_summary,
+                                             summary)
+
+        if spans <= reference_max_spans:
+            reference_time, reference_output = time_function(
+                add_html_tages_to_summary_reference, summary, repeats=1)
+            assert new_output == reference_output, \
+                "Outputs differ for %d spans" % spans
+            reference_time = "%14.4f" % reference_time
+        else:
+            reference_time = "%14s" % "-"
+
+        print("%8d %10d %s %14.4f" % (spans, len(summary), reference_time,
+                                      new_time))
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python benchmarks/benchmark_summary_html.py
+    run_benchmark()
@@ -0,0 +1,125 @@
+# Import Dependencies
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from text_features import get_sentiment_lexicon
+from wiki_dump import iter_dump_pages
+from wiki_summarization import get_sentences, get_topic_words, \
+    get_sentence_text_data, get_sentence_text_data_reference
+from wikipedia_page_cleaning import clean_wiki_page
+
+FIXTURE_DUMP = os.path.join(REPO_DIR, "benchmarks", "fixtures",
+                            "sample_pages_articles.xml")
+
+
+def get_corpus_sample(dump_path=FIXTURE_DUMP, limit=200):
+    """
+    In:
+        dump_path = Wikipedia XML dump to take articles from
+        limit = Most articles to take
+
+    Out:
+        articles = List of (sentences, topic words) tuples, one per article
+    """
+    articles = []
+    for title, wikitext in iter_dump_pages(dump_path):
+        sentences = get_sentences(clean_wiki_page(wikitext))
+        if sentences:
+            articles.append((sentences, get_topic_words(title)))
+        if len(articles) == limit:
+            break
+
+    return articles
+
+
+def generate_sentiment_sentences(total_sentences, seed=0):
+    """
+    In:
+        total_sentences = Number of sentences to generate
+        seed = Random seed
+
+    Out:
+        sentences = List of sentences mixing sentiment lexicon words,
+            modifiers, negations, exclamation marks and emoticons, to cover
+            every rule of the sentiment scoring
+    """
+    rng = random.Random(seed)
+    lexicon = get_sentiment_lexicon()
+    sentiment_words = sorted(lexicon.words)
+    modifiers = sorted(word for word, scores in lexicon.words.items()
+                       if scores[3]) + ["really", "truly"]
+    other_words = ["the", "a", "is", "it", "was", "bee", "honey", "of", "I",
+                   "don't", "can't", "not", "no", "never", "n't", "!", "(!)",
+                   "?", ",", ".", "'", ":)", ":-(", ":D", "<3", ";-)", ":P",
+                   "Café", "naïve", "ΟΔΟΣ", "’s"]
+
+    sentences = []
+    for _ in range(total_sentences):
+        words = [rng.choice(rng.choice([sentiment_words, modifiers,
+                                        other_words, other_words]))
+                 for _ in range(rng.randint(0, 25))]
+        words = [word.capitalize() if rng.random() < 0.1 else word
+                 for word in words]
+        sentences.append(" ".join(words) + rng.choice([".", "!", "", " !"]))
+
+    return sentences
+
+
+def run_benchmark(dump_path=FIXTURE_DUMP, generated_sentences=2000):
+    """
+    In:
+        dump_path = Wikipedia XML dump to take the corpus sample from
+        generated_sentences = Number of generated sentiment sentences to
+            also check
+
+    Out:
+        Prints the time the TextBlob per sentence features and the
+            text_features engine take, checking their features are
+            identical
+    """
+    articles = get_corpus_sample(dump_path)
+    articles.append((generate_sentiment_sentences(generated_sentences),
+                     get_topic_words("good honey bee")))
+    total_sentences = sum(len(sentences) for sentences, _ in articles)
+
+    reference_seconds = 0
+    engine_seconds = 0
+    for sentences, topic_words in articles:
+        start = time.perf_counter()
+        expected = get_sentence_text_data_reference(sentences, topic_words)
+        reference_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        features = get_sentence_text_data(sentences, topic_words)
+        engine_seconds += time.perf_counter() - start
+
+        for column, expected_column in zip(features, expected):
+            assert np.array_equal(column, expected_column)
+
+    print("%d articles, %d sentences: identical features"
+          % (len(articles), total_sentences))
+    print("%12s %12s %8s" % ("textblob_s", "engine_s", "speedup"))
+    print("%12.3f %12.3f %7.1fx"
+          % (reference_seconds, engine_seconds,
+             reference_seconds / engine_seconds))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check and time the sentence text features against "
+                    "TextBlob")
+    parser.add_argument("--dump", default=FIXTURE_DUMP,
+                        help="Wikipedia XML dump to sample articles from")
+    parser.add_argument("--generated", type=int, default=2000,
+                        help="Number of generated sentiment sentences")
+    args = parser.parse_args()
+
+    run_benchmark(args.dump, args.generated)
@@ -0,0 +1,365 @@
+# Import Dependencies
+import argparse
+import bz2
+import os
+import random
+from xml.sax.saxutils import escape
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURE_CORPUS = os.path.join(REPO_DIR, "benchmarks", "fixtures",
+                              "pipeline_corpus.xml.bz2")
+
+# (Size class, titles, article shape): stubs of a few sentences, medium
+# articles, long featured articles, and giant list articles made mostly of
+# tables and bullet lists
+CORPUS_SPEC = [
+    ("stub", ["Apis cerana", "Lake Tana", "Kestrel", "Basalt",
+              "Ore Mountains", "Tern"],
+     {"sections": (0, 2), "paragraphs": (1, 2), "sentences": (2, 5),
+      "subsections": 0, "extras": False}),
+    ("medium", ["Honey bee", "Lighthouse", "Volcano", "Printing press"],
+     {"sections": (6, 9), "paragraphs": (2, 4), "sentences": (3, 7)}),
+    ("featured", ["Roman Empire", "Photosynthesis"],
+     {"sections": (14, 16), "paragraphs": (4, 6), "sentences": (5, 9)}),
+    ("giant", ["List of lighthouses"],
+     {"sections": (26, 26), "paragraphs": (0, 1), "sentences": (2, 4),
+      "list_rows": (60, 80)}),
+]
+
+WORDS = (
+    "the of and in to was is for on as by with from that at which it its "
+    "were an are first after also had has their one new two city year "
+    "century during between most world been other such used known many "
+    "large early later region people part built including national near "
+    "state public small area river island north south east west form "
+    "since time work based became began called made several three under "
+    "until water long high light coast colony species system power empire "
+    "army trade record design station tower house field stone century "
+    "population language culture history season design structure period"
+).split()
+
+SENTIMENT_WORDS = ("good great important famous poor beautiful bad best "
+                   "difficult successful major rare strong popular worst "
+                   "terrible excellent significant common natural").split()
+
+PROPER_NOUNS = ("Rome Europe Africa London Egypt Germany Japan Scotland "
+                "Brazil Canada Ethiopia Kenya Spain Greece Norway").split()
+
+ABBREVIATIONS = ["e.g.", "c.", "Dr.", "U.S.", "St.", "approx.", "i.e."]
+
+CATEGORIES = ["Articles with short description", "Featured articles",
+              "Good articles", "Articles containing Latin-language text"]
+
+
+# Markup pieces
+def make_citation(rng, ref_names):
+    """
+    In:
+        rng = random.Random to draw from
+        ref_names = List of reference names used so far in the article
+
+    Out:
+        Citation markup: a named or anonymous <ref> with a cite template, a
+            reuse of an earlier named <ref />, or a {{citation needed}}
+    """
+    roll = rng.random()
+    if roll < 0.3 and ref_names:
+        return '<ref name="%s" />' % rng.choice(ref_names)
+    if roll < 0.4:
+        return "{{citation needed|date=%s %d}}" % (
+            rng.choice(["March", "June", "October"]), rng.randint(2010, 2023))
+
+    cite = ("{{cite %s |last=%s |first=%s |title=%s |year=%d |pages=%d-%d "
+            "|url=https://example.org/%d}}" % (
+                rng.choice(["book", "journal", "web"]),
+                rng.choice(PROPER_NOUNS), rng.choice(WORDS).title(),
+                " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+                rng.randint(1850, 2023), rng.randint(1, 200),
+                rng.randint(201, 400), rng.randint(1000, 9999)))
+    if roll < 0.7:
+        name = "ref%d" % len(ref_names)
+        ref_names.append(name)
+        return '<ref name="%s">%s</ref>' % (name, cite)
+    return "<ref>%s</ref>" % cite
+
+
+def make_sentence(rng, topic, ref_names, terminator="."):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title, mentioned now and then
+        ref_names = List of reference names used so far in the article
+        terminator = Punctuation ending the sentence ("" for list items and
+            table cells)
+
+    Out:
+        Sentence of wikitext: words with links, bold / italic text,
+            numbers, abbreviations and topic mentions, sometimes cited
+    """
+    words = []
+    for i in range(rng.randint(8, 32)):
+        roll = rng.random()
+        if roll < 0.06:
+            target = rng.choice(PROPER_NOUNS + WORDS)
+            if rng.random() < 0.5:
+                words.append("[[%s]]" % target)
+            else:
+                words.append("[[%s|%s]]" % (target.title(), target))
+        elif roll < 0.09:
+            words.append(topic.lower() if i else topic)
+        elif roll < 0.12:
+            words.append(rng.choice(SENTIMENT_WORDS))
+        elif roll < 0.14:
+            words.append("''%s''" % rng.choice(WORDS))
+        elif roll < 0.16:
+            words.append(str(rng.randint(1, 2023)))
+        elif roll < 0.17:
+            words.append(rng.choice(ABBREVIATIONS))
+        elif roll < 0.20:
+            words.append(rng.choice(PROPER_NOUNS))
+        elif roll < 0.24:
+            words.append(rng.choice(WORDS) + ",")
+        else:
+            words.append(rng.choice(WORDS))
+
+    sentence = " ".join(words)
+    sentence = sentence[0].upper() + sentence[1:].rstrip(",") + terminator
+    if rng.random() < 0.3:
+        sentence += make_citation(rng, ref_names)
+    if rng.random() < 0.03:
+        sentence += "<sup>[%d]</sup>" % rng.randint(1, 99)
+
+    return sentence
+
+
+def make_paragraph(rng, topic, ref_names, sentences):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title
+        ref_names = List of reference names used so far in the article
+        sentences = (fewest, most) sentences in the paragraph
+
+    Out:
+        Paragraph of wikitext sentences
+    """
+    return " ".join(make_sentence(rng, topic, ref_names)
+                    for _ in range(rng.randint(*sentences)))
+
+
+def make_list(rng, topic, ref_names, items, ordered=False):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title
+        ref_names = List of reference names used so far in the article
+        items = Number of list items
+        ordered = Numbered ("#") rather than bulleted ("*") items
+
+    Out:
+        Wikitext list, with a nested item now and then
+    """
+    marker = "#" if ordered else "*"
+    lines = []
+    for _ in range(items):
+        depth = 2 if lines and rng.random() < 0.15 else 1
+        lines.append("%s %s" % (marker * depth,
+                                make_sentence(rng, topic, ref_names, "")))
+
+    return "\n".join(lines)
+
+
+def make_table(rng, topic, ref_names, rows):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title
+        ref_names = List of reference names used so far in the article
+        rows = Number of table rows
+
+    Out:
+        Wikitable with a header row, styled cells, links and citations
+    """
+    lines = ['{| class="wikitable sortable" style="text-align:left;"',
+             "|+ %s by %s" % (topic, rng.choice(WORDS)),
+             "! Name !! Location !! Year !! Height (m) !! Notes"]
+    for _ in range(rows):
+        lines.append("|-")
+        lines.append('| style="background:#%06x;" | [[%s %s]] || [[%s]] || '
+                     "%d || {{convert|%d|m|ft}} || %s" % (
+                         rng.randint(0, 0xFFFFFF),
+                         rng.choice(PROPER_NOUNS), topic.split()[-1],
+                         rng.choice(PROPER_NOUNS), rng.randint(1700, 2020),
+                         rng.randint(5, 120),
+                         make_sentence(rng, topic, ref_names, "")))
+    lines.append("|}")
+
+    return "\n".join(lines)
+
+
+def make_infobox(rng, topic):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title
+
+    Out:
+        Short description and infobox templates, with nested templates
+    """
+    fields = ["| name = %s" % topic,
+              "| image = %s.jpg" % topic.replace(" ", "_"),
+              "| caption = {{lang|la|%s}} in %d" % (
+                  rng.choice(WORDS), rng.randint(1900, 2020)),
+              "| coordinates = {{coord|%d|%d|N|%d|%d|E|display=inline}}" % (
+                  rng.randint(0, 89), rng.randint(0, 59),
+                  rng.randint(0, 179), rng.randint(0, 59)),
+              "| area = {{convert|%d|km2|sqmi}}" % rng.randint(1, 9999)]
+    return "{{Short description|%s %s}}\n{{Infobox %s\n%s\n}}" % (
+        rng.choice(SENTIMENT_WORDS).title(), rng.choice(WORDS),
+        rng.choice(WORDS), "\n".join(fields))
+
+
+# Articles
+def make_article(rng, topic, shape):
+    """
+    In:
+        rng = random.Random to draw from
+        topic = Article title
+        shape = Dictionary of (fewest, most) "sections", "paragraphs" per
+            section and "sentences" per paragraph; optionally the most
+            "subsections" per section (2 by default), whether sections end
+            with lists, tables and the like ("extras", True by default), and
+            for list articles, (fewest, most) "list_rows" per section (see
+            CORPUS_SPEC)
+
+    Out:
+        Wikitext article: infobox, lead, sections with subsections, images,
+            lists, tables, galleries and comments, then the reference and
+            link sections and categories
+    """
+    ref_names = []
+    list_rows = shape.get("list_rows")
+    parts = [make_infobox(rng, topic),
+             "'''%s''' %s" % (topic, make_paragraph(rng, topic, ref_names,
+                                                    shape["sentences"]))]
+    for _ in range(rng.randint(0, 2)):
+        parts.append(make_paragraph(rng, topic, ref_names,
+                                    shape["sentences"]))
+
+    for section in range(rng.randint(*shape["sections"])):
+        heading = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        parts.append("== %s ==" % heading.title())
+
+        if rng.random() < 0.4:
+            parts.append("[[File:%s %d.jpg|thumb|upright|A %s [[%s]]]]" % (
+                topic, section, rng.choice(WORDS), rng.choice(PROPER_NOUNS)))
+        if rng.random() < 0.1:
+            parts.append("<!-- %s -->" % make_sentence(rng, topic, []))
+
+        for _ in range(rng.randint(*shape["paragraphs"])):
+            parts.append(make_paragraph(rng, topic, ref_names,
+                                        shape["sentences"]))
+
+        if list_rows is not None:
+            parts.append(make_table(rng, topic, ref_names,
+                                    rng.randint(*list_rows) // 2))
+            parts.append(make_list(rng, topic, ref_names,
+                                   rng.randint(*list_rows) // 2))
+            continue
+
+        for _ in range(rng.randint(0, shape.get("subsections", 2))):
+            parts.append("=== %s ===" % rng.choice(WORDS).title())
+            for _ in range(rng.randint(1, shape["paragraphs"][1])):
+                parts.append(make_paragraph(rng, topic, ref_names,
+                                            shape["sentences"]))
+            if rng.random() < 0.2:
+                parts.append("==== %s ====" % rng.choice(WORDS).title())
+                parts.append(make_paragraph(rng, topic, ref_names,
+                                            shape["sentences"]))
+
+        roll = rng.random() if shape.get("extras", True) else 1.0
+        if roll < 0.2:
+            parts.append(make_list(rng, topic, ref_names, rng.randint(3, 8)))
+        elif roll < 0.3:
+            parts.append(make_list(rng, topic, ref_names, rng.randint(3, 6),
+                                   ordered=True))
+        elif roll < 0.4:
+            parts.append(make_table(rng, topic, ref_names, rng.randint(3, 8)))
+        elif roll < 0.45:
+            parts.append("<gallery>\n%s\n</gallery>" % "\n".join(
+                "%s %d.jpg|%s" % (topic, i, rng.choice(WORDS))
+                for i in range(rng.randint(2, 5))))
+        elif roll < 0.5:
+            parts.append('<div class="%s">%s</div>' % (
+                rng.choice(WORDS), make_sentence(rng, topic, [])))
+
+    parts.append("== See also ==\n" + "\n".join(
+        "* [[%s]]" % rng.choice(PROPER_NOUNS) for _ in range(3)))
+    parts.append("== References ==\n{{Reflist}}")
+    parts.append("== External links ==\n* [https://example.org/%s %s]" % (
+        topic.replace(" ", "_"), topic))
+    parts.append("\n".join("[[Category:%s]]" % category
+                           for category in rng.sample(CATEGORIES, 2)))
+
+    return "\n\n".join(parts)
+
+
+def make_page_xml(page_id, title, wikitext):
+    """
+    In:
+        page_id = Page id
+        title = Page title
+        wikitext = Page wikitext
+
+    Out:
+        <page> element of a pages-articles XML dump
+    """
+    return ("  <page>\n    <title>%s</title>\n    <ns>0</ns>\n"
+            "    <id>%d</id>\n    <revision>\n      <id>%d</id>\n"
+            "      <model>wikitext</model>\n"
+            "      <format>text/x-wiki</format>\n"
+            '      <text bytes="%d" xml:space="preserve">%s</text>\n'
+            "    </revision>\n  </page>\n" % (
+                escape(title), page_id, page_id + 1000,
+                len(wikitext.encode("UTF-8")), escape(wikitext)))
+
+
+def make_fixture_corpus(filename=FIXTURE_CORPUS, seed=0):
+    """
+    In:
+        filename = Dump file to write (bz2 compressed if it ends in ".bz2")
+        seed = Random seed; the same seed always gives the same corpus
+
+    Out:
+        Writes a pages-articles XML dump of generated wikitext articles of
+            every size class in CORPUS_SPEC
+    """
+    rng = random.Random(seed)
+    pages = ['<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" '
+             'xml:lang="en">\n']
+    page_id = 1
+    for size_class, titles, shape in CORPUS_SPEC:
+        for title in titles:
+            pages.append(make_page_xml(page_id, title,
+                                       make_article(rng, title, shape)))
+            page_id += 1
+    pages.append("</mediawiki>\n")
+
+    data = "".join(pages).encode("UTF-8")
+    if filename.endswith(".bz2"):
+        data = bz2.compress(data, 9)
+    with open(filename, "wb") as corpus_file:
+        corpus_file.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate the benchmark fixture corpus of wikitext "
+                    "articles")
+    parser.add_argument("--output", default=FIXTURE_CORPUS,
+                        help="Dump file to write")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    make_fixture_corpus(args.output, args.seed)
@@ -0,0 +1,100 @@
+# Import Dependencies
+import random
+import sys
+
+from wikipedia_page_cleaning import clean_wiki_page, clean_wiki_page_reference
+
+# Markup fragments random articles are assembled from; weighted towards the
+# characters the scanners care about so nesting / overlap edge cases show up
+WIKITEXT_FRAGMENTS = [
+    "{", "}", "{{", "}}", "{{{", "}}}", "[", "]", "[[", "]]", "]]]]", "|",
+    "{|", "|}", "|-", "|+ |", "!!", "! ", "\n", "\n\n", "\n]", " ", "word",
+    "'''bold'''", "''italic''", "== Heading ==", "=== Sub ===", "* bullet",
+    "# numbered", "File:", "Image:", "Category:", "style=\"x\"|", "<br>",
+    "<br/>", "<ref>", "</ref>", "<ref name=a/>", "<sup>", "</sup>",
+    "<gallery>", "</gallery>", "<!--", "-->", "<div>", "</div>",
+    "== References", "== See also", "==Notes",
+]
+
+
+def run_clean(clean_function, text):
+    """
+    In:
+        clean_function = Cleaning function to run
+        text = Raw wikipedia article text
+
+    Out:
+        Tuple of ("ok", cleaned text) or ("error", exception type name)
+    """
+    try:
+        return "ok", clean_function(text)
+    except Exception as error:
+        return "error", type(error).__name__
+
+
+def find_cleaning_differences(texts):
+    """
+    In:
+        texts = Iterable of raw wikipedia article texts
+
+    Out:
+        differences = List of (index, reference result, new result) tuples for
+            every text where clean_wiki_page and clean_wiki_page_reference
+            disagree (including raising different exceptions)
+    """
+    differences = []
+    for i, text in enumerate(texts):
+        expected = run_clean(clean_wiki_page_reference, text)
+        actual = run_clean(clean_wiki_page, text)
+        if expected != actual:
+            differences.append((i, expected, actual))
+
+    return differences
+
+
+def generate_random_wikitext(rng, fragments=60):
+    """
+    In:
+        rng = random.Random instance
+        fragments = Number of markup fragments to join together
+
+    Out:
+        Random (mostly malformed) wikitext
+    """
+    return "".join(rng.choice(WIKITEXT_FRAGMENTS) for _ in range(fragments))
+
+
+def fuzz_cleaning_engines(iterations=20000, seed=0):
+    """
+    In:
+        iterations = Number of random articles to compare
+        seed = Random seed, so failures can be reproduced
+
+    Out:
+        differences = List of (text, reference result, new result) tuples for
+            every random article where the two engines disagree
+    """
+    rng = random.Random(seed)
+    texts = [generate_random_wikitext(rng, rng.randint(1, 120))
+             for _ in range(iterations)]
+    return [(texts[i], expected, actual) for i, expected, actual
+            in find_cleaning_differences(texts)]
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python compare_cleaning_engines.py [raw_article.txt ...]
+    # With no arguments, compares the engines on randomly generated wikitext
+    if len(sys.argv) > 1:
+        texts = []
+        for filename in sys.argv[1:]:
+            with open(filename, "r", encoding="utf-8") as article_file:
+                texts.append(article_file.read())
+        differences = find_cleaning_differences(texts)
+    else:
+        differences = fuzz_cleaning_engines()
+
+    for difference in differences[:10]:
+        print(repr(difference))
+    print("%d difference(s) found" % len(differences))
+    sys.exit(1 if differences else 0)
@@ -0,0 +1,208 @@
+# Import Dependencies
+import argparse
+
+import numpy as np
+
+from model_registry import load_model_pack, save_model_pack
+from summary_cache import get_file_hash
+
+
+class CompiledForest:
+    """
+    Random forest classifier flattened into NumPy arrays, predicting exactly
+    as the scikit-learn forest it was compiled from, without per-tree Python
+    dispatch.
+
+    The nodes of all the trees are concatenated into one set of arrays
+    (feature, threshold, left / right children, and class probabilities).
+    All the trees are walked for all the samples at once, one tree level per
+    step, dropping each path as it reaches a leaf.
+    """
+
+    def __init__(self, forest):
+        """
+        In:
+            forest = Fitted single output scikit-learn forest classifier
+                (e.g. RandomForestClassifier)
+        """
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single output forests can be compiled")
+
+        self.classes_ = np.asarray(forest.classes_)
+        n_classes = len(self.classes_)
+
+        features = []
+        thresholds = []
+        children = []
+        missing_lefts = []
+        values = []
+        roots = []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            tree_leaves = tree.children_left == -1
+
+            roots.append(~offset if tree_leaves[0] else offset)
+            features.append(np.where(tree_leaves, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            # Left and right child of each node side by side, as ~node for
+            # leaves, so reaching one needs no lookup
+            tree_children = np.column_stack(
+                [tree.children_left, tree.children_right]).ravel()
+            children.append(np.where(tree_leaves[tree_children.clip(0)],
+                                     ~(tree_children + offset),
+                                     tree_children + offset))
+            missing_lefts.append(
+                np.asarray(tree.missing_go_to_left, dtype=bool)
+                if hasattr(tree, "missing_go_to_left")
+                else np.zeros(tree.node_count, dtype=bool))
+            values.append(get_leaf_probabilities(tree.value[:, 0, :n_classes]))
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.children = np.concatenate(children).astype(np.intp)
+        self.missing_go_to_left = np.concatenate(missing_lefts)
+        self.value = np.concatenate(values)
+        # Root of each tree (as ~root if the tree is a single leaf)
+        self.roots = np.array(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.n_features_in_ = forest.n_features_in_
+
+    def apply(self, X):
+        """
+        In:
+            X = 2D array of samples (one row per sample)
+
+        Out:
+            leaves = 2D NumPy array of the leaf (node index into the
+                compiled arrays) each tree puts each sample in, shaped
+                (trees, samples)
+        """
+        # scikit-learn compares float32 samples against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError("X should have shape (samples, %d)"
+                             % self.n_features_in_)
+
+        n_samples = len(X)
+        # Widened once (exactly) rather than on every comparison
+        flat_X = X.astype(np.float64).ravel()
+        has_missing = np.isnan(flat_X).any()
+        leaves = np.empty(len(self.roots) * n_samples, dtype=np.intp)
+
+        # One entry per (tree, sample) path still being walked; nodes are
+        # the node reached, as ~node once it is a leaf
+        positions = np.arange(len(leaves))
+        nodes = np.repeat(self.roots, n_samples)
+        row_offsets = np.tile(np.arange(n_samples) * self.n_features_in_,
+                              len(self.roots))
+
+        while True:
+            done = nodes < 0
+            if done.any():
+                leaves[positions[done]] = ~nodes[done]
+                walking = np.flatnonzero(~done)
+                positions = positions.take(walking)
+                nodes = nodes.take(walking)
+                row_offsets = row_offsets.take(walking)
+            if not len(nodes):
+                break
+
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = values > self.threshold.take(nodes)
+            if has_missing:
+                missing = np.isnan(values)
+                go_right[missing] = \
+                    ~self.missing_go_to_left.take(nodes[missing])
+            nodes = self.children.take(2 * nodes + go_right)
+
+        return leaves.reshape(len(self.roots), n_samples)
+
+    def predict_proba(self, X):
+        """
+        In:
+            X = 2D array of samples (one row per sample)
+
+        Out:
+            proba = 2D NumPy array of class probabilities (columns follow
+                classes_), the mean of the trees' leaf probabilities
+        """
+        leaves = self.apply(X)
+
+        # Summed tree by tree, in order, as scikit-learn does, so the
+        # floating point results are identical
+        proba = np.zeros((leaves.shape[1], len(self.classes_)))
+        for tree_leaves in leaves:
+            proba += self.value.take(tree_leaves, axis=0)
+        proba /= len(self.roots)
+
+        return proba
+
+    def predict(self, X):
+        """
+        In:
+            X = 2D array of samples (one row per sample)
+
+        Out:
+            NumPy array of the predicted class of each sample
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1),
+                                  axis=0)
+
+
+def get_leaf_probabilities(values):
+    """
+    In:
+        values = 2D array of a tree's node values (tree_.value for its only
+            output)
+
+    Out:
+        2D float NumPy array of node class probabilities, as the installed
+            scikit-learn's predict_proba gives them: older versions store
+            class counts and normalize them when predicting, newer versions
+            store the fractions themselves
+    """
+    values = np.array(values, dtype=np.float64)
+    totals = values.sum(axis=1)
+    if np.allclose(totals, 1):
+        return values
+
+    totals[totals == 0] = 1
+    return values / totals[:, np.newaxis]
+
+
+def compile_model_pack(model_filename, compiled_filename):
+    """
+    In:
+        model_filename = Model pack with a scikit-learn forest (e.g.
+            "prediction_model.pkl")
+        compiled_filename = File to save the compiled model pack to; a
+            ".joblib" file can be memory mapped by the model registry
+
+    Out:
+        Saves a copy of the model pack with the forest compiled (see
+            CompiledForest), and the hash of the model pack it was compiled
+            from as "source_version"
+    """
+    model_pack = dict(load_model_pack(model_filename))
+    model_pack["model"] = CompiledForest(model_pack["model"])
+    model_pack["source_version"] = get_file_hash(model_filename)
+    save_model_pack(model_pack, compiled_filename)
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python compiled_forest.py prediction_model.pkl \
+    #         prediction_model.joblib
+    parser = argparse.ArgumentParser(
+        description="Compile a pickled random forest model pack")
+    parser.add_argument("model_filename")
+    parser.add_argument("compiled_filename")
+    args = parser.parse_args()
+
+    compile_model_pack(args.model_filename, args.compiled_filename)
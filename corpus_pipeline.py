@@ -0,0 +1,290 @@
+# Import Dependencies
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from wikipedia_page_cleaning import clean_wiki_page
+from wiki_summarization import get_article_features, FEATURE_COLUMNS
+from sentence_labeling import get_labeled_english_sentences
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+# Article functions
+def clean_article(raw_article):
+    """
+    In:
+        raw_article = Raw wikipedia article text
+
+    Out:
+        article = Cleaned article, with the line separators that break
+            sentence splitting ("\\x85", "\\u2029") turned into paragraph
+            breaks
+    """
+    article = clean_wiki_page(raw_article)
+    article = article.replace("\x85", "<br><br>")
+    article = article.replace("\u2029", "<br><br>")
+    return article
+
+
+def process_article_pair(raw_english_article, raw_simple_article, topic):
+    """
+    In:
+        raw_english_article = Raw english wikipedia article text
+        raw_simple_article = Raw simple wikipedia article text
+        topic = Topic of the english wikipedia article
+
+    Out:
+        Dictionary of:
+            topic = Topic of the english wikipedia article
+            sentences = List of sentences in the english article
+            labels = NumPy array of 1 (Yes) or 0 (No) flags of whether or not
+                each sentence is "included" in the simple article
+            features = 2D float NumPy array of sentence data, one row per
+                sentence; columns follow FEATURE_COLUMNS
+
+        Raises ValueError if either article is blank once cleaned, or if
+            the sentences labeled aren't the sentences featurized (their
+            labels would land on the wrong rows)
+    """
+    english_article = clean_article(raw_english_article)
+    simple_article = clean_article(raw_simple_article)
+    if not english_article.strip() or not simple_article.strip():
+        raise ValueError("Article is blank once cleaned")
+
+    labeled_sentences, labels = get_labeled_english_sentences(
+        english_article, simple_article)
+    sentences, features = get_article_features(english_article, topic)
+    if labeled_sentences != sentences:
+        raise ValueError("Labeled sentences (%d) don't match featurized "
+                         "sentences (%d)"
+                         % (len(labeled_sentences), len(sentences)))
+
+    return {"topic": topic, "sentences": sentences,
+            "labels": np.array(labels, dtype=np.int8),
+            "features": features}
+
+
+def process_chunk(article_pairs):
+    """
+    In:
+        article_pairs = List of (index, raw_english_article,
+            raw_simple_article, topic) tuples
+
+    Out:
+        results = List of (index, result) tuples, where result is the
+            dictionary from process_article_pair, or a dictionary with the
+            topic and error if the pair couldn't be processed
+    """
+    results = []
+    for index, raw_english_article, raw_simple_article, topic in article_pairs:
+        try:
+            result = process_article_pair(raw_english_article,
+                                          raw_simple_article, topic)
+        except Exception as error:
+            result = {"topic": topic,
+                      "error": "%s: %s" % (type(error).__name__, error)}
+        results.append((index, result))
+
+    return results
+
+
+# Checkpoint functions
+def get_chunk_filename(output_dir, chunk_number):
+    """
+    In:
+        output_dir = Pipeline output directory
+        chunk_number = Number of the chunk
+
+    Out:
+        Path of the chunk's checkpoint file
+    """
+    return os.path.join(output_dir, "chunk_%06d.pkl" % chunk_number)
+
+
+def save_chunk(output_dir, chunk_number, results):
+    """
+    In:
+        output_dir = Pipeline output directory
+        chunk_number = Number of the chunk
+        results = Chunk results (see process_chunk)
+
+    Out:
+        Pickles the results; written to a temporary file and renamed, so a
+            crash never leaves a partial checkpoint behind
+    """
+    filename = get_chunk_filename(output_dir, chunk_number)
+    with open(filename + ".tmp", "wb") as picklefile:
+        pickle.dump(results, picklefile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(filename + ".tmp", filename)
+
+
+def hash_inputs(raw_english_articles, raw_simple_articles, topics):
+    """
+    In:
+        raw_english_articles = List of raw english wikipedia articles
+        raw_simple_articles = List of their respective raw simple wikipedia
+            articles
+        topics = List of the english articles' topics
+
+    Out:
+        Hash (hex) of the topics and articles, in order, so a run over a
+            different or reordered corpus of the same size is told apart
+    """
+    input_hash = hashlib.blake2b(digest_size=16)
+    for values in (topics, raw_english_articles, raw_simple_articles):
+        for value in values:
+            encoded = str(value).encode("UTF-8", "surrogatepass")
+            input_hash.update(len(encoded).to_bytes(8, "little"))
+            input_hash.update(encoded)
+
+    return input_hash.hexdigest()
+
+
+def check_manifest(output_dir, total_articles, chunk_size, input_hash):
+    """
+    In:
+        output_dir = Pipeline output directory
+        total_articles = Number of article pairs in this run
+        chunk_size = Number of article pairs per chunk in this run
+        input_hash = Hash of this run's topics and articles (see
+            hash_inputs)
+
+    Out:
+        Writes the run's manifest, or checks an existing one matches, so
+            checkpoints are only resumed by the run that made them, over the
+            same input; raises ValueError if it doesn't match
+    """
+    manifest = {"total_articles": total_articles, "chunk_size": chunk_size,
+                "input_hash": input_hash}
+    filename = os.path.join(output_dir, MANIFEST_FILENAME)
+
+    if os.path.exists(filename):
+        with open(filename) as manifest_file:
+            saved_manifest = json.load(manifest_file)
+        if saved_manifest != manifest:
+            raise ValueError("%s holds checkpoints of a different run (%s)"
+                             % (output_dir, saved_manifest))
+        return
+
+    with open(filename, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+
+# Pipeline
+def run_corpus_pipeline(raw_english_articles, raw_simple_articles, topics,
+                        output_dir, chunk_size=1000, max_workers=None):
+    """
+    In:
+        raw_english_articles = List of raw english wikipedia articles
+        raw_simple_articles = List of their respective raw simple wikipedia
+            articles
+        topics = List of the english articles' topics
+        output_dir = Directory to write the chunk checkpoints to
+        chunk_size = Number of article pairs per chunk (unit of work and of
+            checkpointing)
+        max_workers = Number of worker processes (None = one per CPU)
+
+    Out:
+        Cleans, splits, labels, and featurizes every article pair on a pool
+            of processes, saving each chunk's results as it finishes and
+            printing progress / throughput. Chunks already saved in
+            output_dir are skipped, so an interrupted run is resumed by
+            calling this again with the same arguments (a different corpus
+            raises ValueError rather than mixing with their results).
+            Returns the number of article pairs in this run that couldn't be
+            processed (see load_corpus_results for their errors).
+    """
+    total_articles = len(topics)
+    os.makedirs(output_dir, exist_ok=True)
+    check_manifest(output_dir, total_articles, chunk_size,
+                   hash_inputs(raw_english_articles, raw_simple_articles,
+                               topics))
+
+    total_chunks = (total_articles + chunk_size - 1) // chunk_size
+    pending_chunks = [chunk_number for chunk_number in range(total_chunks)
+                      if not os.path.exists(get_chunk_filename(
+                          output_dir, chunk_number))]
+    print("%d of %d chunks already done"
+          % (total_chunks - len(pending_chunks), total_chunks))
+
+    processed = failed = 0
+    start = time.time()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for chunk_number in pending_chunks:
+            first = chunk_number * chunk_size
+            last = min(first + chunk_size, total_articles)
+            article_pairs = [(index, raw_english_articles[index],
+                              raw_simple_articles[index], topics[index])
+                             for index in range(first, last)]
+            futures[executor.submit(process_chunk, article_pairs)] = \
+                chunk_number
+
+        for done, future in enumerate(as_completed(futures), 1):
+            results = future.result()
+            save_chunk(output_dir, futures[future], results)
+
+            processed += len(results)
+            failed += sum(1 for _, result in results if "error" in result)
+            elapsed = time.time() - start
+            print("Chunk %d/%d done: %d articles (%d failed), %.1f articles/s,"
+                  " %.0fs left"
+                  % (done, len(pending_chunks), processed, failed,
+                     processed / elapsed,
+                     (len(pending_chunks) - done) * elapsed / done))
+
+    return failed
+
+
+def load_corpus_results(output_dir):
+    """
+    In:
+        output_dir = Pipeline output directory
+
+    Out:
+        Generator of (index, result) tuples for every article pair, in order
+            (see process_chunk)
+    """
+    chunk_number = 0
+    while os.path.exists(get_chunk_filename(output_dir, chunk_number)):
+        with open(get_chunk_filename(output_dir, chunk_number),
+                  "rb") as picklefile:
+            yield from pickle.load(picklefile)
+        chunk_number += 1
+
+
+def load_training_data(output_dir):
+    """
+    In:
+        output_dir = Pipeline output directory
+
+    Out:
+        sentences = List of every english sentence
+        X = 2D float NumPy array of sentence data (columns follow
+            FEATURE_COLUMNS)
+        y = NumPy array of sentence labels
+
+        Article pairs that couldn't be processed are left out
+    """
+    sentences = []
+    features = []
+    labels = []
+    for _, result in load_corpus_results(output_dir):
+        if "error" in result:
+            continue
+        sentences += result["sentences"]
+        features.append(result["features"])
+        labels.append(result["labels"])
+
+    if not features:
+        return sentences, np.empty((0, len(FEATURE_COLUMNS))), \
+            np.empty(0, dtype=np.int8)
+
+    return sentences, np.vstack(features), np.concatenate(labels)
@@ -0,0 +1,44 @@
+# Import Dependencies
+import multiprocessing
+import os
+
+# Production settings for serving Quikipedia with gunicorn:
+#     gunicorn -c gunicorn_config.py summarize_app:app
+#
+# The master process loads the models (and NLP data) once, before forking
+# the workers, so the workers share them rather than each loading their own.
+# The app itself is not preloaded: each worker opens its own cache databases
+# and Wikipedia connections after the fork.
+
+bind = os.environ.get("QUIKIPEDIA_BIND", "0.0.0.0:80")
+
+# Summarizing is CPU bound, so one worker per core, each with a few threads
+# for requests waiting on Wikipedia (summarize_app.MAX_CONCURRENT_SUMMARIES
+# caps how many of them summarize at once)
+workers = int(os.environ.get("QUIKIPEDIA_WORKERS",
+                             multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = 8
+
+# Connections waiting to be accepted; past this, clients are refused rather
+# than queued indefinitely
+backlog = 256
+
+timeout = 60  # Seconds a busy worker gets before it is restarted
+graceful_timeout = 30
+keepalive = 5
+
+# Workers are recycled now and then (forked again from the master, so the
+# preloaded models are still shared), bounding any slow memory growth
+max_requests = 5000
+max_requests_jitter = 500
+
+preload_app = False
+
+
+def on_starting(server):
+    """
+    Load the models in the master process, before any worker is forked
+    """
+    import wiki_summarization
+    wiki_summarization.preload()
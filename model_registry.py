@@ -0,0 +1,178 @@
+# Import Dependencies
+import pickle
+import threading
+import time
+
+import joblib
+
+from summary_cache import get_file_hash
+
+
+# Loading functions
+def load_model_pack(filename, mmap_mode=None):
+    """
+    In:
+        filename = Model pack file: a pickle, or a joblib dump (".joblib")
+        mmap_mode = For joblib dumps, memory map the NumPy arrays in it with
+            this mode (e.g. "r") instead of reading them into memory, so
+            processes loading the same file share its pages; None to read
+
+    Out:
+        Unpickled model pack (e.g. {"model": model})
+    """
+    if filename.endswith(".joblib"):
+        return joblib.load(filename, mmap_mode=mmap_mode)
+
+    with open(filename, "rb") as picklefile:
+        return pickle.load(picklefile)
+
+
+def save_model_pack(model_pack, filename):
+    """
+    In:
+        model_pack = Model pack to save (e.g. {"model": model})
+        filename = File to save it to: a joblib dump if it ends in ".joblib"
+            (which can be memory mapped by load_model_pack), otherwise a
+            pickle
+
+    Out:
+        Saves the model pack
+    """
+    if filename.endswith(".joblib"):
+        joblib.dump(model_pack, filename)
+        return
+
+    with open(filename, "wb") as picklefile:
+        pickle.dump(model_pack, picklefile, protocol=3)
+
+
+# Registry
+class ModelArtifact:
+    """
+    Model pack file loaded on first use, once, however many threads ask for
+    it at the same time.
+    """
+
+    def __init__(self, filename, mmap_mode="r"):
+        """
+        In:
+            filename = Model pack file (see load_model_pack)
+            mmap_mode = Memory map mode for joblib dumps (see
+                load_model_pack)
+        """
+        self.filename = filename
+        self.mmap_mode = mmap_mode
+        self.lock = threading.Lock()
+
+        self.model_pack = None
+        self.version = None
+        self.load_seconds = None
+        self.hash_seconds = None
+
+    def get(self):
+        """
+        Out:
+            Model pack, loaded from the file the first time it is asked for
+        """
+        model_pack = self.model_pack
+        if model_pack is None:
+            with self.lock:
+                if self.model_pack is None:
+                    start = time.perf_counter()
+                    self.model_pack = load_model_pack(self.filename,
+                                                      self.mmap_mode)
+                    self.load_seconds = time.perf_counter() - start
+                model_pack = self.model_pack
+
+        return model_pack
+
+    def get_version(self):
+        """
+        Out:
+            Hash of the model pack file (see get_file_hash), computed the
+                first time it is asked for
+        """
+        version = self.version
+        if version is None:
+            with self.lock:
+                if self.version is None:
+                    start = time.perf_counter()
+                    self.version = get_file_hash(self.filename)
+                    self.hash_seconds = time.perf_counter() - start
+                version = self.version
+
+        return version
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the file, whether it is loaded yet, and the seconds
+                loading and hashing it took (None if not done yet)
+        """
+        return {"filename": self.filename,
+                "loaded": self.model_pack is not None,
+                "load_seconds": self.load_seconds,
+                "hash_seconds": self.hash_seconds}
+
+
+class ModelRegistry:
+    """
+    Named model artifacts, each loaded lazily (see ModelArtifact).
+    """
+
+    def __init__(self):
+        self.artifacts = {}
+
+    def register(self, name, filename, mmap_mode="r"):
+        """
+        In:
+            name = Name to look the model up by
+            filename = Model pack file (see load_model_pack)
+            mmap_mode = Memory map mode for joblib dumps (see
+                load_model_pack)
+
+        Out:
+            Registers the model (replacing any registered under the same
+                name) without loading it
+        """
+        self.artifacts[name] = ModelArtifact(filename, mmap_mode)
+
+    def get(self, name):
+        """
+        In:
+            name = Registered model name
+
+        Out:
+            Model pack, loaded the first time it is asked for
+        """
+        return self.artifacts[name].get()
+
+    def get_version(self, name):
+        """
+        In:
+            name = Registered model name
+
+        Out:
+            Hash of the model's file (see ModelArtifact.get_version)
+        """
+        return self.artifacts[name].get_version()
+
+    def preload(self):
+        """
+        Out:
+            Loads and hashes every registered model now (e.g. in a server's
+                master process, so forked workers share the loaded models
+                rather than each loading their own)
+        """
+        for artifact in self.artifacts.values():
+            artifact.get()
+            artifact.get_version()
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of each registered model's stats (see
+                ModelArtifact.stats)
+        """
+        return {name: artifact.stats()
+                for name, artifact in self.artifacts.items()}
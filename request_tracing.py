@@ -0,0 +1,285 @@
+# Import Dependencies
+import bisect
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_METRIC = "quikipedia_stage_seconds"
+REQUEST_METRIC = "quikipedia_request_seconds"
+REQUEST_COUNT_METRIC = "quikipedia_requests_total"
+
+
+# Metrics
+class Histogram:
+    """
+    Prometheus style histogram: observation counts per bucket, their sum and
+    their count.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        In:
+            buckets = Sorted bucket upper bounds
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        In:
+            value = Observed value (e.g. seconds a stage took)
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Labelled histograms and counters, rendered in the Prometheus text
+    exposition format. Each process keeps its own (e.g. each server worker).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions = {}  # Name: (type, help text)
+        self.histograms = {}  # (name, labels): Histogram
+        self.counters = {}  # (name, labels): count
+
+    def describe(self, name, metric_type, help_text):
+        """
+        In:
+            name = Metric name
+            metric_type = "histogram" or "counter"
+            help_text = One line description of the metric
+        """
+        self.descriptions[name] = (metric_type, help_text)
+
+    def observe(self, name, labels, value):
+        """
+        In:
+            name = Histogram name
+            labels = Tuple of (label, value) pairs
+            value = Observed value
+        """
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        """
+        In:
+            name = Counter name
+            labels = Tuple of (label, value) pairs
+            amount = Amount to add
+        """
+        with self.lock:
+            self.counters[name, labels] = \
+                self.counters.get((name, labels), 0) + amount
+
+    def render(self):
+        """
+        Out:
+            Every metric, in the Prometheus text exposition format
+        """
+        lines = []
+        with self.lock:
+            for name, (metric_type, help_text) in \
+                    sorted(self.descriptions.items()):
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s %s" % (name, metric_type))
+
+                if metric_type == "histogram":
+                    for (metric, labels), histogram in \
+                            sorted(self.histograms.items()):
+                        if metric == name:
+                            lines.extend(format_histogram(name, labels,
+                                                          histogram))
+                else:
+                    for (metric, labels), count in \
+                            sorted(self.counters.items()):
+                        if metric == name:
+                            lines.append("%s%s %s" % (
+                                name, format_labels(labels), count))
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    """
+    In:
+        labels = Tuple of (label, value) pairs
+
+    Out:
+        Prometheus label set (e.g. '{stage="clean"}'), or "" for no labels
+    """
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"' % (label, str(value).replace("\\", "\\\\")
+                     .replace('"', '\\"').replace("\n", "\\n"))
+        for label, value in labels)
+
+
+def format_histogram(name, labels, histogram):
+    """
+    In:
+        name = Histogram name
+        labels = Tuple of (label, value) pairs
+        histogram = Histogram
+
+    Out:
+        List of the histogram's Prometheus lines: cumulative buckets, sum and
+            count
+    """
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+        cumulative += count
+        lines.append("%s_bucket%s %d" % (
+            name, format_labels(labels + (("le", bound),)), cumulative))
+    lines.append("%s_sum%s %r" % (name, format_labels(labels), histogram.sum))
+    lines.append("%s_count%s %d" % (name, format_labels(labels),
+                                    histogram.count))
+
+    return lines
+
+
+metrics = MetricsRegistry()
+metrics.describe(STAGE_METRIC, "histogram",
+                 "Seconds spent in each summarization stage")
+metrics.describe(REQUEST_METRIC, "histogram",
+                 "Seconds from receiving each request to closing its response")
+metrics.describe(REQUEST_COUNT_METRIC, "counter",
+                 "Requests answered, by endpoint and status")
+
+
+# Stage timing
+class RequestTrace:
+    """
+    Seconds each stage took while handling one request (stages run more than
+    once, e.g. per section, are added up).
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        """
+        In:
+            stage = Stage name
+            seconds = Seconds it took
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def get_server_timing(self, total_seconds):
+        """
+        In:
+            total_seconds = Seconds the whole request has taken so far
+
+        Out:
+            Server-Timing header value listing the stages in the order they
+                first ran, then the total, in milliseconds
+        """
+        timings = list(self.stages.items()) + [("total", total_seconds)]
+        return ", ".join("%s;dur=%.2f" % (stage, seconds * 1000)
+                         for stage, seconds in timings)
+
+
+# Trace of the request being handled in this thread, if any
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextlib.contextmanager
+def timed_stage(stage):
+    """
+    In:
+        stage = Stage name (e.g. "clean")
+
+    Out:
+        Context manager (or, used with @, function decorator) timing its
+            block into the stage histogram, and into the current request's
+            trace if there is one
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe(STAGE_METRIC, (("stage", stage),), seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+
+# Profiling
+class SamplingProfiler:
+    """
+    Samples one thread's call stack every `interval` seconds from a
+    background thread, counting how often each stack is seen; the counts are
+    written in the folded stack format flame graph tools read
+    (e.g. flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        """
+        In:
+            thread_id = Thread to sample (None for the calling thread)
+            interval = Seconds between samples
+        """
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Out:
+            Starts sampling
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s:%s" % (os.path.basename(code.co_filename),
+                                        code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """
+        Out:
+            Stops sampling
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def write_folded(self, filename):
+        """
+        In:
+            filename = File to write the folded stacks to
+        """
+        with open(filename, "w") as profile_file:
+            for stack, count in self.samples.most_common():
+                profile_file.write("%s %d\n" % (stack, count))
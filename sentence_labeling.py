@@ -0,0 +1,330 @@
+# Import Dependencies
+import heapq
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import process
+from fuzzywuzzy.utils import full_process
+
+from wiki_summarization import get_sentences
+
+# Minimum fuzz.token_set_ratio for an english sentence to count as kept
+SCORE_CUTOFF = 65
+# Maximum number of english sentences kept per simple sentence (the
+# process.extractBests default)
+MATCH_LIMIT = 5
+
+
+# Indexing
+class SentenceIndex:
+    """
+    Index of an article's english sentences, for finding the sentences most
+    similar to a simple sentence by fuzz.token_set_ratio without scoring every
+    sentence.
+
+    token_set_ratio is the best of three ratios (2 * matching characters /
+    total length) between the sorted token intersection and each sentence's
+    tokens (intersection first, then the rest, sorted). Matching characters
+    are never more than the longest common subsequence, so each ratio can be
+    bounded:
+        - intersection vs. either sentence's tokens: the intersection is a
+          prefix of them, so at most 2 * len(intersection) / total length
+        - the two sentences' tokens: at most 2 * shared characters / total
+          length, and, tighter, 2 * longest common subsequence / total length
+
+    Sentences are processed and tokenized once, into a token index (which
+    sentences contain each token) and per-sentence character counts, giving
+    the cheap bounds for every sentence at once. Sentences passing those get
+    the longest common subsequence bound (bit-parallel), and only sentences
+    passing that are scored with fuzz.token_set_ratio itself, so the matches
+    (and their order) are exactly those of process.extractBests.
+    """
+
+    def __init__(self, sentences):
+        """
+        In:
+            sentences = List of cleaned english article sentences
+        """
+        self.sentences = list(sentences)
+        # Processed as process.extractWithoutOrder processes choices
+        self.processed = [full_process(sentence, force_ascii=True)
+                          for sentence in self.sentences]
+        self.token_sets = [sorted(set(processed.split()))
+                           for processed in self.processed]
+
+        self.vocabulary = {}
+        rows = []
+        columns = []
+        for row, tokens in enumerate(self.token_sets):
+            for token in tokens:
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(
+                    token, len(self.vocabulary)))
+
+        shape = (len(self.sentences), len(self.vocabulary))
+        token_lengths = np.array([len(token) for token in self.vocabulary])
+        self.token_index = csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=shape)
+        self.token_length_index = csr_matrix(
+            (token_lengths[columns] if columns else np.ones(0),
+             (rows, columns)), shape=shape)
+
+        # Length of the space separated token set ("" if there are none)
+        self.set_lengths = np.array(
+            [sum(len(token) + 1 for token in tokens) - 1 if tokens else 0
+             for tokens in self.token_sets], dtype=float)
+
+        set_strings = [" ".join(tokens) for tokens in self.token_sets]
+        self.characters = {character: column for column, character
+                           in enumerate(sorted(set("".join(set_strings))))}
+        self.character_counts = np.zeros((len(self.sentences),
+                                          len(self.characters)))
+        for row, set_string in enumerate(set_strings):
+            for character in set_string:
+                self.character_counts[row, self.characters[character]] += 1
+
+    def get_score_bounds(self, processed_query):
+        """
+        In:
+            processed_query = Simple sentence, processed as
+                process.extractWithoutOrder processes the query
+
+        Out:
+            intersection_bounds = NumPy array of upper bounds on each english
+                sentence's intersection vs. token set ratios
+            character_bounds = NumPy array of upper bounds on each english
+                sentence's tokens vs. query tokens ratio, from the characters
+                they share
+
+            Bounds are 0-100 scores, before rounding
+        """
+        if not processed_query:
+            # Only equal (empty) sentences score above 0
+            intersection_bounds = np.array(
+                [0 if processed else 100 for processed in self.processed],
+                dtype=float)
+            return intersection_bounds, np.zeros(len(self.sentences))
+
+        query_tokens = sorted(set(processed_query.split()))
+        query_vector = np.zeros(len(self.vocabulary))
+        for token in query_tokens:
+            if token in self.vocabulary:
+                query_vector[self.vocabulary[token]] = 1
+
+        shared_tokens = self.token_index @ query_vector
+        shared_lengths = self.token_length_index @ query_vector
+        intersection_lengths = np.where(
+            shared_tokens > 0, shared_lengths + shared_tokens - 1, 0)
+
+        query_set_string = " ".join(query_tokens)
+        query_length = len(query_set_string)
+        query_counts = np.zeros(len(self.characters))
+        for character in query_set_string:
+            if character in self.characters:
+                query_counts[self.characters[character]] += 1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intersection_bounds = np.maximum(
+                2 * intersection_lengths /
+                (intersection_lengths + query_length),
+                2 * intersection_lengths /
+                (intersection_lengths + self.set_lengths))
+            character_bounds = \
+                2 * np.minimum(self.character_counts, query_counts).sum(1) / \
+                (query_length + self.set_lengths)
+        intersection_bounds = np.nan_to_num(intersection_bounds) * 100
+        character_bounds = np.nan_to_num(character_bounds) * 100
+
+        # Sentences with nothing left once processed always score 0
+        intersection_bounds[self.set_lengths == 0] = 0
+        character_bounds[self.set_lengths == 0] = 0
+        return intersection_bounds, character_bounds
+
+    def find_matches(self, query, score_cutoff=SCORE_CUTOFF,
+                     limit=MATCH_LIMIT):
+        """
+        In:
+            query = Cleaned simple article sentence
+            score_cutoff = Minimum fuzz.token_set_ratio of a match
+            limit = Maximum number of matches
+
+        Out:
+            matches = List of up to limit (english sentence, score) tuples
+                scoring at least score_cutoff, best first; the same as
+                process.extractBests(query, sentences,
+                scorer=fuzz.token_set_ratio, score_cutoff=score_cutoff,
+                limit=limit)
+        """
+        if not self.sentences:
+            return []
+
+        # Processed as process.extractWithoutOrder processes the query
+        processed_query = full_process(full_process(query), force_ascii=True)
+        query_tokens = sorted(set(processed_query.split()))
+
+        # Scores are rounded, so anything within 0.5 of the cutoff may reach it
+        minimum_bound = score_cutoff - 0.5 - 1e-9
+        intersection_bounds, character_bounds = \
+            self.get_score_bounds(processed_query)
+        candidates = np.flatnonzero(
+            np.maximum(intersection_bounds, character_bounds) >= minimum_bound)
+
+        matches = []
+        for candidate in candidates:
+            if intersection_bounds[candidate] < minimum_bound and \
+                    self.get_lcs_bound(query_tokens, candidate) < \
+                    minimum_bound:
+                continue
+
+            score = fuzz.token_set_ratio(processed_query,
+                                         self.processed[candidate],
+                                         full_process=False)
+            if score >= score_cutoff:
+                matches.append((self.sentences[candidate], score))
+
+        return heapq.nlargest(limit, matches, key=lambda match: match[1])
+
+    def get_lcs_bound(self, query_tokens, candidate):
+        """
+        In:
+            query_tokens = Sorted list of the processed simple sentence's
+                distinct tokens
+            candidate = Index of an english sentence
+
+        Out:
+            Upper bound on the english sentence's tokens vs. query tokens
+                ratio (as a 0-100 score, before rounding), from the longest
+                common subsequence of the two strings token_set_ratio compares
+        """
+        tokens = self.token_sets[candidate]
+        token_set = set(tokens)
+        query_token_set = set(query_tokens)
+
+        # Built as fuzz.token_set_ratio builds them
+        intersection = " ".join(token for token in query_tokens
+                                if token in token_set)
+        combined_query = (intersection + " " + " ".join(
+            token for token in query_tokens
+            if token not in token_set)).strip()
+        combined_sentence = (intersection + " " + " ".join(
+            token for token in tokens
+            if token not in query_token_set)).strip()
+
+        # Both start with the intersection, which is always part of the
+        # longest common subsequence; only the rest needs comparing
+        prefix_length = len(os.path.commonprefix([combined_query,
+                                                  combined_sentence]))
+        query_rest = combined_query[prefix_length:]
+        lcs_length = prefix_length + get_lcs_length(
+            get_character_masks(query_rest), len(query_rest),
+            combined_sentence[prefix_length:])
+
+        return 200 * lcs_length / (len(combined_query) +
+                                   len(combined_sentence))
+
+
+def get_character_masks(text):
+    """
+    In:
+        text = String
+
+    Out:
+        masks = Dictionary of each character in text to a bit mask of the
+            positions it is at
+    """
+    masks = {}
+    for position, character in enumerate(text):
+        masks[character] = masks.get(character, 0) | 1 << position
+    return masks
+
+
+def get_lcs_length(masks, length, text):
+    """
+    In:
+        masks = Character masks of a string (see get_character_masks)
+        length = Length of that string
+        text = String to compare it to
+
+    Out:
+        Length of the longest common subsequence of the two strings, computed
+            a whole row at a time on the bits of an integer (Hyyrö's
+            bit-parallel algorithm)
+    """
+    all_positions = (1 << length) - 1
+    row = all_positions
+    for character in text:
+        matches = row & masks.get(character, 0)
+        row = ((row + matches) | (row - matches)) & all_positions
+    return length - bin(row).count("1")
+
+
+# Labeling functions
+def select_sentences_from_english(english_sentences, simple_sentences):
+    """
+    In:
+        english_sentences = List of cleaned english article sentences
+        simple_sentences = List of cleaned simple article sentences
+
+    Out:
+        selected_sentences = Set of sentences selected from article most
+            similar to those in the simple article; the same as
+            select_sentences_from_english_reference, but using a
+            SentenceIndex so most sentence pairs are never scored
+    """
+    sentence_index = SentenceIndex(english_sentences)
+
+    selected_sentences = set()
+    for sentence in simple_sentences:
+        selected_sentences.update(
+            english_sentence for english_sentence, score
+            in sentence_index.find_matches(sentence))
+
+    return selected_sentences
+
+
+def select_sentences_from_english_reference(english_sentences,
+                                            simple_sentences):
+    """
+    In:
+        english_sentences = List of cleaned english article sentences
+        simple_sentences = List of cleaned simple article sentences
+
+    Out:
+        selected_sentences = Set of tuples of sentences selected from article
+            most similar to those in the simple article
+    """
+    selected_sentences = set()
+    for sentence in simple_sentences:
+        closest_sentences_scores = process.extractBests(
+            sentence, english_sentences, scorer=fuzz.token_set_ratio,
+            score_cutoff=SCORE_CUTOFF)
+        if closest_sentences_scores:
+            selected, scores = zip(*closest_sentences_scores)
+        else:
+            selected = set()
+        selected_sentences = selected_sentences | set(selected)
+
+    return selected_sentences
+
+
+def get_labeled_english_sentences(english_article, simple_article):
+    """
+    In:
+        english_article = English article to compare
+        simple_article = Simple article to compare
+
+    Out:
+        Tuple of:
+            english_sentences = List of sentences in english article
+            english_included = List 1 (Yes) or 0 (No) flag of whether or not
+                sentence is "included" in simple article
+    """
+    english_sentences = get_sentences(english_article)
+    simple_sentences = get_sentences(simple_article)
+    selected_sentences = select_sentences_from_english(english_sentences,
+                                                       simple_sentences)
+    english_included = [1 if sentence in selected_sentences else 0
+                        for sentence in english_sentences]
+    return english_sentences, english_included
@@ -0,0 +1,300 @@
+# Import Dependencies
+import contextlib
+import hashlib
+import os
+import threading
+import time
+
+from request_tracing import metrics
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: locks are only taken within a process
+    fcntl = None
+
+COALESCED_METRIC = "quikipedia_coalesced_total"
+
+metrics.describe(COALESCED_METRIC, "counter",
+                 "Calls that waited on an identical call rather than running "
+                 "their own, by flight and scope (thread: within a process, "
+                 "process: on a lock file shared by the workers)")
+
+
+# Within a process
+class FlightAbandoned(Exception):
+    """
+    Raised to callers waiting on a call whose leader stopped without
+    finishing or failing it (e.g. a streamed summary whose client went
+    away); they try again rather than fail.
+    """
+
+
+class Flight:
+    """
+    One in-progress call, and the result (or error) its waiters get.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller
+    runs the function, and callers arriving while it runs wait for it and
+    share its result (or its exception) instead of running their own.
+    Nothing is kept once the call finishes; caching results is left to the
+    caller. Callers that must lead the call themselves (e.g. to stream its
+    progress) use begin, wait and finish directly.
+    """
+
+    def __init__(self, name):
+        """
+        In:
+            name = Name the flight's metrics are labelled with (e.g. "fetch")
+        """
+        self.name = name
+        self.lock = threading.Lock()
+        self.flights = {}  # Key: Flight
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, function, *args):
+        """
+        In:
+            key = Key identifying the call (e.g. the article title)
+            function = Function to call
+            args = Arguments to call it with
+
+        Out:
+            function(*args), from this call or from an identical one already
+                in progress
+        """
+        while True:
+            flight, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return self.wait(flight)
+            except FlightAbandoned:
+                continue
+
+        try:
+            result = function(*args)
+        except BaseException as error:
+            self.finish(key, flight, error=error)
+            raise
+
+        self.finish(key, flight, result)
+        return result
+
+    def begin(self, key):
+        """
+        In:
+            key = Key identifying the call
+
+        Out:
+            flight = Flight of the call in progress for the key
+            leader = Whether this caller started it, and so must run it and
+                finish the flight; otherwise it waits for it
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            metrics.increment(COALESCED_METRIC, (("flight", self.name),
+                                                 ("scope", "thread")))
+        return flight, leader
+
+    def wait(self, flight):
+        """
+        In:
+            flight = Flight of a call led by another caller
+
+        Out:
+            The call's result, once it finishes; raises its exception if it
+                failed (FlightAbandoned if its leader gave up on it)
+        """
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def finish(self, key, flight, result=None, error=None):
+        """
+        In:
+            key = Key the flight was begun with
+            flight = Flight this caller leads
+            result = Result of the call
+            error = Exception the call failed with, if it did
+
+        Out:
+            Hands the result (or error) to the flight's waiters, and lets the
+                next call for the key run
+        """
+        flight.result = result
+        flight.error = error
+        with self.lock:
+            del self.flights[key]
+        flight.done.set()
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of calls run, calls that waited on one
+                in progress instead, and calls in progress now
+        """
+        with self.lock:
+            return {"calls": self.calls, "coalesced": self.coalesced,
+                    "in_flight": len(self.flights)}
+
+
+# Across processes
+class FileLocks:
+    """
+    Exclusive locks shared by every process on the machine (e.g. server
+    workers), one lock file per key in `directory`, named after the key's
+    hash, so only callers of the same key ever wait on each other. A lock
+    file is removed by its holder when it is done, so they don't pile up.
+    They are flock locks, so the OS releases them if their holder dies.
+    Taking one waits at most `timeout` seconds; after that the caller goes
+    ahead without it, so a stuck process can't hold the others up.
+    """
+
+    def __init__(self, name, directory, timeout=15, poll_interval=0.01):
+        """
+        In:
+            name = Name the locks' metrics are labelled with (e.g. "fetch")
+            directory = Directory for the lock files (created if missing)
+            timeout = Most seconds to wait for a lock
+            poll_interval = Seconds between attempts to take a held lock
+        """
+        self.name = name
+        self.directory = directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.timeouts = 0
+
+    def get_filename(self, key):
+        """
+        In:
+            key = Lock key
+
+        Out:
+            Lock file the key's lock is taken on
+        """
+        digest = hashlib.blake2b(key.encode("UTF-8"), digest_size=16)
+        return os.path.join(self.directory, "%s-%s.lock" % (
+            self.name, digest.hexdigest()))
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        """
+        In:
+            key = Lock key (e.g. the article title)
+
+        Out:
+            Context manager holding the key's lock for its block (or not, if
+                it couldn't be taken within the timeout, or this platform
+                has no flock)
+        """
+        if fcntl is None:
+            yield
+            return
+
+        filename = self.get_filename(key)
+        lock_file, locked = self.acquire(filename)
+        try:
+            yield
+        finally:
+            if locked:
+                # Removed before unlocking, so a process waiting on it finds
+                # it gone and takes the lock on a new file
+                os.remove(filename)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def acquire(self, filename):
+        """
+        In:
+            filename = Key's lock file
+
+        Out:
+            lock_file = Lock file, open
+            locked = Whether its lock was taken within the timeout; waiting
+                for another process (necessarily on the same key) is counted
+                as a coalesced call
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            lock_file = open(filename, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                if not waited:
+                    waited = True
+                    with self.lock:
+                        self.waits += 1
+                    metrics.increment(COALESCED_METRIC,
+                                      (("flight", self.name),
+                                       ("scope", "process")))
+                locked = self.wait(lock_file, deadline)
+
+            if not locked:
+                with self.lock:
+                    self.timeouts += 1
+                return lock_file, False
+
+            # The lock was taken on a file its last holder has since removed
+            # (see hold); start over on the current one
+            try:
+                if os.stat(filename).st_ino == \
+                        os.fstat(lock_file.fileno()).st_ino:
+                    return lock_file, True
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    def wait(self, lock_file, deadline):
+        """
+        In:
+            lock_file = Open lock file, locked by another process
+            deadline = time.monotonic() to stop waiting at
+
+        Out:
+            Whether the lock was taken before the deadline
+        """
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                pass
+
+        return False
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of how many times a lock was held by another process
+                (or thread) with the same key and had to be waited for, and
+                how many of those waits timed out
+        """
+        with self.lock:
+            return {"waits": self.waits, "timeouts": self.timeouts}
@@ -0,0 +1,59 @@
+# Import Dependencies
+import os
+
+
+class SortedKeys:
+    """
+    Sequence view of the sorted keys of an index (e.g. the titles of a
+    memory mapped file), read one at a time as bisect asks for them, so
+    binary searches don't copy the keys out first.
+    """
+
+    def __init__(self, get_key, count):
+        """
+        In:
+            get_key = Function taking an entry index and returning its key
+            count = Number of entries
+        """
+        self.get_key = get_key
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.get_key(i)
+
+
+def write_sectioned_file(path, header_format, header_fields, sections):
+    """
+    In:
+        path = File to write
+        header_format = struct.Struct of the header, ending with one offset
+            per section
+        header_fields = Header fields before the section offsets
+        sections = List of the bytes of each section, in file order
+
+    Out:
+        Writes the header, then the sections, each starting 8-byte aligned
+            (so arrays in them can be memory mapped in place), to a temporary
+            file, then moves it into place, so readers never see a partly
+            written file
+    """
+    starts = []
+    position = header_format.size
+    for section in sections:
+        position += -position % 8
+        starts.append(position)
+        position += len(section)
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as output_file:
+        output_file.write(header_format.pack(*header_fields, *starts))
+        for start, section in zip(starts, sections):
+            output_file.write(b"\0" * (start - output_file.tell()))
+            output_file.write(section)
+        output_file.flush()
+        os.fsync(output_file.fileno())
+
+    os.replace(temporary_path, path)
@@ -89,15 +89,104 @@ $(document).ready(function() {
           $("#more_info_link").show();
         }
       },
-      error: function(result) {}
+      error: function(result) {
+        if (result.status == 503) {
+          // Server busy: too many summaries in progress
+          show_summary(topic, result.responseJSON["error"]);
+        }
+      }
     })
   }
 
+  show_summary = function(topic, summary_text) {
+    /*
+    IN:
+      topic = String entered by user into the input bar topic to summarize
+      summary_text = Summary HTML (so far) to output
+
+    OUT:
+      Summary output to page, replacing the loading gif
+    */
+    $("#summarized_topic").html(to_title_case(topic));
+    $("#summary_p").html(summary_text);
+
+    $("#loading_gif").hide();
+    $("#summarized_topic").show();
+    $("#summary_p").show();
+    $("#more_info_link").show();
+  }
+
+  var STREAM_RETRIES = 3;  // Retries of a stream the server is too busy for
+
+  stream_topic = function(topic, retries){
+    /*
+    IN:
+      topic = String entered by user into the input bar topic to summarize
+      retries = Times to try again if the server is too busy (default
+        STREAM_RETRIES)
+
+    OUT:
+      Wikipeida article summarized and output to page section by section, as
+      the server streams it (trying again after the wait the server asks for
+      if it's too busy, and falling back to send_topic if the stream can't be
+      opened)
+    */
+    if (retries === undefined) {
+      retries = STREAM_RETRIES;
+    }
+    var source = new EventSource("/summarize/stream?topic=" +
+                                 encodeURIComponent(topic));
+    var summary_text = "";
+    var received = false;
+
+    source.addEventListener("topic", function(event) {
+      received = true;
+      var wiki_href_base = "https://en.wikipedia.org/wiki/"
+      $("#more_info_link").attr("href", wiki_href_base +
+                                JSON.parse(event.data)["wiki_topic"]);
+    });
+
+    source.onmessage = function(event) {
+      summary_text += JSON.parse(event.data)["html"];
+      show_summary(topic, summary_text);
+    };
+
+    source.addEventListener("done", function(event) {
+      source.close();
+      show_summary(topic, JSON.parse(event.data)["summary"]);
+    });
+
+    source.addEventListener("error", function(event) {
+      source.close();
+      if (event.data) {
+        var data = JSON.parse(event.data);
+        if (data["retry_after"] !== undefined && retries > 0) {
+          // Server busy: try again once it says to
+          setTimeout(function() {
+            stream_topic(topic, retries - 1);
+          }, data["retry_after"] * 1000);
+        } else {
+          // No Wikipedia page for the topic (or the server stayed busy)
+          show_summary(topic, data["error"]);
+        }
+      } else if (!received) {
+        // Connection failed before anything arrived
+        send_topic(topic);
+      }
+    });
+  }
+
   go = function() {
     // Get topic from input bar and pass to send_topic to send to server
     var topic = $("#topic_input").val();
     if (topic != "") {
-      send_topic(topic);
+      cancel_suggestions();
+
+      if (window.EventSource) {
+        stream_topic(topic);
+      } else {
+        send_topic(topic);
+      }
 
       // Prep page formatting for summary to be output
       $("#title_topic_box").css("margin-top", "0%");
@@ -109,4 +198,79 @@ $(document).ready(function() {
     }
   }
 
+  // Autocomplete: titles starting with what has been typed, most popular
+  // first, asked for once typing pauses
+  var SUGGEST_DELAY = 150;  // Milliseconds after the last keystroke
+  var suggestion_cache = {};
+  var suggest_timer = null;
+  var suggest_request = null;
+
+  show_suggestions = function(suggestions) {
+    /*
+    IN:
+      suggestions = Titles to offer
+
+    OUT:
+      Titles listed under the input bar, replacing any listed before
+    */
+    var datalist = $("#topic_suggestions").empty();
+    $.each(suggestions, function(i, title) {
+      datalist.append($("<option>").attr("value", title));
+    });
+  }
+
+  cancel_suggestions = function() {
+    // Drop any pending or in flight suggestion request
+    clearTimeout(suggest_timer);
+    if (suggest_request) {
+      suggest_request.abort();
+      suggest_request = null;
+    }
+  }
+
+  suggest_topics = function(query) {
+    /*
+    IN:
+      query = Start of a topic typed into the input bar
+
+    OUT:
+      Titles starting with the query, from the server (or remembered from
+      an earlier request), listed under the input bar
+    */
+    cancel_suggestions();
+    if ($.trim(query) == "") {
+      show_suggestions([]);
+    } else if (suggestion_cache.hasOwnProperty(query)) {
+      show_suggestions(suggestion_cache[query]);
+    } else {
+      suggest_request = $.ajax({
+        type: "GET",
+        url: "/suggest",
+        dataType: "json",
+        data: {"q": query},
+
+        success: function(data) {
+          suggestion_cache[query] = data["suggestions"];
+          // Ignore answers to a query the user has already typed past
+          if ($("#topic_input").val() == query) {
+            show_suggestions(data["suggestions"]);
+          }
+        },
+        complete: function(request) {
+          if (suggest_request === request) {
+            suggest_request = null;
+          }
+        }
+      });
+    }
+  }
+
+  $("#topic_input").on("input", function() {
+    var query = $(this).val();
+    clearTimeout(suggest_timer);
+    suggest_timer = setTimeout(function() {
+      suggest_topics(query);
+    }, SUGGEST_DELAY);
+  });
+
 });
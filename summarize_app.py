@@ -1,60 +1,281 @@
 # Import Dependencies
+import contextlib
 import flask
-from urllib.request import urlopen
-import re
+import json
+import os
 
 # Most of the "magic" happens in these two files:
 from wikipedia_page_cleaning import clean_wiki_page
-from wiki_summarization import summarize_article
+from wiki_summarization import summarize_article, \
+    summarize_article_within_budget, summarize_article_by_section, \
+    get_model_version, sentence_feature_cache
+from wiki_summary_html import add_html_tages_to_summary
+
+# Raw article text is cached locally, so popular topics skip Wikipedia, and
+# finished summaries are cached, so unchanged articles skip summarization
+from wiki_article_cache import ArticleCache
+from summary_cache import SummaryCache, make_summary_key
+
+# Pooled, keep-alive Wikipedia client with timeouts, retries and redirects
+from wiki_fetch import WikiClient, format_topic
+
+# Many topics per request, fetched concurrently and classified in batches
+from batch_summarization import summarize_topics
+
+# Summaries precomputed for a list of topics, memory mapped
+from summary_store import SummaryStore
+
+# Titles and redirects resolved locally, before anything is fetched
+from title_index import TitleIndexFile
+
+# Popular titles for the topic box's autocomplete
+from title_suggest import SuggestionIndex, MAX_SUGGESTIONS
+
+# Pages served from memory, and a cap on summaries running at once
+from app_serving import StaticAssets, ConcurrencyLimiter, ServerOverloaded, \
+    OVERLOADED_MESSAGE, make_overloaded_response, install_request_tracing
+
+# Per-stage timings and latency histograms
+from request_tracing import metrics, timed_stage
+
+# Concurrent requests for the same article or summary wait on one another
+from single_flight import SingleFlight, FlightAbandoned, FileLocks
+
+# ---------- WIKIPEDIA CLIENT -------------#
+
+WIKI_TIMEOUT = (3.05, 10)  # Seconds to (connect, read)
+WIKI_RETRIES = 3
+WIKI_POOL_SIZE = 10
+
+wiki_client = WikiClient(timeout=WIKI_TIMEOUT, retries=WIKI_RETRIES,
+                         pool_size=WIKI_POOL_SIZE)
+
+# ---------- ARTICLE CACHE -------------#
+
+ARTICLE_CACHE_PATH = "article_cache.sqlite"
+ARTICLE_CACHE_MAX_BYTES = 256 * 2 ** 20  # 256 MB
+ARTICLE_CACHE_TTL = 60 * 60  # Seconds before asking Wikipedia for changes
+
+article_cache = ArticleCache(ARTICLE_CACHE_PATH, ARTICLE_CACHE_MAX_BYTES,
+                             ARTICLE_CACHE_TTL, fetch=wiki_client.fetch_raw)
+
+# ---------- SUMMARY CACHE -------------#
+
+SUMMARY_CACHE_MAX_ENTRIES = 1000  # Summaries kept in memory
+SUMMARY_CACHE_PATH = "summary_cache.sqlite"  # None to keep in memory only
+SUMMARY_CACHE_MAX_DISK_ENTRIES = 100000
+
+summary_cache = SummaryCache(SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_PATH,
+                             SUMMARY_CACHE_MAX_DISK_ENTRIES)
+
+# Articles classified per model.predict call by /summarize/batch
+SUMMARIZE_BATCH_SIZE = 50
+
+# ---------- PRECOMPUTED SUMMARIES -------------#
+
+# Built (and rebuilt) with summary_store.py; topics in it are answered
+# without fetching or summarizing them
+SUMMARY_STORE_PATH = "summary_store.bin"
+
+summary_store = None
+if os.path.exists(SUMMARY_STORE_PATH):
+    summary_store = SummaryStore(SUMMARY_STORE_PATH)
+
+# ---------- TITLE INDEX -------------#
+
+# Built with title_index.py from a dump or title list; topics in it are
+# fetched by their canonical title (one fetch, even for redirects), the rest
+# lowercased and fetched following redirects
+TITLE_INDEX_PATH = "title_index.bin"
+
+title_index = None
+if os.path.exists(TITLE_INDEX_PATH):
+    title_index = TitleIndexFile(TITLE_INDEX_PATH)
+
+# ---------- AUTOCOMPLETE -------------#
+
+# Built with title_suggest.py from a list of titles and their popularity;
+# without one, /suggest lists titles from the title index (unranked)
+SUGGESTION_INDEX_PATH = "suggestions.npz"
+SUGGEST_MAX_AGE = 60 * 60  # Seconds browsers reuse a prefix's suggestions
+
+suggestion_index = None
+if os.path.exists(SUGGESTION_INDEX_PATH):
+    suggestion_index = SuggestionIndex.load(SUGGESTION_INDEX_PATH)
+
+# ---------- OVERLOAD PROTECTION -------------#
+
+# Per process; requests past the cap wait briefly for a slot, then get a 503
+MAX_CONCURRENT_SUMMARIES = 4
+SUMMARY_QUEUE_TIMEOUT = 0.5  # Seconds to wait for a slot
+OVERLOAD_RETRY_AFTER = 2  # Seconds overloaded clients are told to wait
+
+summary_limiter = ConcurrencyLimiter(MAX_CONCURRENT_SUMMARIES,
+                                     SUMMARY_QUEUE_TIMEOUT,
+                                     OVERLOAD_RETRY_AFTER)
+
+# ---------- REQUEST COALESCING -------------#
+
+# Requests in a process wanting an article (or summary) already being
+# fetched (or summarized) wait for it rather than doing it again. Worker
+# processes also take a lock file per article (and summary) first, so the
+# others wait and then read it from the shared caches
+FLIGHT_LOCK_DIRECTORY = "flight_locks"  # None to only coalesce in a process
+FLIGHT_LOCK_TIMEOUT = 15  # Most seconds to wait for another process
+
+fetch_flight = SingleFlight("fetch")
+summary_flight = SingleFlight("summary")
+
+fetch_locks = summary_locks = None
+if FLIGHT_LOCK_DIRECTORY is not None:
+    fetch_locks = FileLocks("fetch", FLIGHT_LOCK_DIRECTORY,
+                            timeout=FLIGHT_LOCK_TIMEOUT)
+    summary_locks = FileLocks("summary", FLIGHT_LOCK_DIRECTORY,
+                              timeout=FLIGHT_LOCK_TIMEOUT)
+
+# ---------- STATIC FILES -------------#
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HOMEPAGE_FILENAME = "summarize.html"
+STATIC_DIRECTORY = "static"
+STATIC_MAX_AGE = 10 * 60  # Seconds browsers reuse static files unchecked
+
+# ---------- TRACING -------------#
+
+SERVER_TIMING = False  # Send each stage's time in a Server-Timing header
+PROFILE_DIRECTORY = None  # Where "?profile=1" writes profiles; None disables
 
 # ---------- URLS AND WEB PAGES -------------#
 
-# Initialize the app
-app = flask.Flask(__name__)
+routes = flask.Blueprint("summarize_app", __name__)
+
+
+def create_app(debug=False, server_timing=SERVER_TIMING,
+               profile_directory=PROFILE_DIRECTORY):
+    """
+    In:
+        debug = Re-read the homepage and static files when they change on
+            disk (for local development)
+        server_timing = Send each stage's time in a Server-Timing header
+        profile_directory = Directory requests with "profile=1" write a
+            sampling profile to; None to not allow profiling
+
+    Out:
+        app = Flask app serving Quikipedia; the homepage and static files are
+            read into memory once and served with ETags (and gzipped),
+            summarizing past MAX_CONCURRENT_SUMMARIES at once answers 503,
+            and every request is traced (see /metrics)
+    """
+    app = flask.Flask(__name__, static_folder=None)
+    app.register_blueprint(routes)
+    app.register_error_handler(ServerOverloaded, make_overloaded_response)
+    install_request_tracing(app, server_timing, profile_directory)
+
+    app.extensions["homepage"] = StaticAssets(
+        APP_DIR, [HOMEPAGE_FILENAME], check_modified=debug)
+    app.extensions["static_assets"] = StaticAssets.from_directory(
+        APP_DIR, [STATIC_DIRECTORY], max_age=STATIC_MAX_AGE,
+        check_modified=debug)
+
+    return app
 
 
 # Homepage
-@app.route("/")
+@routes.route("/")
 def homepage():
     """
     Serve homepage: summarize.html
     """
-    with open("summarize.html", "r") as homepage:
-        return homepage.read()
+    return flask.current_app.extensions["homepage"].make_response(
+        HOMEPAGE_FILENAME)
+
 
+@routes.route("/static/<path:filename>")
+def static_file(filename):
+    """
+    Serve the CSS, JS and images under static/
+    """
+    return flask.current_app.extensions["static_assets"].make_response(
+        STATIC_DIRECTORY + "/" + filename)
 
-@app.route("/summarize", methods=["POST"])
+
+def is_summary_limit(value):
+    """
+    In:
+        value = "max_sentences" or "max_characters" from a request's json
+
+    Out:
+        Whether it is a valid summary length limit: a non-negative integer,
+            or None for no limit
+    """
+    if value is None:
+        return True
+
+    return isinstance(value, int) and not isinstance(value, bool) and \
+        value >= 0
+
+
+@routes.route("/summarize", methods=["POST"])
 def summarize():
     """
     When A POST request with json data is made to this url,
     Read the topic from the json, pull and summarize the wikipedia article,
-    then return back to the web browser
+    then return back to the web browser.
+
+    The json can also limit the summary to "max_sentences" and / or
+    "max_characters" (non-negative integers; anything else is answered with
+    400), filled with the highest scoring sentences, or (with "early_exit":
+    true) with the first included sentences of the article. Full summaries
+    of topics in the precomputed summary store are read from it, without
+    fetching the article
     """
     data = flask.request.json
     topic = data["topic"]
+    max_sentences = data.get("max_sentences")
+    max_characters = data.get("max_characters")
+    early_exit = bool(data.get("early_exit", False))
+
+    for name, limit in (("max_sentences", max_sentences),
+                        ("max_characters", max_characters)):
+        if not is_summary_limit(limit):
+            return flask.jsonify({"error": "\"%s\" must be a non-negative "
+                                           "integer" % name}), 400
 
-    # Format topic for API / url
-    topic = topic.replace(" ", "_")
-    topic = topic.lower()
+    # Format topic for API / url, resolving redirects locally if possible
+    topic = resolve_topic(topic)
+
+    # Precomputed summary, if the topic has one
+    if max_sentences is None and max_characters is None:
+        stored = get_stored_summary(topic)
+        if stored is not None:
+            topic, summary_text = stored
+            return flask.jsonify({"summary": summary_text,
+                                  "wiki_topic": topic})
 
     try:
-        # Make initial API call
-        raw_english_text = urlopen("https://en.wikipedia.org/w/index.php?"
-                                   "action=raw&title="+topic)
-        raw_english_text = raw_english_text.read().decode('UTF-8')
-
-        # Call the API again if redirect is required
-        if raw_english_text[:9] == "#REDIRECT" or \
-                raw_english_text[:9] == "#redirect":
-            topic = re.search(r"\[\[.*\]\]", raw_english_text).group()[2:-2]
-            topic = topic.replace(" ", "_")
-            raw_english_text = urlopen("https://en.wikipedia.org/w/index.php?"
-                                       "action=raw&title="+topic)
-            raw_english_text = raw_english_text.read().decode('UTF-8')
-
-        # Clean and summarize the raw text recieved from the API
-        raw_english_text = clean_wiki_page(raw_english_text)
-        summary_text = summarize_article(raw_english_text, topic)
+        # Make API call(s) (or read from the cache), following redirects
+        topic, raw_english_text = fetch_article(topic)
+
+        # Clean and summarize the raw text recieved from the API, unless the
+        # same article has already been summarized by the same model
+        if max_sentences is None and max_characters is None:
+            summary_key = make_summary_key(topic, raw_english_text,
+                                           get_model_version())
+            summary_text = get_or_summarize(summary_key, summarize_article,
+                                            raw_english_text, topic)
+        else:
+            summary_options = json.dumps([max_sentences, max_characters,
+                                          early_exit])
+            summary_key = make_summary_key(topic, raw_english_text,
+                                           get_model_version(),
+                                           summary_options)
+            summary_text = get_or_summarize(
+                summary_key, summarize_article_within_budget,
+                raw_english_text, topic, max_sentences, max_characters,
+                early_exit)
+
+    except ServerOverloaded:
+        raise
 
     except:
         # Return error message if the user requests a article which doesn't
@@ -66,18 +287,9 @@ def summarize():
     # CODE TO DO THE SAME USING SIMPLE WIKIPEDIA INSTEAD, KEEPING FOR POTENTIAL
     # FUTURE USE:
     """
+    simple_wiki_client = WikiClient(SIMPLE_WIKIPEDIA_RAW_URL)
     try:
-        raw_simple_text = urlopen("https://simple.wikipedia.org/w/index.php?"
-                                  "action=raw&title="+topic)
-        raw_simple_text = raw_simple_text.read().decode('UTF-8')
-
-        if raw_simple_text[:9] == "#REDIRECT" or \
-                raw_simple_text[:9] == "#redirect":
-            topic = re.search(r"\[\[.*\]\]", raw_simple_text).group()[2:-2]
-            topic = topic.replace(" ", "_")
-            raw_simple_text = urlopen("https://simple.wikipedia.org/w/index."
-                                      "php?action=raw&title="+topic)
-            raw_simple_text = raw_simple_text.read().decode('UTF-8')
+        topic, raw_simple_text = simple_wiki_client.fetch_article(topic)
 
         raw_simple_text = clean_wiki_page(raw_simple_text)
         summary_text = summarize_article(raw_simple_text, topic)
@@ -96,10 +308,375 @@ def summarize():
         }
     return flask.jsonify(results)
 
+
+def resolve_topic(topic):
+    """
+    In:
+        topic = Topic as entered by the user
+
+    Out:
+        Topic formatted for the API / url: its canonical title from the title
+            index, redirects already resolved (e.g. "usa" -> "United_States"),
+            or, for topics not in the index, formatted with format_topic
+    """
+    if title_index is not None:
+        with timed_stage("resolve"):
+            canonical = title_index.resolve(topic)
+        if canonical is not None:
+            return canonical.replace(" ", "_")
+
+    return format_topic(topic)
+
+
+def fetch_article(topic):
+    """
+    In:
+        topic = Topic formatted for the API / url
+
+    Out:
+        topic = Wikipedia topic reached after following redirects
+        raw_text = Raw article text (read from the cache when possible);
+            concurrent requests for the same topic share one fetch
+    """
+    with timed_stage("fetch"):
+        return fetch_flight.do(topic, wiki_client.fetch_article, topic,
+                               get_article_text)
+
+
+def get_article_text(title):
+    """
+    In:
+        title = Wikipedia article title
+
+    Out:
+        Raw article text from article_cache, holding the title's lock file
+            while it is read (or fetched), so worker processes wanting the
+            same article at once wait for the first to fetch it, then read
+            it from the shared cache
+    """
+    with hold_lock(fetch_locks, title.lower()):
+        return article_cache.get(title)
+
+
+def get_or_summarize(summary_key, summarize, raw_text, *args):
+    """
+    In:
+        summary_key = Summary key (see make_summary_key)
+        summarize = Summarization function taking the cleaned article and
+            args
+        raw_text = Raw article text
+        args = Further arguments to summarize
+
+    Out:
+        The cached summary, or else summarize(clean_wiki_page(raw_text),
+            *args) run once (in a summary slot; see limit_concurrency) for
+            every request wanting it at the same time, in this process or,
+            through the summary cache, any other worker
+    """
+    summary = summary_cache.get(summary_key)
+    if summary is None:
+        summary = summary_flight.do(summary_key, compute_summary, summary_key,
+                                    summarize, raw_text, args)
+    return summary
+
+
+def compute_summary(summary_key, summarize, raw_text, args):
+    """
+    In:
+        summary_key, summarize, raw_text, args = As for get_or_summarize
+
+    Out:
+        Summarizes the article and caches the summary, holding the summary's
+            lock file; if another worker cached it while this one waited for
+            the lock, that summary is used instead (the caller has already
+            counted it as a cache miss)
+    """
+    with hold_lock(summary_locks, summary_key):
+        summary = summary_cache.get(summary_key, count=False)
+        if summary is None:
+            summary = limit_concurrency(summarize, clean_wiki_page(raw_text),
+                                        *args)
+            summary_cache.put(summary_key, summary)
+
+        return summary
+
+
+def hold_lock(locks, key):
+    """
+    In:
+        locks = FileLocks, or None if locks aren't shared across processes
+        key = Lock key
+
+    Out:
+        Context manager holding the key's lock (doing nothing without locks)
+    """
+    if locks is None:
+        return contextlib.nullcontext()
+    return locks.hold(key)
+
+
+def get_stored_summary(topic):
+    """
+    In:
+        topic = Topic formatted for the API / url
+
+    Out:
+        (wiki_topic, summary) tuple from the precomputed summary store, or
+            None if the topic isn't in it (or it was made by another model)
+    """
+    if summary_store is None:
+        return None
+
+    with timed_stage("store_lookup"):
+        return summary_store.get(format_topic(topic), get_model_version())
+
+
+def limit_concurrency(summarize, *args):
+    """
+    In:
+        summarize = Summarization function
+        args = Arguments to call it with
+
+    Out:
+        summarize(*args), run once a summary slot is free (see
+            summary_limiter); raises ServerOverloaded if none frees up
+    """
+    with summary_limiter:
+        return summarize(*args)
+
+
+@routes.route("/summarize/stream")
+def summarize_stream():
+    """
+    When a GET request with a "topic" query parameter is made to this url,
+    pull and summarize the wikipedia article, streaming it back as
+    server-sent events section by section, so the lead section shows before
+    the rest of the article is processed: a "topic" event with the
+    "wiki_topic", then a message with the "html" of each summarized section,
+    then a "done" event with the whole "summary" (the same as /summarize
+    gives), or an "error" event (with "retry_after" seconds if the server is
+    too busy to summarize it now). Requests for an article another request
+    is already summarizing wait for it and get its summary in one message.
+    Topics in the precomputed summary store get their "topic" and "done"
+    events straight away
+    """
+    topic = resolve_topic(flask.request.args.get("topic", ""))
+
+    stored = get_stored_summary(topic)
+    if stored is not None:
+        return flask.Response(
+            [format_server_sent_event({"wiki_topic": stored[0]}, "topic"),
+             format_server_sent_event({"summary": stored[1]}, "done")],
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"})
+
+    def stream_summary(topic):
+        # Exception rather than a bare except, so a client disconnecting
+        # (GeneratorExit) still closes the stream
+        try:
+            topic, raw_english_text = fetch_article(topic)
+            yield format_server_sent_event({"wiki_topic": topic}, "topic")
+
+            summary_key = make_summary_key(topic, raw_english_text,
+                                           get_model_version())
+            summary_text = summary_cache.get(summary_key)
+            if summary_text is None:
+                summary_text = yield from stream_sections(
+                    summary_key, raw_english_text, topic)
+
+            yield format_server_sent_event({"summary": summary_text}, "done")
+
+        except ServerOverloaded as error:
+            yield format_server_sent_event(
+                {"error": OVERLOADED_MESSAGE,
+                 "retry_after": error.retry_after}, "error")
+
+        except Exception:
+            yield format_server_sent_event(
+                {"error": "Looks like there is no Wikipedia page for" +
+                 " \"%s\"!<br>Try another topic." % topic.replace("_", " ")},
+                "error")
+
+    return flask.Response(stream_summary(topic),
+                          mimetype="text/event-stream",
+                          headers={"Cache-Control": "no-cache",
+                                   "X-Accel-Buffering": "no"})
+
+
+def stream_sections(summary_key, raw_text, topic):
+    """
+    In:
+        summary_key = Summary key (see make_summary_key) of the article,
+            already looked up in the summary cache and missing
+        raw_text = Raw article text
+        topic = Wikipedia topic
+
+    Out:
+        Generator of a server-sent message with the "html" of each summarized
+            section, returning the whole summary (cached). Like
+            get_or_summarize, the article is summarized once for every
+            request wanting it at the same time: the first streams its
+            sections as they are summarized, and the others (or a worker
+            finding it summarized by another once it has the summary's lock
+            file) get the whole summary in one message
+    """
+    flight, leader = summary_flight.begin(summary_key)
+    if not leader:
+        try:
+            summary_text = summary_flight.wait(flight)
+        except FlightAbandoned:
+            summary_text = get_or_summarize(summary_key, summarize_article,
+                                            raw_text, topic)
+        yield format_server_sent_event({"html": summary_text})
+        return summary_text
+
+    try:
+        with hold_lock(summary_locks, summary_key):
+            summary_text = summary_cache.get(summary_key, count=False)
+            if summary_text is not None:
+                yield format_server_sent_event({"html": summary_text})
+            else:
+                # The slot is held only while summarizing, and released
+                # whether that finishes or the client goes away
+                summary_limiter.acquire()
+                try:
+                    sections = []
+                    for section in summarize_article_by_section(
+                            clean_wiki_page(raw_text), topic):
+                        sections.append(section)
+                        yield format_server_sent_event(
+                            {"html": add_html_tages_to_summary(section)})
+                finally:
+                    summary_limiter.release()
+
+                summary_text = add_html_tages_to_summary("".join(sections))
+                summary_cache.put(summary_key, summary_text)
+
+    except GeneratorExit:
+        # The client went away: requests waiting on this one summarize the
+        # article themselves
+        summary_flight.finish(summary_key, flight, error=FlightAbandoned())
+        raise
+    except BaseException as error:
+        summary_flight.finish(summary_key, flight, error=error)
+        raise
+
+    summary_flight.finish(summary_key, flight, summary_text)
+    return summary_text
+
+
+def format_server_sent_event(data, event=None):
+    """
+    In:
+        data = JSON serializable data to send
+        event = Event name (None for a plain message)
+
+    Out:
+        Server-sent event string
+    """
+    message = "data: %s\n\n" % json.dumps(data)
+    if event is not None:
+        message = "event: %s\n" % event + message
+
+    return message
+
+
+@routes.route("/summarize/batch", methods=["POST"])
+def summarize_batch():
+    """
+    When a POST request with json data {"topics": [...]} is made to this url,
+    pull and summarize the wikipedia article for every topic, streaming the
+    results back as newline-delimited json as they finish. Each line has the
+    requested "topic", the "wiki_topic" summarized, and its "summary" (or an
+    "error")
+    """
+    data = flask.request.json
+    topics = data["topics"]
+
+    # The whole batch takes one slot, held until the response closes
+    summary_limiter.acquire()
+    results = summarize_topics(topics, fetch_article, summary_cache,
+                               SUMMARIZE_BATCH_SIZE, WIKI_POOL_SIZE,
+                               resolve_topic)
+    response = flask.Response((json.dumps(result) + "\n"
+                               for result in results),
+                              mimetype="application/x-ndjson")
+    response.call_on_close(summary_limiter.release)
+    return response
+
+
+@routes.route("/suggest")
+def suggest():
+    """
+    When a GET request with a "q" query parameter is made to this url, return
+    the most popular titles starting with it (ignoring case) as json:
+    {"query": q, "suggestions": [...]}, at most "limit" (default and
+    maximum MAX_SUGGESTIONS) of them. Answered from memory, without touching
+    Wikipedia, so the topic box can ask on every (debounced) keystroke
+    """
+    query = flask.request.args.get("q", "")
+    limit = flask.request.args.get("limit", MAX_SUGGESTIONS, type=int)
+    limit = max(0, min(limit, MAX_SUGGESTIONS))
+
+    with timed_stage("suggest"):
+        if suggestion_index is not None:
+            suggestions = suggestion_index.suggest(query, limit)
+        elif title_index is not None:
+            suggestions = title_index.complete(query, limit)
+        else:
+            suggestions = []
+
+    response = flask.jsonify({"query": query, "suggestions": suggestions})
+    response.cache_control.public = True
+    response.cache_control.max_age = SUGGEST_MAX_AGE
+    return response
+
+
+@routes.route("/cache_stats")
+def cache_stats():
+    """
+    Return hit / miss / eviction counts of the article, summary and sentence
+    feature caches, the summary slots in use / turned away, requests
+    coalesced with identical ones in progress (and lock files waited for),
+    and (when there are ones) the summary store's hits, title index's
+    resolved lookups and suggestion index's size
+    """
+    results = {
+        "articles": article_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "sentence_features": sentence_feature_cache.stats(),
+        "concurrency": summary_limiter.stats(),
+        "coalescing": {"fetch": fetch_flight.stats(),
+                       "summary": summary_flight.stats()},
+        }
+    if fetch_locks is not None:
+        results["coalescing"]["fetch_locks"] = fetch_locks.stats()
+        results["coalescing"]["summary_locks"] = summary_locks.stats()
+    if summary_store is not None:
+        results["store"] = summary_store.stats()
+    if title_index is not None:
+        results["titles"] = title_index.stats()
+    if suggestion_index is not None:
+        results["suggestions"] = suggestion_index.stats()
+    return flask.jsonify(results)
+
+
+@routes.route("/metrics")
+def metrics_page():
+    """
+    Return the stage and request latency histograms and request counts, in
+    the Prometheus text format (each worker process reports its own)
+    """
+    return flask.Response(metrics.render(),
+                          content_type="text/plain; version=0.0.4")
+
 # --------- RUN WEB APP SERVER ------------#
 
-# For local development:
-app.run(debug=True)
+# For public web serving, run the app with several pre-forked workers, e.g.:
+#     gunicorn -c gunicorn_config.py summarize_app:app
+app = create_app()
 
-# For public web serving:
-# app.run(host='0.0.0.0', port=80)
+if __name__ == "__main__":
+    # For local development:
+    create_app(debug=True, server_timing=True,
+               profile_directory="profiles").run(debug=True)
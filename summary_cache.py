@@ -0,0 +1,201 @@
+# Import Dependencies
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Key functions
+def get_file_hash(filename):
+    """
+    In:
+        filename = Name of the file to hash (e.g. "prediction_model.pkl")
+
+    Out:
+        Hex digest of the file's contents; used as the model version, so
+            cached summaries are invalidated whenever the model file changes
+    """
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as hashfile:
+        for chunk in iter(lambda: hashfile.read(2 ** 20), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def make_summary_key(topic, raw_text, model_version, summary_options=None):
+    """
+    In:
+        topic = Topic of wikipedia article (used in the topic mention feature)
+        raw_text = Raw wikipedia article text
+        model_version = Version of the prediction model (see get_file_hash)
+        summary_options = String describing how the summary was made, if not
+            the default way (e.g. its length budget); None for the default
+
+    Out:
+        Hex digest identifying the summary; changes whenever the topic, the
+            article text, the model, or the summary options change
+    """
+    parts = (topic, raw_text, model_version)
+    if summary_options is not None:
+        parts += (summary_options,)
+
+    key_hash = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        part = part.encode("UTF-8")
+        key_hash.update(str(len(part)).encode("UTF-8") + b":" + part)
+
+    return key_hash.hexdigest()
+
+
+# Cache
+class SummaryCache:
+    """
+    Cache of finished summary HTML, held in memory (least recently used
+    entries evicted past `max_entries`) and optionally in a SQLite file
+    shared across restarts and worker processes (least recently used entries
+    evicted past `max_disk_entries`).
+    """
+
+    def __init__(self, max_entries=1000, path=None, max_disk_entries=100000):
+        """
+        In:
+            max_entries = Maximum number of summaries kept in memory
+            path = SQLite file to also store summaries in; None to only keep
+                them in memory
+            max_disk_entries = Maximum number of summaries kept on disk
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS summaries ("
+                    "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                    "last_access REAL NOT NULL)")
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS summaries_last_access "
+                    "ON summaries (last_access)")
+
+    def get(self, key, count=True):
+        """
+        In:
+            key = Summary key (see make_summary_key)
+            count = Whether to count the lookup as a hit or miss; False for
+                checking again for a summary already counted as missing
+                (e.g. once its lock is taken)
+
+        Out:
+            Cached summary, or None if it isn't cached
+        """
+        with self.lock:
+            summary = self.entries.get(key)
+            if summary is not None:
+                self.entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return summary
+
+            if self.connection is not None:
+                row = self.connection.execute(
+                    "SELECT summary FROM summaries WHERE key = ?",
+                    (key,)).fetchone()
+                if row:
+                    with self.connection:
+                        self.connection.execute(
+                            "UPDATE summaries SET last_access = ? "
+                            "WHERE key = ?", (time.time(), key))
+                    self.remember(key, row[0])
+                    if count:
+                        self.disk_hits += 1
+                    return row[0]
+
+            if count:
+                self.misses += 1
+            return None
+
+    def put(self, key, summary):
+        """
+        In:
+            key = Summary key (see make_summary_key)
+            summary = Summary to cache
+
+        Out:
+            Stores the summary in memory (and on disk, if enabled)
+        """
+        with self.lock:
+            self.remember(key, summary)
+
+            if self.connection is None:
+                return
+
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                    (key, summary, time.time()))
+                total_entries = self.connection.execute(
+                    "SELECT COUNT(*) FROM summaries").fetchone()[0]
+                if total_entries > self.max_disk_entries:
+                    self.connection.execute(
+                        "DELETE FROM summaries WHERE key IN (SELECT key FROM "
+                        "summaries ORDER BY last_access LIMIT ?)",
+                        (total_entries - self.max_disk_entries,))
+                    self.disk_evictions += \
+                        total_entries - self.max_disk_entries
+
+    def remember(self, key, summary):
+        """
+        In:
+            key = Summary key
+            summary = Summary to keep in memory
+
+        Out:
+            Stores the summary in memory, evicting the least recently used
+                summaries past max_entries (the caller holds the lock)
+        """
+        self.entries[key] = summary
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute_summary):
+        """
+        In:
+            key = Summary key (see make_summary_key)
+            compute_summary = Function (taking no arguments) returning the
+                summary, called only if it isn't cached
+
+        Out:
+            summary = Cached or freshly computed summary
+        """
+        summary = self.get(key)
+        if summary is None:
+            summary = compute_summary()
+            self.put(key, summary)
+
+        return summary
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of hit, disk hit, miss, and eviction counts, and the
+                number of summaries held in memory
+        """
+        with self.lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "disk_evictions": self.disk_evictions,
+                    "entries": len(self.entries)}
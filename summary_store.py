@@ -0,0 +1,430 @@
+# Import Dependencies
+import argparse
+import bisect
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from batch_summarization import summarize_topics
+from sorted_file import SortedKeys, write_sectioned_file
+from summary_cache import make_summary_key
+from wiki_fetch import WikiClient, format_topic
+from wiki_summarization import get_model_version
+
+# File layout (little-endian; each section starts 8-byte aligned):
+#     header = magic, format version, entry count, model version (16 bytes),
+#         offsets of the sections below
+#     key_offsets = uint64[count + 1], where each title starts in keys
+#     value_offsets = uint64[count + 1], where each value starts in values
+#     source_keys = 16 bytes per entry, the summary key (see
+#         make_summary_key) of the article text it was summarized from
+#     keys = UTF-8 titles (formatted with format_topic), sorted bytewise
+#     values = zlib compressed "wiki_topic\nsummary HTML" per entry
+STORE_MAGIC = b"QKSUMST1"
+STORE_VERSION = 1
+HEADER_FORMAT = struct.Struct("<8sIQ16s5Q")
+
+
+# Reading
+class SummaryStoreFile:
+    """
+    Summary store file (see write_summary_store), memory mapped read only:
+    titles are found by binary search over the sorted title index, and
+    summaries decompressed straight from the mapped pages, so opening it
+    reads nothing up front and every process serving it shares one copy.
+    """
+
+    def __init__(self, path):
+        """
+        In:
+            path = Summary store file
+        """
+        self.path = path
+        with open(path, "rb") as store_file:
+            self.stat = os.fstat(store_file.fileno())
+            self.buffer = mmap.mmap(store_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+
+        (magic, version, self.count, model_version, key_offsets_start,
+         value_offsets_start, source_keys_start, keys_start,
+         values_start) = HEADER_FORMAT.unpack_from(self.buffer)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError("%s is not a summary store" % path)
+        self.model_version = model_version.hex()
+
+        self.key_offsets = np.frombuffer(self.buffer, dtype="<u8",
+                                         count=self.count + 1,
+                                         offset=key_offsets_start)
+        self.value_offsets = np.frombuffer(self.buffer, dtype="<u8",
+                                           count=self.count + 1,
+                                           offset=value_offsets_start)
+        self.source_keys = np.frombuffer(self.buffer, dtype="V16",
+                                         count=self.count,
+                                         offset=source_keys_start)
+        self.keys_start = keys_start
+        self.values_start = values_start
+        self.view = memoryview(self.buffer)
+
+    def __len__(self):
+        return self.count
+
+    def get_title(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Title (UTF-8 bytes) of the i-th entry
+        """
+        start = self.keys_start + int(self.key_offsets[i])
+        end = self.keys_start + int(self.key_offsets[i + 1])
+        return self.buffer[start:end]
+
+    def find(self, title):
+        """
+        In:
+            title = Title formatted with format_topic
+
+        Out:
+            Index of the title's entry, or None if it isn't in the store;
+                O(log n) title comparisons
+        """
+        key = title.encode("UTF-8")
+        i = bisect.bisect_left(SortedKeys(self.get_title, self.count), key)
+        if i < self.count and self.get_title(i) == key:
+            return i
+        return None
+
+    def get_compressed(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Memoryview of the entry's compressed value, in the mapped file
+        """
+        start = self.values_start + int(self.value_offsets[i])
+        end = self.values_start + int(self.value_offsets[i + 1])
+        return self.view[start:end]
+
+    def get_source_key(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Summary key (hex) of the article text the entry was made from
+        """
+        return self.source_keys[i].tobytes().hex()
+
+    def get_entry(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            wiki_topic = Wikipedia topic summarized (after redirects)
+            summary = Summary HTML
+        """
+        value = zlib.decompress(self.get_compressed(i)).decode("UTF-8")
+        wiki_topic, summary = value.split("\n", 1)
+        return wiki_topic, summary
+
+    def iter_entries(self):
+        """
+        Out:
+            Generator of (title, source key, compressed value) tuples of
+                every entry, in title order
+        """
+        for i in range(self.count):
+            yield (self.get_title(i).decode("UTF-8"), self.get_source_key(i),
+                   bytes(self.get_compressed(i)))
+
+
+class SummaryStore:
+    """
+    Precomputed summaries by title, read from a summary store file (see
+    SummaryStoreFile). When the file is replaced on disk (e.g. by a rebuild;
+    see build_summary_store), the new one is picked up within
+    `reload_interval` seconds, without interrupting reads of the old one.
+    """
+
+    def __init__(self, path, reload_interval=30):
+        """
+        In:
+            path = Summary store file
+            reload_interval = Most seconds between checks for a replaced file
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.store_file = SummaryStoreFile(path)
+        self.checked = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get_file(self):
+        """
+        Out:
+            SummaryStoreFile of the current file, reopened first if the file
+                has been replaced since it was last checked
+        """
+        store_file = self.store_file
+        if time.monotonic() - self.checked < self.reload_interval:
+            return store_file
+
+        with self.lock:
+            self.checked = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return self.store_file
+
+            old_stat = self.store_file.stat
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != \
+                    (old_stat.st_ino, old_stat.st_mtime_ns, old_stat.st_size):
+                self.store_file = SummaryStoreFile(self.path)
+                self.reloads += 1
+
+            return self.store_file
+
+    def get(self, topic, model_version=None):
+        """
+        In:
+            topic = Topic formatted for the API / url (see format_topic)
+            model_version = Model version the summary must have been made
+                with (see get_model_version); None for any
+
+        Out:
+            (wiki_topic, summary HTML) tuple, or None if the topic isn't in
+                the store (or was summarized by another model)
+        """
+        store_file = self.get_file()
+        i = None
+        if model_version is None or store_file.model_version == model_version:
+            i = store_file.find(topic)
+
+        with self.lock:
+            if i is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return store_file.get_entry(i)
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of summaries stored, hit / miss counts,
+                and the number of times the file was reloaded
+        """
+        return {"entries": len(self.store_file), "hits": self.hits,
+                "misses": self.misses, "reloads": self.reloads}
+
+
+# Writing
+def write_summary_store(path, entries, model_version):
+    """
+    In:
+        path = File to write
+        entries = Dictionary of title (formatted with format_topic): (source
+            key (hex), compressed value) tuples (see make_store_value)
+        model_version = Version of the model the summaries were made with
+
+    Out:
+        Writes the summary store (see write_sectioned_file)
+    """
+    titles = sorted(entries, key=lambda title: title.encode("UTF-8"))
+    keys = [title.encode("UTF-8") for title in titles]
+    values = [entries[title][1] for title in titles]
+
+    key_offsets = np.zeros(len(keys) + 1, dtype="<u8")
+    key_offsets[1:] = np.cumsum([len(key) for key in keys])
+    value_offsets = np.zeros(len(values) + 1, dtype="<u8")
+    value_offsets[1:] = np.cumsum([len(value) for value in values])
+    source_keys = b"".join(bytes.fromhex(entries[title][0])
+                           for title in titles)
+
+    write_sectioned_file(
+        path, HEADER_FORMAT,
+        [STORE_MAGIC, STORE_VERSION, len(keys), bytes.fromhex(model_version)],
+        [key_offsets.tobytes(), value_offsets.tobytes(), source_keys,
+         b"".join(keys), b"".join(values)])
+
+
+def make_store_value(wiki_topic, summary):
+    """
+    In:
+        wiki_topic = Wikipedia topic summarized (after redirects)
+        summary = Summary HTML
+
+    Out:
+        Compressed store value
+    """
+    return zlib.compress((wiki_topic + "\n" + summary).encode("UTF-8"), 9)
+
+
+class StoredSummaryCache:
+    """
+    Read only SummaryCache stand-in answering from a previous summary store,
+    by summary key, so rebuilding only summarizes articles that changed.
+    """
+
+    def __init__(self, store_file):
+        """
+        In:
+            store_file = SummaryStoreFile of the previous store
+        """
+        self.store_file = store_file
+        self.entries = {store_file.get_source_key(i): i
+                        for i in range(len(store_file))}
+
+    def get(self, key):
+        i = self.entries.get(key)
+        if i is None:
+            return None
+        return self.store_file.get_entry(i)[1]
+
+    def put(self, key, summary):
+        pass
+
+
+def build_summary_store(topics, fetch_article, path, changed_titles=None,
+                        rebuild=False, batch_size=50, max_workers=10):
+    """
+    In:
+        topics = List of topics to store summaries of
+        fetch_article = Function taking a formatted topic and returning a
+            (wiki_topic, raw_text) tuple, following redirects (e.g.
+            WikiClient.fetch_article)
+        path = Summary store file to write; if it already exists, it is
+            updated incrementally (unless rebuild is True)
+        changed_titles = Topics known to have changed since the store was
+            last built; if given, only these (and topics not in the store
+            yet) are fetched, and the rest kept as they are. If None, every
+            topic is fetched, and summarized only if its article text
+            changed
+        rebuild = Whether to ignore the existing store and summarize every
+            topic
+        batch_size = Maximum number of articles classified by a single
+            model.predict call
+        max_workers = Number of articles fetched concurrently
+
+    Out:
+        Writes the store, printing progress; returns a dictionary of how
+            many topics were summarized, kept unchanged, and failed (a
+            failed topic keeps its previous summary, if it had one)
+    """
+    model_version = get_model_version()
+    topics = sorted({format_topic(topic) for topic in topics})
+
+    # Entries of the existing store (made with the current model) are kept
+    # unless their topic is summarized again
+    entries = {}
+    previous = None
+    if not rebuild and os.path.exists(path):
+        previous = SummaryStoreFile(path)
+        if previous.model_version == model_version:
+            entries = {title: (source_key, value) for title, source_key, value
+                       in previous.iter_entries()}
+        else:
+            previous = None
+
+    fetch_topics = topics
+    if changed_titles is not None:
+        changed_titles = {format_topic(title) for title in changed_titles}
+        fetch_topics = [topic for topic in topics
+                        if topic not in entries or topic in changed_titles]
+    counts = {"summarized": 0, "unchanged": len(topics) - len(fetch_topics),
+              "failed": 0}
+
+    # The summary key of each fetched article, recorded as it is fetched
+    source_keys = {}
+
+    def fetch_and_key(topic):
+        wiki_topic, raw_text = fetch_article(topic)
+        source_keys[topic] = make_summary_key(wiki_topic, raw_text,
+                                              model_version)
+        return wiki_topic, raw_text
+
+    # Articles whose text is unchanged get their stored summary back rather
+    # than being summarized again
+    summary_cache = None if previous is None else \
+        StoredSummaryCache(previous)
+    start = time.time()
+    for done, result in enumerate(summarize_topics(
+            fetch_topics, fetch_and_key, summary_cache, batch_size,
+            max_workers), 1):
+        topic = result["topic"]
+        if "error" in result:
+            counts["failed"] += 1
+        elif topic in entries and entries[topic][0] == source_keys[topic]:
+            counts["unchanged"] += 1
+        else:
+            entries[topic] = (source_keys[topic], make_store_value(
+                result["wiki_topic"], result["summary"]))
+            counts["summarized"] += 1
+
+        if done % 1000 == 0:
+            print("%d / %d topics, %.1f topics/s"
+                  % (done, len(fetch_topics), done / (time.time() - start)))
+
+    # Topics no longer in the list are dropped
+    write_summary_store(path, {topic: entries[topic] for topic in topics
+                               if topic in entries}, model_version)
+    return counts
+
+
+def load_topics(filename):
+    """
+    In:
+        filename = Pickle of (english topic, simple topic) pairs or of
+            topics (e.g. "wiki_topic_pairs.pkl"), or a text file with a
+            topic per line
+
+    Out:
+        List of topics
+    """
+    if filename.endswith(".pkl"):
+        with open(filename, "rb") as picklefile:
+            topics = pickle.load(picklefile)
+        return [topic[0] if isinstance(topic, tuple) else topic
+                for topic in topics]
+
+    with open(filename, encoding="UTF-8") as topic_file:
+        return [line.strip() for line in topic_file if line.strip()]
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python summary_store.py wiki_topic_pairs.pkl summary_store.bin
+    #     python summary_store.py wiki_topic_pairs.pkl summary_store.bin \
+    #         --changed changed_titles.txt
+    parser = argparse.ArgumentParser(
+        description="Summarize a list of topics into a memory mapped "
+                    "summary store")
+    parser.add_argument("topics", help="Topic pairs pickle or text file")
+    parser.add_argument("path", help="Summary store file to write / update")
+    parser.add_argument("--changed",
+                        help="Text file of the topics that changed; only "
+                             "these are fetched again")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Summarize every topic again")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=10)
+    args = parser.parse_args()
+
+    wiki_client = WikiClient(pool_size=args.workers)
+    changed_titles = load_topics(args.changed) if args.changed else None
+    print(build_summary_store(load_topics(args.topics),
+                              wiki_client.fetch_article, args.path,
+                              changed_titles, args.rebuild, args.batch_size,
+                              args.workers))
@@ -0,0 +1,305 @@
+# Import Dependencies
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from textblob._text import EMOTICONS, PUNCTUATION
+from textblob.en import sentiment as pattern_sentiment
+from textblob.tokenizers import word_tokenize
+from textblob.utils import lowerstrip
+
+
+# Sentiment
+class SentimentLexicon:
+    """
+    TextBlob's (pattern's) sentiment lexicon, flattened once into a plain
+    dictionary, scoring sentences exactly as TextBlob(sentence).sentiment
+    does without building a TextBlob (and its analyzer's result types) per
+    sentence.
+    """
+
+    def __init__(self, sentiment=pattern_sentiment):
+        """
+        In:
+            sentiment = Pattern sentiment lexicon to flatten (loaded if it
+                isn't yet); TextBlob's English lexicon by default
+        """
+        # Sentences are tokenized and lowercased as the lexicon does, and
+        # assessed like its untagged words (part-of-speech None)
+        self.tokenizer = sentiment.tokenizer
+        self.negations = frozenset(sentiment.negations)
+        self.modifier = sentiment.modifier
+
+        # Word: (polarity, subjectivity, intensity, whether it can modify
+        # the next word)
+        self.words = {}
+        for word, scores in sentiment.items():
+            if None in scores:
+                polarity, subjectivity, intensity = scores[None]
+                self.words[word] = (
+                    polarity, subjectivity, intensity,
+                    any(modifier in scores
+                        for modifier in sentiment.modifiers))
+
+        # Lowercased emoticon: polarity of the first mood listing it
+        self.emoticons = {}
+        for (mood, polarity), emoticons in EMOTICONS.items():
+            for emoticon in emoticons:
+                self.emoticons.setdefault(emoticon.lower(), polarity)
+
+    def get_sentiment(self, sentence):
+        """
+        In:
+            sentence = Cleaned sentence from wikipedia article
+
+        Out:
+            polarity = Postive / negative sentiment of the sentence
+            subjectivity = Objectivity / subjectivity sentiment of the
+                sentence
+
+            Same values as TextBlob(sentence).sentiment (see
+                pattern's Sentiment.assessments, which this follows step by
+                step)
+        """
+        # [polarity, subjectivity, intensity, negated] of each assessed word
+        assessments = []
+        modifier = None  # Preceding modifier (e.g. "really good")
+        negation = None  # Preceding negation (e.g. "not good")
+
+        for word in " ".join(self.tokenizer(sentence)).split():
+            word = word.lower()
+            scores = self.words.get(word)
+
+            if scores is not None:
+                polarity, subjectivity, intensity, modifies = scores
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity,
+                                        False])
+                else:
+                    assessment = assessments[-1]
+                    assessment[0] = max(-1.0, min(polarity * assessment[2],
+                                                  +1.0))
+                    assessment[1] = max(-1.0, min(subjectivity *
+                                                  assessment[2], +1.0))
+                    assessment[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+
+                modifier = word if modifies else None
+                negation = word if word in self.negations else None
+
+            else:
+                if word in self.negations:
+                    negation = word
+                elif negation and len(word.strip("'")) > 1:
+                    negation = None
+
+                if negation is not None and modifier is not None \
+                        and self.modifier(modifier):
+                    assessments[-1][3] = True
+                    negation = None
+                elif modifier and len(word) > 2:
+                    modifier = None
+
+                # Exclamation marks boost the previous word, and in
+                # parentheses indicate irony
+                if word == "!" and assessments:
+                    assessments[-1][0] = max(-1.0, min(
+                        assessments[-1][0] * 1.25, +1.0))
+                if word == "(!)":
+                    assessments.append([0.0, 1.0, 1.0, False])
+
+                if word.isalpha() is False and len(word) <= 5 \
+                        and word not in PUNCTUATION:
+                    polarity = self.emoticons.get(word)
+                    if polarity is not None:
+                        assessments.append([polarity, 1.0, 1.0, False])
+
+        # Averaged one by one, in order, as pattern does ("not good" is
+        # slightly bad, "not bad" slightly good)
+        total_polarity = 0
+        total_subjectivity = 0
+        for polarity, subjectivity, intensity, negated in assessments:
+            total_polarity += polarity * -0.5 if negated else polarity
+            total_subjectivity += subjectivity
+
+        total_assessments = float(len(assessments) or 1)
+        return (total_polarity / total_assessments,
+                total_subjectivity / total_assessments)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sentiment_lexicon():
+    """
+    Out:
+        SentimentLexicon of TextBlob's English lexicon, built the first time
+            it is asked for
+    """
+    return SentimentLexicon()
+
+
+# Topic mentions
+def get_topic_mentions(sentence, topic_words):
+    """
+    In:
+        sentence = Cleaned sentence from wikipedia article
+        topic_words = Lowercased topic words (see
+            wiki_summarization.get_topic_words)
+
+    Out:
+        topic_mentions = # of times the topic was mentioned in the sentence
+            (normalized for number of words in the topic); same value as
+            counting TextBlob(sentence).word_counts, but only tokenizing
+            sentences that could mention the topic
+    """
+    if not topic_words:
+        return 0.0
+
+    # A word of an ASCII sentence can only match a topic word found in the
+    # lowercased sentence, so other sentences mention the topic 0 times
+    if sentence.isascii():
+        lowered = sentence.lower()
+        if not any(word in lowered for word in topic_words):
+            return 0.0
+
+    word_counts = {}
+    for word in word_tokenize(sentence, include_punc=False):
+        word = lowerstrip(word)
+        word_counts[word] = word_counts.get(word, 0) + 1
+
+    return sum(word_counts.get(word, 0) for word in topic_words) / \
+        len(topic_words)
+
+
+# Batched features
+def get_text_features(sentences, topic_words, lexicon=None):
+    """
+    In:
+        sentences = List of cleaned sentences from wikipedia article
+        topic_words = Lowercased topic words (see
+            wiki_summarization.get_topic_words)
+        lexicon = SentimentLexicon to score sentiment with (None for
+            TextBlob's English lexicon)
+
+    Out:
+        topic_mentions = NumPy array of the # of times the topic was mentioned
+            in each sentence (normalized for number of words in the topic)
+        polarity = NumPy array of each sentence's postive / negative sentiment
+        subjectivity = NumPy array of each sentence's objectivity /
+            subjectivity sentiment
+
+        Same values as building a TextBlob per sentence
+    """
+    if lexicon is None:
+        lexicon = get_sentiment_lexicon()
+
+    total_sents = len(sentences)
+    topic_mentions = np.zeros(total_sents)
+    polarity = np.zeros(total_sents)
+    subjectivity = np.zeros(total_sents)
+
+    for i, sentence in enumerate(sentences):
+        topic_mentions[i] = get_topic_mentions(sentence, topic_words)
+        polarity[i], subjectivity[i] = lexicon.get_sentiment(sentence)
+
+    return topic_mentions, polarity, subjectivity
+
+
+# Sentence feature cache
+class SentenceFeatureCache:
+    """
+    Text features (topic mentions and sentiment) of recently scored
+    sentences, keyed by a hash of the topic and the sentence, least recently
+    used evicted past `max_entries`. An edited article mostly repeats
+    sentences that were already scored, so summarizing it again only scores
+    its new or changed sentences (a sentence's location features depend on
+    the rest of the article, so those are always rebuilt from its
+    structure).
+    """
+
+    def __init__(self, max_entries=100000, lexicon=None):
+        """
+        In:
+            max_entries = Maximum number of sentences' features kept
+            lexicon = SentimentLexicon to score sentiment with (None for
+                TextBlob's English lexicon)
+        """
+        self.max_entries = max_entries
+        self.lexicon = lexicon
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_text_features(self, sentences, topic_words):
+        """
+        In:
+            sentences = List of cleaned sentences from wikipedia article
+            topic_words = Lowercased topic words (see
+                wiki_summarization.get_topic_words)
+
+        Out:
+            topic_mentions, polarity, subjectivity = NumPy arrays of each
+                sentence's features, the same as get_text_features gives;
+                only sentences not in the cache are scored
+        """
+        topic_hash = hashlib.blake2b(digest_size=16)
+        topic_hash.update("\x1f".join(topic_words).encode("UTF-8") + b"\0")
+        keys = []
+        for sentence in sentences:
+            sentence_hash = topic_hash.copy()
+            sentence_hash.update(sentence.encode("UTF-8"))
+            keys.append(sentence_hash.digest())
+
+        features = np.zeros((3, len(sentences)))
+        missing = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                cached = self.entries.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self.entries.move_to_end(key)
+                    features[:, i] = cached
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = np.array(get_text_features(
+                [sentences[i] for i in missing], topic_words, self.lexicon))
+            features[:, missing] = computed
+
+            with self.lock:
+                for i, column in zip(missing, computed.T.tolist()):
+                    self.entries[keys[i]] = tuple(column)
+                    self.entries.move_to_end(keys[i])
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+
+        topic_mentions, polarity, subjectivity = features
+        return topic_mentions, polarity, subjectivity
+
+    def clear(self):
+        """
+        Out:
+            Empties the cache
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of sentences cached, and hit / miss /
+                eviction counts (per sentence)
+        """
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
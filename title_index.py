@@ -0,0 +1,336 @@
+# Import Dependencies
+import argparse
+import bisect
+import mmap
+import re
+import struct
+import threading
+
+import numpy as np
+
+from sorted_file import SortedKeys, write_sectioned_file
+from wiki_dump import iter_dump_titles
+
+# Underscores and runs of whitespace, all equivalent to one space in a title
+TITLE_SEPARATOR_PATTERN = re.compile(r"[\s_]+")
+
+# Longest chain of redirects (A -> B -> C ...) resolved when building
+MAX_REDIRECT_HOPS = 5
+
+# File layout (little-endian; each section starts 8-byte aligned):
+#     header = magic, format version, entry count, offsets of the sections
+#         below
+#     alias_offsets = uint64[count + 1], where each alias starts in aliases
+#     targets = uint32[count], the entry of the canonical title each alias
+#         leads to (an article's own entry points to itself)
+#     aliases = UTF-8 titles (normalized with normalize_title) of every
+#         article and redirect, sorted by (casefolded title, title)
+INDEX_MAGIC = b"QKTITLE1"
+INDEX_VERSION = 1
+HEADER_FORMAT = struct.Struct("<8sIQ3Q")
+
+
+def normalize_title(title):
+    """
+    In:
+        title = Title as entered by a user, linked to, or formatted for the
+            url (e.g. "united_states", " United  States ")
+
+    Out:
+        Title the way Wikipedia normalizes it: underscores and runs of
+            whitespace as single spaces, trimmed, with the first letter
+            capitalized (e.g. "United states"); the rest of the title keeps
+            its case, as Wikipedia titles are case sensitive past the first
+            letter
+    """
+    title = TITLE_SEPARATOR_PATTERN.sub(" ", title).strip()
+    return title[:1].upper() + title[1:]
+
+
+def fold_title(title):
+    """
+    In:
+        title = Normalized title
+
+    Out:
+        Caseless form of the title, under which aliases differing only in
+            case are looked up together
+    """
+    return title.casefold()
+
+
+# Reading
+class TitleIndexFile:
+    """
+    Title index file (see write_title_index), memory mapped read only, that
+    resolves titles and redirects to canonical article titles locally, so an
+    aliased topic costs one fetch of the article itself rather than a fetch
+    of its redirect page first. Lookups are binary searches over the sorted
+    aliases, ignoring case where the exact title isn't an alias, and
+    prefixes can be listed for autocomplete.
+    """
+
+    def __init__(self, path):
+        """
+        In:
+            path = Title index file
+        """
+        self.path = path
+        with open(path, "rb") as index_file:
+            self.buffer = mmap.mmap(index_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+
+        (magic, version, self.count, alias_offsets_start, targets_start,
+         aliases_start) = HEADER_FORMAT.unpack_from(self.buffer)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("%s is not a title index" % path)
+
+        self.alias_offsets = np.frombuffer(self.buffer, dtype="<u8",
+                                           count=self.count + 1,
+                                           offset=alias_offsets_start)
+        self.targets = np.frombuffer(self.buffer, dtype="<u4",
+                                     count=self.count, offset=targets_start)
+        self.aliases_start = aliases_start
+
+        self.lock = threading.Lock()
+        self.resolved = 0
+        self.unresolved = 0
+
+    def __len__(self):
+        return self.count
+
+    def get_alias(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Alias (normalized title) of the i-th entry
+        """
+        start = self.aliases_start + int(self.alias_offsets[i])
+        end = self.aliases_start + int(self.alias_offsets[i + 1])
+        return self.buffer[start:end].decode("UTF-8")
+
+    def get_folded_aliases(self):
+        """
+        Out:
+            Sequence view of the aliases, casefolded (the order they are
+                sorted in), for bisect
+        """
+        return SortedKeys(lambda i: fold_title(self.get_alias(i)), self.count)
+
+    def get_canonical(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Canonical title the i-th entry's alias leads to
+        """
+        return self.get_alias(int(self.targets[i]))
+
+    def find(self, title):
+        """
+        In:
+            title = Title in any form normalize_title accepts
+
+        Out:
+            Index of the title's entry, or None if it isn't in the index;
+                an exact match wins, then, among aliases differing only in
+                case, an article over a redirect
+        """
+        title = normalize_title(title)
+        folded = fold_title(title)
+        i = bisect.bisect_left(self.get_folded_aliases(), folded)
+
+        found = None
+        while i < self.count:
+            alias = self.get_alias(i)
+            if fold_title(alias) != folded:
+                break
+            if alias == title:
+                return i
+            if found is None or (int(self.targets[i]) == i and
+                                 int(self.targets[found]) != found):
+                found = i
+            i += 1
+
+        return found
+
+    def resolve(self, title):
+        """
+        In:
+            title = Title in any form normalize_title accepts
+
+        Out:
+            Canonical article title (with spaces) the title leads to, after
+                redirects, or None if it isn't in the index
+        """
+        i = self.find(title)
+        with self.lock:
+            if i is None:
+                self.unresolved += 1
+                return None
+            self.resolved += 1
+
+        return self.get_canonical(i)
+
+    def complete(self, prefix, limit=10):
+        """
+        In:
+            prefix = Start of a title, any case
+            limit = Maximum number of titles to return
+
+        Out:
+            List of the canonical titles of aliases starting with the prefix,
+                in alias order, each listed once
+        """
+        folded = fold_title(TITLE_SEPARATOR_PATTERN.sub(" ", prefix)
+                            .lstrip())
+        titles = []
+        if not folded:
+            return titles
+
+        seen = set()
+        i = bisect.bisect_left(self.get_folded_aliases(), folded)
+        while i < self.count and len(titles) < limit:
+            if not fold_title(self.get_alias(i)).startswith(folded):
+                break
+            target = int(self.targets[i])
+            if target not in seen:
+                seen.add(target)
+                titles.append(self.get_alias(target))
+            i += 1
+
+        return titles
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of aliases indexed, and how many lookups
+                resolved / didn't
+        """
+        return {"aliases": self.count, "resolved": self.resolved,
+                "unresolved": self.unresolved}
+
+
+# Writing
+def resolve_redirects(titles):
+    """
+    In:
+        titles = Iterable of (title, redirect target) tuples, the target None
+            for articles
+
+    Out:
+        Dictionary of normalized alias: canonical title, for every article
+            (mapped to itself) and every redirect that reaches an article
+            within MAX_REDIRECT_HOPS. If no articles are listed (e.g. a list
+            of redirects only), every redirect's final target is taken to be
+            an article
+    """
+    articles = set()
+    redirects = {}
+    for title, target in titles:
+        title = normalize_title(title)
+        if not title:
+            continue
+        if target is None:
+            articles.add(title)
+        else:
+            target = normalize_title(target.split("#")[0])
+            if target and target != title:
+                redirects[title] = target
+
+    canonical = {article: article for article in articles}
+    for alias, target in redirects.items():
+        if alias in articles:
+            continue
+        for _ in range(MAX_REDIRECT_HOPS):
+            if target not in redirects or target in articles:
+                break
+            target = redirects[target]
+        else:
+            continue
+
+        if target in articles or (not articles and target not in redirects):
+            canonical[alias] = target
+            canonical.setdefault(target, target)
+
+    return canonical
+
+
+def write_title_index(path, canonical):
+    """
+    In:
+        path = File to write
+        canonical = Dictionary of normalized alias: canonical title (see
+            resolve_redirects); every canonical title must be an alias of
+            itself
+
+    Out:
+        Writes the title index (see write_sectioned_file)
+    """
+    aliases = sorted(canonical, key=lambda alias: (fold_title(alias), alias))
+    entries = {alias: i for i, alias in enumerate(aliases)}
+    encoded = [alias.encode("UTF-8") for alias in aliases]
+
+    alias_offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    alias_offsets[1:] = np.cumsum([len(alias) for alias in encoded])
+    targets = np.array([entries[canonical[alias]] for alias in aliases],
+                       dtype="<u4")
+
+    write_sectioned_file(
+        path, HEADER_FORMAT, [INDEX_MAGIC, INDEX_VERSION, len(aliases)],
+        [alias_offsets.tobytes(), targets.tobytes(), b"".join(encoded)])
+
+
+def iter_title_list(filename):
+    """
+    In:
+        filename = Text file with a title per line, followed by a tab and the
+            title it redirects to for redirects (e.g. "USA\tUnited States")
+
+    Out:
+        Generator of (title, redirect target) tuples, the target None for
+            articles
+    """
+    with open(filename, encoding="UTF-8") as title_file:
+        for line in title_file:
+            title, _, target = line.rstrip("\r\n").partition("\t")
+            if title.strip():
+                yield title, target.strip() or None
+
+
+def build_title_index(source, path):
+    """
+    In:
+        source = pages-articles XML dump (".xml" or ".xml.bz2"), or a title
+            list (see iter_title_list)
+        path = Title index file to write
+
+    Out:
+        Writes the title index; returns the number of aliases in it
+    """
+    if source.endswith((".xml", ".xml.bz2")):
+        titles = iter_dump_titles(source)
+    else:
+        titles = iter_title_list(source)
+
+    canonical = resolve_redirects(titles)
+    write_title_index(path, canonical)
+    return len(canonical)
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python title_index.py enwiki-latest-pages-articles.xml.bz2 \
+    #         title_index.bin
+    #     python title_index.py titles.tsv title_index.bin
+    parser = argparse.ArgumentParser(
+        description="Index article titles and redirects, so topics resolve "
+                    "to their article without fetching redirect pages")
+    parser.add_argument("source", help="Pages-articles dump or title list")
+    parser.add_argument("path", help="Title index file to write")
+    args = parser.parse_args()
+
+    print("%d titles indexed" % build_title_index(args.source, args.path))
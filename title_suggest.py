@@ -0,0 +1,302 @@
+# Import Dependencies
+import argparse
+import bisect
+
+import numpy as np
+
+from sorted_file import SortedKeys
+from title_index import TITLE_SEPARATOR_PATTERN, normalize_title, fold_title
+
+# Most suggestions returned for one prefix
+MAX_SUGGESTIONS = 10
+
+# Prefixes matching more titles than this have their suggestions ranked when
+# the index is built; the rest are ranked per lookup, which then never looks
+# at more than this many titles
+PRECOMPUTE_THRESHOLD = 2048
+
+
+def fold_prefix(text):
+    """
+    In:
+        text = Start of a title, as typed (e.g. "united_st")
+
+    Out:
+        Casefolded, UTF-8 encoded prefix to look up (e.g. b"united st")
+    """
+    return fold_title(TITLE_SEPARATOR_PATTERN.sub(" ", text).lstrip()) \
+        .encode("UTF-8")
+
+
+class SuggestionIndex:
+    """
+    Known titles ranked by popularity, for autocomplete. The casefolded
+    titles are kept sorted in one flat buffer, so the titles starting with a
+    prefix are a contiguous range found by two binary searches, and the most
+    popular of them are picked from a numpy array of popularities. Prefixes
+    matching very many titles (e.g. single letters) have their suggestions
+    ranked up front, so every lookup does a small, bounded amount of work.
+    Titles, keys and popularities are a handful of flat buffers rather than
+    millions of Python objects.
+    """
+
+    def __init__(self, keys, key_offsets, titles, title_offsets, popularity,
+                 ranked, max_suggestions=MAX_SUGGESTIONS):
+        """
+        In:
+            keys = Casefolded titles (UTF-8), sorted, concatenated
+            key_offsets = Array of where each key starts in keys (plus the
+                end)
+            titles = Titles (UTF-8), in the same order, concatenated
+            title_offsets = Array of where each title starts in titles (plus
+                the end)
+            popularity = Array of each title's popularity
+            ranked = Dictionary of prefix: array of the entries of its
+                suggestions, for prefixes matching many titles (see build)
+            max_suggestions = Most suggestions returned for one prefix
+        """
+        self.count = len(popularity)
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.titles = titles
+        self.title_offsets = title_offsets
+        self.popularity = popularity
+        self.ranked = ranked
+        self.max_suggestions = max_suggestions
+
+    @classmethod
+    def build(cls, titles, max_suggestions=MAX_SUGGESTIONS,
+              precompute_threshold=PRECOMPUTE_THRESHOLD):
+        """
+        In:
+            titles = Iterable of (title, popularity) tuples (e.g. page views
+                per title); a title listed more than once keeps its highest
+                popularity
+            max_suggestions = Most suggestions returned for one prefix
+            precompute_threshold = Prefixes matching more titles than this
+                are ranked up front
+
+        Out:
+            SuggestionIndex of the titles
+        """
+        popularity = {}
+        for title, views in titles:
+            title = normalize_title(title)
+            if title and views > popularity.get(title, -1):
+                popularity[title] = views
+
+        entries = sorted((fold_title(title).encode("UTF-8"), title)
+                         for title in popularity)
+        keys = [key for key, _ in entries]
+        encoded_titles = [title.encode("UTF-8") for _, title in entries]
+
+        key_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        key_offsets[1:] = np.cumsum([len(key) for key in keys])
+        title_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        title_offsets[1:] = np.cumsum([len(title)
+                                       for title in encoded_titles])
+
+        index = cls(b"".join(keys), key_offsets, b"".join(encoded_titles),
+                    title_offsets,
+                    np.array([popularity[title] for _, title in entries],
+                             dtype=np.float64),
+                    {}, max_suggestions)
+        index.rank_large_prefixes(precompute_threshold)
+        return index
+
+    @classmethod
+    def from_file(cls, filename, **kwargs):
+        """
+        In:
+            filename = Text file with a title and its popularity (e.g. page
+                views) per line, separated by a tab
+            kwargs = Options for build (max_suggestions,
+                precompute_threshold)
+
+        Out:
+            SuggestionIndex of the titles
+        """
+        def iter_titles():
+            with open(filename, encoding="UTF-8") as title_file:
+                for line in title_file:
+                    title, _, views = line.rstrip("\r\n").rpartition("\t")
+                    if title.strip():
+                        yield title, float(views)
+
+        return cls.build(iter_titles(), **kwargs)
+
+    def save(self, path):
+        """
+        In:
+            path = File to write the index to (".npz")
+        """
+        prefixes = sorted(self.ranked)
+        prefix_offsets = np.zeros(len(prefixes) + 1, dtype=np.int64)
+        prefix_offsets[1:] = np.cumsum([len(prefix) for prefix in prefixes])
+        ranked = np.full((len(prefixes), self.max_suggestions), -1,
+                         dtype=np.int64)
+        for row, prefix in zip(ranked, prefixes):
+            row[:len(self.ranked[prefix])] = self.ranked[prefix]
+
+        np.savez(path, keys=np.frombuffer(self.keys, dtype=np.uint8),
+                 key_offsets=self.key_offsets,
+                 titles=np.frombuffer(self.titles, dtype=np.uint8),
+                 title_offsets=self.title_offsets,
+                 popularity=self.popularity,
+                 prefixes=np.frombuffer(b"".join(prefixes), dtype=np.uint8),
+                 prefix_offsets=prefix_offsets, ranked=ranked)
+
+    @classmethod
+    def load(cls, path):
+        """
+        In:
+            path = File written by save
+
+        Out:
+            SuggestionIndex read from the file (a few flat arrays, so it loads
+                in a fraction of the time building it takes)
+        """
+        with np.load(path) as data:
+            prefixes = data["prefixes"].tobytes()
+            prefix_offsets = data["prefix_offsets"]
+            ranked = {prefixes[prefix_offsets[i]:prefix_offsets[i + 1]]:
+                      row[row >= 0] for i, row in enumerate(data["ranked"])}
+
+            return cls(data["keys"].tobytes(), data["key_offsets"],
+                       data["titles"].tobytes(), data["title_offsets"],
+                       data["popularity"], ranked, data["ranked"].shape[1])
+
+    def __len__(self):
+        return self.count
+
+    def get_key(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Casefolded title (UTF-8 bytes) of the i-th entry
+        """
+        return self.keys[self.key_offsets[i]:self.key_offsets[i + 1]]
+
+    def get_title(self, i):
+        """
+        In:
+            i = Entry index
+
+        Out:
+            Title of the i-th entry
+        """
+        return self.titles[self.title_offsets[i]:self.title_offsets[i + 1]] \
+            .decode("UTF-8")
+
+    def find_range(self, prefix, lo=0, hi=None):
+        """
+        In:
+            prefix = Casefolded UTF-8 prefix (see fold_prefix)
+            lo, hi = Range of entries to search within
+
+        Out:
+            (start, end) range of the entries starting with the prefix
+        """
+        hi = self.count if hi is None else hi
+        keys = SortedKeys(self.get_key, self.count)
+        start = bisect.bisect_left(keys, prefix, lo, hi)
+        # No UTF-8 string contains 0xFF, so it sorts after every continuation
+        end = bisect.bisect_left(keys, prefix + b"\xff", start, hi)
+        return start, end
+
+    def rank(self, start, end):
+        """
+        In:
+            start, end = Range of entries
+
+        Out:
+            Array of the entries of the max_suggestions most popular titles
+                in the range, most popular first (ties in title order)
+        """
+        if end - start > self.max_suggestions:
+            candidates = start + np.argpartition(
+                -self.popularity[start:end], self.max_suggestions - 1)[
+                    :self.max_suggestions]
+        else:
+            candidates = np.arange(start, end)
+
+        return candidates[np.lexsort((candidates,
+                                      -self.popularity[candidates]))]
+
+    def rank_large_prefixes(self, precompute_threshold):
+        """
+        In:
+            precompute_threshold = Prefixes matching more titles than this
+                are ranked
+
+        Out:
+            Ranks the suggestions of every prefix matching more than
+                precompute_threshold titles, walking down from the empty
+                prefix one byte at a time
+        """
+        stack = [(b"", 0, self.count)]
+        while stack:
+            prefix, start, end = stack.pop()
+            self.ranked[prefix] = self.rank(start, end)
+
+            i = start
+            while i < end:
+                key = self.get_key(i)
+                if len(key) == len(prefix):
+                    i += 1
+                    continue
+
+                child = key[:len(prefix) + 1]
+                child_end = self.find_range(child, i, end)[1]
+                if child_end - i > precompute_threshold:
+                    stack.append((child, i, child_end))
+                i = child_end
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """
+        In:
+            text = Start of a title, as typed
+            limit = Most suggestions to return (at most max_suggestions)
+
+        Out:
+            List of the most popular titles starting with the text (ignoring
+                case), most popular first
+        """
+        prefix = fold_prefix(text)
+        if not prefix:
+            return []
+
+        ranked = self.ranked.get(prefix)
+        if ranked is None:
+            ranked = self.rank(*self.find_range(prefix))
+
+        return [self.get_title(i) for i in ranked[:limit]]
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of the number of titles, prefixes ranked up front, and
+                bytes held in memory
+        """
+        return {"titles": self.count, "ranked_prefixes": len(self.ranked),
+                "bytes": len(self.keys) + len(self.titles) +
+                self.key_offsets.nbytes + self.title_offsets.nbytes +
+                self.popularity.nbytes}
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python title_suggest.py title_popularity.tsv suggestions.npz
+    parser = argparse.ArgumentParser(
+        description="Index titles ranked by popularity for autocomplete")
+    parser.add_argument("titles",
+                        help="Text file of tab separated titles and their "
+                             "popularity (e.g. page views)")
+    parser.add_argument("path", help="Suggestion index file to write")
+    args = parser.parse_args()
+
+    index = SuggestionIndex.from_file(args.titles)
+    index.save(args.path)
+    print(index.stats())
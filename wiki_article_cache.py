@@ -0,0 +1,201 @@
+# Import Dependencies
+import sqlite3
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+WIKIPEDIA_RAW_URL = "https://en.wikipedia.org/w/index.php?action=raw&title="
+
+
+# Fetching functions
+def make_raw_article_fetcher(base_url=WIKIPEDIA_RAW_URL, timeout=None):
+    """
+    In:
+        base_url = URL the title is appended to, to get the raw article text;
+            point this at a local HTTP server to test without Wikipedia
+        timeout = Seconds to wait for the server; None waits forever
+
+    Out:
+        fetch_raw_article = Function taking a title and a dictionary of
+            request headers, returning a tuple of:
+                status = HTTP status (200, or 304 if the article is unchanged)
+                text = Raw article text (None for 304)
+                headers = Dictionary of response headers
+    """
+    def fetch_raw_article(title, headers):
+        request = Request(base_url + title, headers=headers)
+        try:
+            response = urlopen(request, timeout=timeout)
+        except HTTPError as error:
+            if error.code == 304:
+                return 304, None, dict(error.headers)
+            raise
+
+        with response:
+            text = response.read().decode("UTF-8")
+            return response.status, text, dict(response.headers)
+
+    return fetch_raw_article
+
+
+def normalize_title(title):
+    """
+    In:
+        title = Wikipedia article title as requested (e.g. " united states")
+
+    Out:
+        title = Title in the form used as a cache key (e.g. "United_states"):
+            surrounding whitespace removed, spaces as underscores, runs of
+            underscores collapsed, and the first letter capitalized (as
+            Wikipedia does)
+    """
+    title = "_".join(part for part in title.strip().replace(" ", "_")
+                     .split("_") if part)
+    return title[:1].upper() + title[1:]
+
+
+# Cache
+class ArticleCache:
+    """
+    On-disk (SQLite) cache of raw Wikipedia article text, keyed by normalized
+    title.
+
+    Articles fetched less than `ttl` seconds ago are served without any
+    network call. Older articles are revalidated with a conditional request
+    (If-None-Match / If-Modified-Since), so unchanged articles aren't
+    downloaded again. Once the cache is over `max_bytes`, the least recently
+    used articles are evicted.
+    """
+
+    def __init__(self, path="article_cache.sqlite", max_bytes=256 * 2 ** 20,
+                 ttl=60 * 60, fetch=None, clock=time.time):
+        """
+        In:
+            path = SQLite file to store the cache in (":memory:" for a
+                cache that isn't persisted)
+            max_bytes = Maximum total size of cached article text
+            ttl = Seconds an article is served without revalidation
+            fetch = Fetch function (see make_raw_article_fetcher); defaults
+                to fetching from en.wikipedia.org
+            clock = Function returning the current time in seconds
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.fetch = fetch or make_raw_article_fetcher()
+        self.clock = clock
+
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                "title TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "size INTEGER NOT NULL, fetched_at REAL NOT NULL, "
+                "last_access REAL NOT NULL, etag TEXT, last_modified TEXT)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS articles_last_access "
+                "ON articles (last_access)")
+
+    def get(self, title):
+        """
+        In:
+            title = Wikipedia article title
+
+        Out:
+            text = Raw article text, from the cache if it is fresh or still
+                unchanged on Wikipedia, otherwise freshly fetched; fetch
+                errors (e.g. the page doesn't exist) are raised
+        """
+        key = normalize_title(title)
+        now = self.clock()
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT text, fetched_at, etag, last_modified FROM articles "
+                "WHERE title = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl:
+                with self.connection:
+                    self.connection.execute(
+                        "UPDATE articles SET last_access = ? WHERE title = ?",
+                        (now, key))
+                self.hits += 1
+                return row[0]
+
+        headers = {}
+        if row and row[2]:
+            headers["If-None-Match"] = row[2]
+        if row and row[3]:
+            headers["If-Modified-Since"] = row[3]
+
+        status, text, response_headers = self.fetch(title, headers)
+
+        with self.lock:
+            if status == 304 and row:
+                with self.connection:
+                    self.connection.execute(
+                        "UPDATE articles SET fetched_at = ?, last_access = ? "
+                        "WHERE title = ?", (now, now, key))
+                self.revalidations += 1
+                return row[0]
+
+            self.misses += 1
+            self.store(key, text, now, response_headers)
+
+        return text
+
+    def store(self, key, text, now, response_headers):
+        """
+        In:
+            key = Normalized article title
+            text = Raw article text
+            now = Current time
+            response_headers = Dictionary of response headers, used for
+                later revalidation
+
+        Out:
+            Saves the article, then evicts least recently used articles
+                until the cache is within max_bytes (the caller holds the
+                lock)
+        """
+        response_headers = {name.lower(): value for name, value
+                            in response_headers.items()}
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, text, len(text.encode("UTF-8")), now, now,
+                 response_headers.get("etag"),
+                 response_headers.get("last-modified")))
+
+            total_bytes = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+            if total_bytes <= self.max_bytes:
+                return
+
+            evicted = []
+            for title, size in self.connection.execute(
+                    "SELECT title, size FROM articles ORDER BY last_access"
+                    ).fetchall():
+                if total_bytes <= self.max_bytes:
+                    break
+                evicted.append((title,))
+                total_bytes -= size
+
+            self.connection.executemany(
+                "DELETE FROM articles WHERE title = ?", evicted)
+            self.evictions += len(evicted)
+
+    def stats(self):
+        """
+        Out:
+            Dictionary of hit (served without a request), revalidation (304
+                from Wikipedia), miss (downloaded), and eviction counts
+        """
+        return {"hits": self.hits, "revalidations": self.revalidations,
+                "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,248 @@
+# Import Dependencies
+import argparse
+import bz2
+import sqlite3
+import time
+import zlib
+from itertools import islice
+from multiprocessing import Pool
+from xml.etree.ElementTree import iterparse
+
+from wikipedia_page_cleaning import clean_wiki_page
+from wiki_summarization import summarize_article
+from wiki_fetch import format_topic
+
+
+# Reading functions
+def open_dump(path):
+    """
+    In:
+        path = Path to a pages-articles XML dump, bz2 compressed (".bz2") or
+            plain
+
+    Out:
+        Binary file object for the (decompressed) XML
+    """
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def local_name(tag):
+    """
+    In:
+        tag = XML tag, possibly namespaced (e.g.
+            "{http://www.mediawiki.org/xml/export-0.10/}page")
+
+    Out:
+        Tag without its namespace (e.g. "page")
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_dump_pages(path, namespaces=(0,), include_redirects=False):
+    """
+    In:
+        path = Path to a pages-articles XML dump (bz2 compressed or plain)
+        namespaces = Page namespaces to yield (0 = articles); None for all
+        include_redirects = Whether to also yield redirect pages
+
+    Out:
+        Generator of (title, wikitext) tuples for the latest revision of each
+            page, streamed so memory use stays constant however large the
+            dump is
+    """
+    with open_dump(path) as dump_file:
+        context = iterparse(dump_file, events=("start", "end"))
+        _, root = next(context)
+
+        title = text = None
+        namespace = 0
+        redirect = False
+
+        for event, element in context:
+            tag = local_name(element.tag)
+
+            if event == "start":
+                if tag == "page":
+                    title = text = None
+                    namespace = 0
+                    redirect = False
+                continue
+
+            if tag == "title":
+                title = element.text or ""
+            elif tag == "ns":
+                namespace = int(element.text or 0)
+            elif tag == "redirect":
+                redirect = True
+            elif tag == "text":
+                text = element.text or ""
+            elif tag == "page":
+                if (namespaces is None or namespace in namespaces) and \
+                        (include_redirects or not redirect) and \
+                        text is not None:
+                    yield title, text
+
+                # Free the finished page (and everything parsed before it)
+                root.clear()
+
+
+def iter_dump_titles(path, namespaces=(0,)):
+    """
+    In:
+        path = Path to a pages-articles XML dump (bz2 compressed or plain)
+        namespaces = Page namespaces to yield (0 = articles); None for all
+
+    Out:
+        Generator of (title, redirect target) tuples for every page, the
+            target being None for pages that aren't redirects; read from
+            each page's <redirect title="..."/> element, so no wikitext is
+            kept
+    """
+    with open_dump(path) as dump_file:
+        context = iterparse(dump_file, events=("start", "end"))
+        _, root = next(context)
+
+        title = target = None
+        namespace = 0
+
+        for event, element in context:
+            tag = local_name(element.tag)
+
+            if event == "start":
+                if tag == "page":
+                    title = target = None
+                    namespace = 0
+                continue
+
+            if tag == "title":
+                title = element.text or ""
+            elif tag == "ns":
+                namespace = int(element.text or 0)
+            elif tag == "redirect":
+                target = element.get("title") or None
+            elif tag == "page":
+                if namespaces is None or namespace in namespaces:
+                    yield title, target
+                root.clear()
+
+
+# Summarizing functions
+def summarize_page(page):
+    """
+    In:
+        page = (title, wikitext) tuple
+
+    Out:
+        title = Page title
+        summary = zlib compressed summary HTML (UTF-8), or None if the page
+            couldn't be summarized
+    """
+    title, wikitext = page
+    try:
+        summary = summarize_article(clean_wiki_page(wikitext),
+                                    format_topic(title))
+    except Exception:
+        return title, None
+
+    return title, zlib.compress(summary.encode("UTF-8"))
+
+
+def open_summary_store(path):
+    """
+    In:
+        path = SQLite file to store summaries in
+
+    Out:
+        connection = SQLite connection with a summaries table of
+            (title, zlib compressed summary HTML)
+    """
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS summaries ("
+                           "title TEXT PRIMARY KEY, summary BLOB NOT NULL)")
+    return connection
+
+
+def get_stored_summary(connection, title):
+    """
+    In:
+        connection = Summary store connection (see open_summary_store)
+        title = Page title (e.g. "United States")
+
+    Out:
+        Summary HTML, or None if there is no summary for the title
+    """
+    row = connection.execute("SELECT summary FROM summaries WHERE title = ?",
+                             (title,)).fetchone()
+    if row is None:
+        return None
+    return zlib.decompress(row[0]).decode("UTF-8")
+
+
+def summarize_dump(dump_path, output_path, processes=None, chunk_size=1000,
+                   limit=None):
+    """
+    In:
+        dump_path = Path to a pages-articles XML dump (bz2 compressed or
+            plain)
+        output_path = SQLite file to write the summaries to (see
+            open_summary_store); pages already in it are summarized again
+        processes = Number of worker processes (None = one per CPU)
+        chunk_size = Number of pages handed to the workers at a time (bounds
+            memory use), and between progress updates / commits
+        limit = Maximum number of pages to summarize (None = all)
+
+    Out:
+        Writes the cleaned and summarized article pages to output_path,
+            printing progress; returns a (summarized, failed) count tuple
+    """
+    connection = open_summary_store(output_path)
+    pages = islice(iter_dump_pages(dump_path), limit)
+    summarized = failed = 0
+    start = time.time()
+
+    with Pool(processes) as pool:
+        while True:
+            chunk = list(islice(pages, chunk_size))
+            if not chunk:
+                break
+
+            rows = []
+            for title, summary in pool.imap_unordered(summarize_page, chunk,
+                                                      chunksize=16):
+                if summary is None:
+                    failed += 1
+                else:
+                    rows.append((title, summary))
+
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?)", rows)
+            summarized += len(rows)
+
+            print("%d pages summarized (%d failed), %.1f pages/s"
+                  % (summarized, failed,
+                     (summarized + failed) / (time.time() - start)))
+
+    connection.close()
+    return summarized, failed
+
+
+if __name__ == "__main__":
+    # Usage:
+    #     python wiki_dump.py enwiki-latest-pages-articles.xml.bz2 \
+    #         dump_summaries.sqlite
+    parser = argparse.ArgumentParser(
+        description="Clean and summarize every article in a Wikipedia "
+                    "pages-articles XML dump")
+    parser.add_argument("dump_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    summarize_dump(args.dump_path, args.output_path, args.processes,
+                   args.chunk_size, args.limit)
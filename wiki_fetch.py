@@ -0,0 +1,242 @@
+# Import Dependencies
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+WIKIPEDIA_RAW_URL = "https://en.wikipedia.org/w/index.php?action=raw&title="
+SIMPLE_WIKIPEDIA_RAW_URL = \
+    "https://simple.wikipedia.org/w/index.php?action=raw&title="
+
+REDIRECT_PATTERN = re.compile(r"^\s*#redirect\s*:?\s*\[\[(.*?)\]\]",
+                              re.IGNORECASE)
+
+
+class RedirectError(Exception):
+    """
+    Raised when following redirects loops back on itself or goes too deep
+    """
+
+
+# Title functions
+def format_topic(topic):
+    """
+    In:
+        topic = Topic as entered by a user (e.g. "United States")
+
+    Out:
+        topic = Topic formatted for the API / url (e.g. "united_states")
+    """
+    topic = topic.replace(" ", "_")
+    topic = topic.lower()
+    return topic
+
+
+def get_title_key(title):
+    """
+    In:
+        title = Wikipedia article title (e.g. "nasa", "United_States")
+
+    Out:
+        Title as Wikipedia compares titles: underscores as spaces, runs of
+            spaces collapsed, trimmed, and the first letter capitalized
+            (e.g. "Nasa", "United States"); titles are otherwise case
+            sensitive, so "nasa" and "NASA" are different pages
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+# Redirect functions
+def get_redirect_target(raw_text):
+    """
+    In:
+        raw_text = Raw wikipedia article text
+
+    Out:
+        target = Title the article redirects to (spaces as underscores,
+            without any "#section" anchor), or None if it isn't a redirect
+    """
+    match = REDIRECT_PATTERN.match(raw_text)
+    if not match:
+        return None
+
+    target = match.group(1).split("|")[0].split("#")[0].strip()
+    return target.replace(" ", "_") or None
+
+
+def follow_redirects(title, get_text, max_redirects=5):
+    """
+    In:
+        title = Wikipedia article title
+        get_text = Function taking a title and returning its raw text (e.g.
+            WikiClient.get_text, or ArticleCache.get)
+        max_redirects = Maximum number of redirects to follow
+
+    Out:
+        title = Title of the article finally reached
+        raw_text = Raw text of the article finally reached
+
+        Raises RedirectError if the redirects loop or go deeper than
+            max_redirects
+    """
+    seen = {get_title_key(title)}
+    raw_text = get_text(title)
+
+    for _ in range(max_redirects):
+        target = get_redirect_target(raw_text)
+        if target is None:
+            return title, raw_text
+        if get_title_key(target) in seen:
+            raise RedirectError("Redirect loop from \"%s\" back to \"%s\""
+                                % (title, target))
+
+        seen.add(get_title_key(target))
+        title = target
+        raw_text = get_text(title)
+
+    if get_redirect_target(raw_text) is not None:
+        raise RedirectError("More than %d redirects reaching \"%s\""
+                            % (max_redirects, title))
+
+    return title, raw_text
+
+
+# Client
+class WikiClient:
+    """
+    Client for fetching raw article text from Wikipedia over a pooled,
+    keep-alive session, with timeouts and retries (with exponential backoff)
+    on connection errors and 429 / 5xx responses.
+    """
+
+    def __init__(self, base_url=WIKIPEDIA_RAW_URL, timeout=(3.05, 10),
+                 retries=3, backoff_factor=0.5, pool_size=10,
+                 max_redirects=5):
+        """
+        In:
+            base_url = URL the title is appended to, to get the raw article
+                text; point this at a local HTTP server to test
+            timeout = Seconds to wait for the server: a single number, or a
+                (connect, read) tuple
+            retries = Maximum number of retries per request
+            backoff_factor = Retries wait backoff_factor * 2 ** (retry - 1)
+                seconds
+            pool_size = Maximum number of kept-alive connections (and
+                threads used by the asyncio functions)
+            max_redirects = Maximum number of article redirects to follow
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+
+    def fetch_raw(self, title, headers=None):
+        """
+        In:
+            title = Wikipedia article title
+            headers = Dictionary of extra request headers (e.g.
+                If-None-Match)
+
+        Out:
+            status = HTTP status (200, or 304 if the article is unchanged)
+            text = Raw article text (None for 304)
+            headers = Response headers
+
+            Raises requests.HTTPError for other statuses (e.g. 404 if there
+                is no such article); usable as ArticleCache's fetch function
+        """
+        response = self.session.get(self.base_url + title, headers=headers,
+                                    timeout=self.timeout)
+        if response.status_code == 304:
+            return 304, None, response.headers
+
+        response.raise_for_status()
+        response.encoding = "UTF-8"
+        return response.status_code, response.text, response.headers
+
+    def get_text(self, title):
+        """
+        In:
+            title = Wikipedia article title
+
+        Out:
+            raw_text = Raw article text
+        """
+        return self.fetch_raw(title)[1]
+
+    def fetch_article(self, title, get_text=None):
+        """
+        In:
+            title = Wikipedia article title
+            get_text = Function taking a title and returning its raw text;
+                defaults to fetching it with this client
+
+        Out:
+            title = Title of the article reached after following redirects
+            raw_text = Raw article text
+        """
+        return follow_redirects(title, get_text or self.get_text,
+                                self.max_redirects)
+
+    async def fetch_article_async(self, title, get_text=None):
+        """
+        asyncio variant of fetch_article; the (blocking) fetch runs on the
+        client's thread pool, so the event loop isn't blocked
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.fetch_article,
+                                          title, get_text)
+
+    async def fetch_articles_async(self, titles, get_text=None):
+        """
+        In:
+            titles = List of Wikipedia article titles
+            get_text = See fetch_article
+
+        Out:
+            List of (title, raw_text) tuples (or the exception raised while
+                fetching that title), in the same order as titles; fetched
+                concurrently, up to pool_size at a time
+        """
+        return await asyncio.gather(
+            *[self.fetch_article_async(title, get_text) for title in titles],
+            return_exceptions=True)
+
+    def fetch_articles(self, titles, get_text=None):
+        """
+        Blocking variant of fetch_articles_async (same results), running
+        fetch_article on the client's thread pool directly rather than
+        through an event loop, so it also works where one is already running
+        (e.g. in a Jupyter notebook)
+        """
+        futures = [self.executor.submit(self.fetch_article, title, get_text)
+                   for title in titles]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as error:
+                results.append(error)
+
+        return results
+
+    def close(self):
+        """
+        Closes the pooled connections and thread pool
+        """
+        self.session.close()
+        self.executor.shutdown(wait=False)
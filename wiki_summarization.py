@@ -1,11 +1,24 @@
 # Import Dependencies
 
 # General
+import functools
+import os
 import pickle
-import pandas as pd
 import re
+import numpy as np
+
+# Summary formatting
+from wiki_summary_html import add_html_tages_to_summary
+from model_registry import ModelRegistry
+
+# Per-stage timings (see request_tracing.py)
+from request_tracing import timed_stage
+
+# Topic mention and sentiment features
+from text_features import get_sentiment_lexicon, SentenceFeatureCache
 
 # NLP
+import nltk
 from nltk.tokenize import LineTokenizer, sent_tokenize
 from urllib import parse
 from textblob import TextBlob
@@ -32,7 +45,22 @@ def get_sentences(article):
         article = Cleaned wikipedia article text
 
     Out:
-        sentences = List of sentences in wikipedia article
+        sentences = List of sentences in wikipedia article; same as
+            get_sentences_reference, segmented with the preloaded tokenizer
+            (see DocumentStructure)
+    """
+    return DocumentStructure(article).get_sentences()
+
+
+def get_sentences_reference(article):
+    """
+    In:
+        article = Cleaned wikipedia article text
+
+    Out:
+        sentences = List of sentences in wikipedia article, split into lines
+            and tokenized with sent_tokenize; kept as the reference
+            get_sentences must match
     """
     lines = LineTokenizer(blanklines='discard').tokenize(
         article.replace("<br>", "\n"))
@@ -42,6 +70,52 @@ def get_sentences(article):
     return sentences
 
 
+# Line breaks get_sentences_reference splits lines at: break tags, and the
+# line boundaries of str.splitlines (a carriage return before a break tag
+# becomes "\r\n", a single boundary)
+LINE_BREAK_PATTERN = re.compile(
+    "\r(?:\n|<br>)|<br>|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+@functools.lru_cache(maxsize=None)
+def get_sentence_tokenizer(language="english"):
+    """
+    In:
+        language = Punkt model language
+
+    Out:
+        Punkt sentence tokenizer sent_tokenize uses, loaded once and kept,
+            rather than looked up on every call
+    """
+    try:
+        # NLTK 3.8.2+
+        from nltk.tokenize import PunktTokenizer
+    except ImportError:
+        return nltk.data.load("tokenizers/punkt/%s.pickle" % language)
+
+    return PunktTokenizer(language)
+
+
+def get_line_spans(text, start, end):
+    """
+    In:
+        text = Cleaned wikipedia article text
+        start = Start of the part of text to split into lines
+        end = End of the part of text to split into lines
+
+    Out:
+        spans = List of (start, end) offsets in text of the lines of
+            text[start:end], split as get_sentences_reference splits them
+    """
+    spans = []
+    for line_break in LINE_BREAK_PATTERN.finditer(text, start, end):
+        spans.append((start, line_break.start()))
+        start = line_break.end()
+    spans.append((start, end))
+
+    return spans
+
+
 def merge_subsections_with_parent(sections_needing_some_merging,
                                   section_level="=="):
     """
@@ -271,6 +345,202 @@ def generate_sentence_location_data(sentences_with_structure):
     return location_data
 
 
+def get_split_spans(text, separator, start, end):
+    """
+    In:
+        text = String to split
+        separator = Separator to split on
+        start = Start of the part of text to split
+        end = End of the part of text to split
+
+    Out:
+        spans = List of (start, end) offsets in text of the pieces
+            text[start:end].split(separator) gives
+    """
+    spans = []
+    for piece in text[start:end].split(separator):
+        spans.append((start, start + len(piece)))
+        start += len(piece) + len(separator)
+
+    return spans
+
+
+def get_heading_spans(text, level, start, end):
+    """
+    In:
+        text = Cleaned wikipedia article text
+        level = Heading markup starting the spans, e.g. "==" for sections,
+            "===" for subsections
+        start = Start of the part of text to split
+        end = End of the part of text to split
+
+    Out:
+        spans = List of (start, end) offsets in text of the parts
+            text[start:end] splits into at each heading of the level, as
+            split and merge_subsections_with_parent give them (a part starts
+            at its heading, and deeper headings stay in their parent)
+    """
+    separator = "<br><br>" + level
+    spans = []
+    for i, (piece_start, piece_end) in enumerate(
+            get_split_spans(text, separator, start, end)):
+        if i == 0:
+            spans.append((piece_start, piece_end))
+        elif text.startswith("=", piece_start, piece_end):
+            # Deeper heading: stays in the previous part
+            spans[-1] = (spans[-1][0], piece_end)
+        else:
+            # The part starts at its heading markup
+            spans.append((piece_start - len(level), piece_end))
+
+    return spans
+
+
+class DocumentStructure:
+    """
+    Sections, subsections, paragraphs and sentences of an article, as flat
+    arrays: the offsets of each sentence in the article text, and the id of
+    the unit each sentence, paragraph and subsection belongs to. Holds the
+    same structure as get_sentences_with_structure, without the nested
+    lists or the copies of the text.
+
+    The article is segmented into sentences once, giving each sentence its
+    text and its position together: paragraphs are split into lines, and
+    lines into sentences, as get_sentences_reference splits them. (For
+    cleaned articles, whose paragraphs hold no line breaks, the sentences
+    per paragraph are those of get_sentences_with_structure too.)
+    """
+
+    def __init__(self, article):
+        """
+        In:
+            article = Cleaned wikipedia article text
+        """
+        self.article = article
+        tokenizer = get_sentence_tokenizer()
+
+        sentence_starts = []
+        sentence_ends = []
+        sentence_paragraphs = []
+        paragraph_subsections = []
+        subsection_sections = []
+
+        for section, (section_start, section_end) in enumerate(
+                get_heading_spans(article, "==", 0, len(article))):
+            for subsection_start, subsection_end in get_heading_spans(
+                    article, "===", section_start, section_end):
+                subsection_sections.append(section)
+
+                for paragraph_start, paragraph_end in get_split_spans(
+                        article, "<br><br>", subsection_start,
+                        subsection_end):
+                    paragraph = len(paragraph_subsections)
+                    paragraph_subsections.append(len(subsection_sections) - 1)
+
+                    for line_start, line_end in get_line_spans(
+                            article, paragraph_start, paragraph_end):
+                        for start, end in tokenizer.span_tokenize(
+                                article[line_start:line_end]):
+                            sentence_starts.append(line_start + start)
+                            sentence_ends.append(line_start + end)
+                            sentence_paragraphs.append(paragraph)
+
+        # Offsets of each sentence in the article
+        self.sentence_starts = np.array(sentence_starts, dtype=np.intp)
+        self.sentence_ends = np.array(sentence_ends, dtype=np.intp)
+        # Id (cumulative #) of the paragraph each sentence is in, the
+        # subsection each paragraph is in, and the section each subsection
+        # is in
+        self.sentence_paragraphs = np.array(sentence_paragraphs,
+                                            dtype=np.intp)
+        self.paragraph_subsections = np.array(paragraph_subsections,
+                                              dtype=np.intp)
+        self.subsection_sections = np.array(subsection_sections,
+                                            dtype=np.intp)
+
+    def get_sentences(self):
+        """
+        Out:
+            sentences = List of the sentences, in order (as
+                get_sentences_with_structure gives them, flattened)
+        """
+        return [self.article[start:end] for start, end
+                in zip(self.sentence_starts.tolist(),
+                       self.sentence_ends.tolist())]
+
+    def get_location_features(self):
+        """
+        Out:
+            features = 2D float NumPy array of each sentence's location data
+                (the 22 values following the sentence in
+                generate_sentence_location_data, in the same order), counted
+                with array operations rather than by walking the structure
+        """
+        total_s = self.subsection_sections[-1] + 1
+        total_ss = len(self.subsection_sections)
+        total_p = len(self.paragraph_subsections)
+        total_sent = len(self.sentence_paragraphs)
+
+        paragraph_sections = self.subsection_sections[
+            self.paragraph_subsections]
+        cum_p = self.sentence_paragraphs
+        cum_ss = self.paragraph_subsections[cum_p]
+        cum_s = self.subsection_sections[cum_ss]
+        cum_sent = np.arange(total_sent)
+
+        # Size and first member (cumulative #) of each unit
+        p_total_sent = np.bincount(cum_p, minlength=total_p)
+        ss_total_sent = np.bincount(cum_ss, minlength=total_ss)
+        s_total_sent = np.bincount(cum_s, minlength=total_s)
+        ss_total_p = np.bincount(self.paragraph_subsections,
+                                 minlength=total_ss)
+        s_total_p = np.bincount(paragraph_sections, minlength=total_s)
+        s_total_ss = np.bincount(self.subsection_sections, minlength=total_s)
+
+        p_first_sent = get_first_members(p_total_sent)
+        ss_first_sent = get_first_members(ss_total_sent)
+        s_first_sent = get_first_members(s_total_sent)
+        ss_first_p = get_first_members(ss_total_p)
+        s_first_p = get_first_members(s_total_p)
+        s_first_ss = get_first_members(s_total_ss)
+
+        ss = cum_ss - s_first_ss[cum_s]
+        p = cum_p - ss_first_p[cum_ss]
+        sent = cum_sent - p_first_sent[cum_p]
+        sent_in_ss = cum_sent - ss_first_sent[cum_ss]
+        p_in_s = cum_p - s_first_p[cum_s]
+        sent_in_s = cum_sent - s_first_sent[cum_s]
+
+        return np.column_stack([
+            cum_s, cum_ss, cum_p, cum_sent,
+            cum_s / total_s, cum_ss / total_ss, cum_p / total_p,
+            cum_sent / total_sent,
+
+            ss, p, sent,
+            ss / s_total_ss[cum_s], p / ss_total_p[cum_ss],
+            sent / p_total_sent[cum_p],
+
+            p_in_s, p_in_s / s_total_p[cum_s],
+            sent_in_ss, sent_in_ss / ss_total_sent[cum_ss],
+
+            sent_in_s, sent_in_s / s_total_sent[cum_s],
+
+            np.full(total_sent, total_sent),
+            self.sentence_ends - self.sentence_starts]).astype(float)
+
+
+def get_first_members(sizes):
+    """
+    In:
+        sizes = NumPy array of the number of members of each unit (e.g.
+            sentences per paragraph), units and members both in order
+
+    Out:
+        NumPy array of the cumulative # of each unit's first member
+    """
+    return np.cumsum(sizes) - sizes
+
+
 def get_topic_mentions(sentence, topic):
     """
     In:
@@ -342,6 +612,184 @@ def get_sentiment_data(sentence):
     return polarity, subjectivity
 
 
+# Sentence data columns, in the order the prediction model was trained on
+COLUMN_NAMES = ["sentence", "cum_sect", "cum_subsect", "cum_para",
+                "cum_sent", "cum_sect_%", "cum_subsect_%", "cum_para_%",
+                "cum_sent_%", "subsect_in_sect", "para_in_subsect",
+                "sent_in_para", "subsect_in_sect_%", "para_in_subsect_%",
+                "sent_in_para_%", "para_in_section", "para_in_section_%",
+                "sent_in_subsect", "sent_in_subsect_%", "sent_in_sect",
+                "sent_in_sect_%", "total_sents", "sent_len", "subheading",
+                "heading", "table", "bullet", "numbered_bullet",
+                "topic_mentions", "polarity", "subjectivity"]
+FEATURE_COLUMNS = COLUMN_NAMES[1:]
+
+# Column blocks of the feature matrix
+LOCATION_COLUMNS = slice(0, 22)
+TYPE_COLUMNS = slice(22, 27)
+TOPIC_MENTIONS_COLUMN = 27
+POLARITY_COLUMN = 28
+SUBJECTIVITY_COLUMN = 29
+SECTION_NUMBER_COLUMN = FEATURE_COLUMNS.index("cum_sect")
+PARAGRAPH_NUMBER_COLUMN = FEATURE_COLUMNS.index("cum_para")
+
+
+def get_topic_words(topic):
+    """
+    In:
+        topic = Cleaned topic of wikipedia article
+
+    Out:
+        topic_words = Lowercased words of the topic, tokenized once per article
+    """
+    return TextBlob(topic).words.lower()
+
+
+# Topic mention and sentiment features of recently scored sentences, so
+# summarizing an edited article again only scores its new or changed ones
+SENTENCE_FEATURE_CACHE_SIZE = 100000
+sentence_feature_cache = SentenceFeatureCache(SENTENCE_FEATURE_CACHE_SIZE)
+
+
+def get_sentence_text_data(sentences, topic_words):
+    """
+    In:
+        sentences = List of cleaned sentences from wikipedia article
+        topic_words = Lowercased topic words (see get_topic_words)
+
+    Out:
+        topic_mentions = NumPy array of the # of times the topic was mentioned
+            in each sentence (normalized for number of words in the topic)
+        polarity = NumPy array of each sentence's postive / negative sentiment
+        subjectivity = NumPy array of each sentence's objectivity /
+            subjectivity sentiment
+
+        Same values as get_sentence_text_data_reference, computed without
+            building a TextBlob per sentence (see text_features.py), and only
+            for sentences not in sentence_feature_cache
+    """
+    return sentence_feature_cache.get_text_features(sentences, topic_words)
+
+
+def get_sentence_text_data_reference(sentences, topic_words):
+    """
+    In:
+        sentences = List of cleaned sentences from wikipedia article
+        topic_words = Lowercased topic words (see get_topic_words)
+
+    Out:
+        topic_mentions = NumPy array of the # of times the topic was mentioned
+            in each sentence (normalized for number of words in the topic)
+        polarity = NumPy array of each sentence's postive / negative sentiment
+        subjectivity = NumPy array of each sentence's objectivity /
+            subjectivity sentiment
+
+        Same values as get_topic_mentions and get_sentiment_data, but with a
+            single TextBlob built per sentence; kept as the reference
+            get_sentence_text_data must match
+    """
+    total_sents = len(sentences)
+    topic_mentions = np.zeros(total_sents)
+    polarity = np.zeros(total_sents)
+    subjectivity = np.zeros(total_sents)
+    total_topic_words = len(topic_words)
+
+    for i, sentence in enumerate(sentences):
+        sent_text = TextBlob(sentence)
+
+        if total_topic_words:
+            word_counts = sent_text.word_counts
+            topic_mentions[i] = sum(word_counts[word]
+                                    for word in topic_words) / \
+                total_topic_words
+
+        polarity[i], subjectivity[i] = tuple(sent_text.sentiment)
+
+    return topic_mentions, polarity, subjectivity
+
+
+def get_article_structure_features(article):
+    """
+    In:
+        article = Cleaned wikipedia article
+
+    Out:
+        sentences = List of sentences in the wikipedia article
+        features = Contiguous 2D float NumPy array with one row of sentence
+            data per sentence; columns follow FEATURE_COLUMNS, with only the
+            location and sentence type columns filled in (see
+            fill_sentence_text_features for the rest)
+    """
+    with timed_stage("segment"):
+        structure = DocumentStructure(article)
+        sentences = structure.get_sentences()
+    with timed_stage("location_features"):
+        location_features = structure.get_location_features()
+
+    total_sents = len(sentences)
+    features = np.zeros((total_sents, len(FEATURE_COLUMNS)))
+    features[:, LOCATION_COLUMNS] = location_features[:total_sents]
+    with timed_stage("type_features"):
+        features[:, TYPE_COLUMNS] = np.array(
+            [get_sentence_type_data(sentence) for sentence in sentences],
+            dtype=float).reshape(total_sents, 5)
+
+    return sentences, features
+
+
+@timed_stage("text_features")
+def fill_sentence_text_features(features, sentences, topic_words, start=0,
+                                end=None):
+    """
+    In:
+        features = Feature array of the article (see
+            get_article_structure_features)
+        sentences = List of sentences in the wikipedia article
+        topic_words = Lowercased topic words (see get_topic_words)
+        start = First sentence to fill in
+        end = Sentence to stop before (None for the end of the article)
+
+    Out:
+        Fills in the topic mention and sentiment columns of the features of
+            sentences[start:end], in place; these are the slow features, so
+            callers can stop before reaching the rest of the article
+    """
+    topic_mentions, polarity, subjectivity = get_sentence_text_data(
+        sentences[start:end], topic_words)
+    features[start:end, TOPIC_MENTIONS_COLUMN] = topic_mentions
+    features[start:end, POLARITY_COLUMN] = polarity
+    features[start:end, SUBJECTIVITY_COLUMN] = subjectivity
+
+
+def get_article_topic_words(topic):
+    """
+    In:
+        topic = Topic of wikipedia article, formatted for the API / url
+
+    Out:
+        topic_words = Lowercased topic words (see get_topic_words)
+    """
+    return get_topic_words(parse.unquote(topic.replace("_", " ")))
+
+
+def get_article_features(article, topic):
+    """
+    In:
+        article = Cleaned wikipedia article
+        topic = Topic of wikipedia article
+
+    Out:
+        sentences = List of sentences in the wikipedia article
+        features = Contiguous 2D float NumPy array with one row of sentence
+            data per sentence; columns follow FEATURE_COLUMNS
+    """
+    sentences, features = get_article_structure_features(article)
+    fill_sentence_text_features(features, sentences,
+                                get_article_topic_words(topic))
+
+    return sentences, features
+
+
 def convert_article_to_data(article, topic, return_dataframe=True):
     """
     In:
@@ -355,47 +803,135 @@ def convert_article_to_data(article, topic, return_dataframe=True):
             OR
         List of lists of sentence data for the wikipedia article
     """
-    sentences = get_sentences(article)
-    topic = parse.unquote(topic.replace("_", " "))
+    sentences, features = get_article_features(article, topic)
 
-    sentences_with_structure = get_sentences_with_structure(article)
-    sentence_location_data = generate_sentence_location_data(
-        sentences_with_structure)
+    if return_dataframe:
+        # Only needed here, so importing the module doesn't pay for it
+        import pandas as pd
 
-    article_data_list = []
-    for sentence, location_data \
-            in zip(sentences, sentence_location_data):
+        df = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+        df.insert(0, "sentence", sentences)
+        return df
+    else:
+        return [[sentence] + data_row for sentence, data_row
+                in zip(sentences, features.tolist())]
 
-        sentence_type_data = get_sentence_type_data(sentence)
-        topic_mentions = get_topic_mentions(sentence, topic)
-        sentiment_data = get_sentiment_data(sentence)
 
-        data_row = [sentence] + location_data[1:] + list(sentence_type_data) +\
-            [topic_mentions] + list(sentiment_data)
-        article_data_list.append(data_row)
+"""Register Summarization Model (loaded on first use)"""
+MODEL_FILENAME = "prediction_model.pkl"
+SUMMARY_MODEL = "summary"
+model_registry = ModelRegistry()
+model_registry.register(SUMMARY_MODEL, MODEL_FILENAME)
+
+# Compiled copy of the model (see compiled_forest.py), faster on a single
+# article's sentences
+COMPILED_MODEL_FILENAME = "prediction_model.joblib"
+COMPILED_SUMMARY_MODEL = "compiled summary"
+if os.path.exists(COMPILED_MODEL_FILENAME):
+    model_registry.register(COMPILED_SUMMARY_MODEL, COMPILED_MODEL_FILENAME)
+
+# Past this many sentences per predict, the summarization model is faster
+# than the compiled one. Measured with benchmarks/benchmark_forest_inference.py
+# on a forest predicting with n_jobs=None (one thread, as the Modeling
+# notebook trains it): the compiled forest is about 6x faster at 10
+# sentences, 1.2-1.4x at 300 and 0.7x at 1000. A model set to predict on
+# more threads (n_jobs) breaks even at fewer sentences
+COMPILED_MODEL_MAX_ROWS = 300
+
+
+def get_model():
+    """
+    Out:
+        model = Summarization model, loaded the first time it is asked for
+    """
+    return model_registry.get(SUMMARY_MODEL)["model"]
+
+
+class ArticleModel:
+    """
+    Classifier of a single article's sentences, predicting with the compiled
+    model for up to COMPILED_MODEL_MAX_ROWS sentences at a time (where it is
+    faster) and with the summarization model for more; both predict the
+    same.
+    """
+
+    def __init__(self, compiled_model, model):
+        """
+        In:
+            compiled_model = Compiled copy of the model (see
+                compiled_forest.py)
+            model = Summarization model
+        """
+        self.compiled_model = compiled_model
+        self.model = model
+        self.classes_ = model.classes_
+
+    def choose(self, X):
+        """
+        In:
+            X = 2D array of sentence features
+
+        Out:
+            The faster of the two models for that many sentences
+        """
+        if len(X) <= COMPILED_MODEL_MAX_ROWS:
+            return self.compiled_model
+        return self.model
+
+    def predict(self, X):
+        return self.choose(X).predict(X)
+
+    def predict_proba(self, X):
+        return self.choose(X).predict_proba(X)
+
+
+def get_article_model():
+    """
+    Out:
+        model = Model for classifying a single article's sentences: an
+            ArticleModel if the compiled model has been exported from the
+            current model file, otherwise the summarization model
+    """
+    if COMPILED_SUMMARY_MODEL in model_registry.artifacts:
+        model_pack = model_registry.get(COMPILED_SUMMARY_MODEL)
+        if model_pack.get("source_version") == get_model_version():
+            return ArticleModel(model_pack["model"], get_model())
+
+    return get_model()
 
-    if return_dataframe:
-        column_names = ["sentence", "cum_sect", "cum_subsect", "cum_para",
-                        "cum_sent", "cum_sect_%", "cum_subsect_%",
-                        "cum_para_%", "cum_sent_%", "subsect_in_sect",
-                        "para_in_subsect", "sent_in_para", "subsect_in_sect_%",
-                        "para_in_subsect_%", "sent_in_para_%",
-                        "para_in_section", "para_in_section_%",
-                        "sent_in_subsect", "sent_in_subsect_%", "sent_in_sect",
-                        "sent_in_sect_%", "total_sents", "sent_len",
-                        "subheading", "heading", "table", "bullet",
-                        "numbered_bullet", "topic_mentions", "polarity",
-                        "subjectivity"]
-        return pd.DataFrame(article_data_list, columns=column_names)
-    else:
-        return article_data_list
 
+def get_model_version():
+    """
+    Out:
+        Version of the summarization model; changes whenever the model file
+            does, invalidating cached summaries
+    """
+    return model_registry.get_version(SUMMARY_MODEL)
+
+
+def preload():
+    """
+    Out:
+        Loads the models, sentence tokenizer and sentiment lexicon now rather
+            than on the first summary (e.g. in a pre-fork server's master
+            process, so every worker shares them; see gunicorn_config.py)
+    """
+    model_registry.preload()
+    get_sentence_tokenizer()
+    get_sentiment_lexicon()
 
-"""Load Summarization Model"""
-model_pack = load_pickle("prediction_model.pkl")
-model = model_pack["model"]
 
+def get_startup_timings():
+    """
+    Out:
+        Dictionary of the model registry's load timings (the time importing
+            this module takes is measured by its importer; see
+            benchmarks/benchmark_startup.py)
+    """
+    return {"models": model_registry.stats()}
 
+
+@timed_stage("build_summary")
 def build_summary(sentences, paragraph_numbers, included_predictions):
     """
     In:
@@ -429,98 +965,291 @@ def build_summary(sentences, paragraph_numbers, included_predictions):
     return summary
 
 
-def add_html_tages_to_summary(summary):
-    """
-    In:
-        summary = Summary string for article with Wiki markdown
-
-    Out:
-        summary = Summary string for article with Wiki markdown replaced by
-            HTML tags
-    """
-    # Bold tags
-    while re.search(r"\'\'\'.*?\'\'\'", summary):
-        instance = re.search(r"\'\'\'.*?\'\'\'", summary).group()
-        summary = summary.replace(instance, "<b>" + instance[3:-3] + "</b>")
-
-    # Italic tags
-    while re.search(r"\'\'.*?\'\'", summary):
-        instance = re.search(r"\'\'.*?\'\'", summary).group()
-        summary = summary.replace(instance, "<i>" + instance[2:-2] + "</i>")
-
-    # Italic heading tags
-    while re.search(r"\=\=\=\=.*?\=\=\=\=", summary):
-        instance = re.search(r"\=\=\=\=.*?\=\=\=\=", summary).group()
-        summary = summary.replace(instance, "<i>" + instance[4:-4] + "</i>")
-
-    # Bold and italic heading tags
-    while re.search(r"\=\=\=.*?\=\=\=", summary):
-        instance = re.search(r"\=\=\=.*?\=\=\=", summary).group()
-        summary = summary.replace(instance, "<b><i>" + instance[3:-3] +
-                                  "</i></b>")
-
-    # Bold heading tags
-    while re.search(r"\=\=.*?\=\=", summary):
-        instance = re.search(r"\=\=.*?\=\=", summary).group()
-        summary = summary.replace(instance, "<b>" + instance[2:-2] +
-                                  "</b>")
-
-    # Clean up any extra spaces
-    summary = summary.replace("<b> ", "<b>")
-    summary = summary.replace("<i> ", "<i>")
-    summary = summary.replace(" </b>", "</b>")
-    summary = summary.replace(" </i>", "</i>")
-
-    # Unordered list tags
-    while re.search(r"\*.*?(?:\<br\>\<br\>|$)", summary):
-        instance = re.search(r"\*.*?(?:\<br\>\<br\>|$)", summary).group()
-        summary = summary.replace(instance, "<ul><li>" + instance[1:] +
-                                  "</li></ul>")
-
-    # Ordered list tags
-    while re.search(r"\#.*?(?:\<br\>\<br\>|$)", summary):
-        instance = re.search(r"\#.*?(?:\<br\>\<br\>|$)", summary).group()
-        summary = summary.replace(instance, "<ol><li>" + instance[1:] +
-                                  "</li></ol>")
-
-    # Clean up extra unordered list tags
-    if re.search(r"\<ul\>.*\<\/ul\>", summary):
-        instance = re.search(r"\<ul\>.*\<\/ul\>", summary).group()
-        new_instance = instance[4:-5].replace("<ul>", "")
-        new_instance = new_instance.replace("</ul>", "")
-        new_instance = new_instance.replace("<br>", "")
-        summary = summary.replace(instance, "<ul>" + new_instance + "</ul>")
-
-    # Clean up extra ordered list tags
-    if re.search(r"\<ol\>.*\<\/ol\>", summary):
-        instance = re.search(r"\<ol\>.*\<\/ol\>", summary).group()
-        new_instance = instance[4:-5].replace("<ol>", "")
-        new_instance = new_instance.replace("</ol>", "")
-        new_instance = new_instance.replace("<br>", "")
-        summary = summary.replace(instance, "<ol>" + new_instance + "</ol>")
+def summarize_article(article, topic):
+    """
+    In:
+        article = Cleaned wikipedia article to summarize
+        topic = Topic of wikipedia article to summarize
+
+    Out:
+        summary = Summary string for article
+    """
+    sentences, X = get_article_features(article, topic)
+    paragraph_numbers = X[:, PARAGRAPH_NUMBER_COLUMN]
+
+    with timed_stage("predict"):
+        predictions = get_article_model().predict(X)
+
+    summary = build_summary(sentences, paragraph_numbers, predictions)
+    summary = add_html_tages_to_summary(summary)
 
     return summary
 
 
-def summarize_article(article, topic):
+def get_section_bounds(features):
+    """
+    In:
+        features = Feature array of an article (see
+            get_article_structure_features)
+
+    Out:
+        List of (start, end) sentence index ranges, one per section of the
+            article, in order
+    """
+    section_starts = np.flatnonzero(
+        np.diff(features[:, SECTION_NUMBER_COLUMN], prepend=-1))
+    section_ends = np.append(section_starts[1:], len(features))
+    return list(zip(section_starts.tolist(), section_ends.tolist()))
+
+
+def summarize_article_by_section(article, topic):
     """
     In:
         article = Cleaned wikipedia article to summarize
         topic = Topic of wikipedia article to summarize
 
     Out:
-        summary = Summary string for article
+        Generator of the summary (with Wiki markdown) of each section with
+            included sentences, in order, yielded as soon as the section is
+            classified. Joined, they are the summary summarize_article gives
+            before its HTML tags are added. The sentences, and the location
+            features needing whole-article totals, come from a cheap first
+            pass; the slow text features are computed section by section
     """
-    df = convert_article_to_data(article, topic)
+    sentences, X = get_article_structure_features(article)
+    topic_words = get_article_topic_words(topic)
+    model = get_article_model()
+
+    summarized = False
+    for start, end in get_section_bounds(X):
+        fill_sentence_text_features(X, sentences, topic_words, start, end)
+        with timed_stage("predict"):
+            predictions = model.predict(X[start:end])
+
+        summary = build_summary(sentences[start:end],
+                                X[start:end, PARAGRAPH_NUMBER_COLUMN],
+                                predictions)
+        if summary:
+            # Sections start new paragraphs, as in build_summary
+            if summarized:
+                summary = "<br><br>" + summary
+            summarized = True
+            yield summary
+
+
+@timed_stage("predict")
+def get_inclusion_probabilities(model, X):
+    """
+    In:
+        model = Sentence classifier (e.g. from get_article_model)
+        X = 2D array of sentence features (see get_article_features)
 
-    sentences = df["sentence"]
-    paragraph_numbers = df["cum_para"]
+    Out:
+        NumPy array of each sentence's predicted probability of being
+            included in the summary (class 1)
+    """
+    proba = model.predict_proba(X)
+    return proba[:, list(model.classes_).index(1)]
 
-    X = df.drop(["sentence"], axis=1)
 
-    predictions = model.predict(X)
+def get_ranked_sentences(scores, count):
+    """
+    In:
+        scores = NumPy array of sentence scores
+        count = Number of sentences to rank
 
-    summary = build_summary(sentences, paragraph_numbers, predictions)
+    Out:
+        NumPy array of the indices of the count highest scoring sentences,
+            highest first (earlier sentences first among equal scores),
+            found by partial selection rather than sorting every sentence
+    """
+    if count >= len(scores):
+        top = np.arange(len(scores))
+    elif count <= 0:
+        top = np.arange(0)
+    else:
+        # Every sentence scoring above the count-th highest score, then the
+        # earliest of those tied with it
+        kth_score = -np.partition(-scores, count - 1)[count - 1]
+        above = np.flatnonzero(scores > kth_score)
+        tied = np.flatnonzero(scores == kth_score)[:count - len(above)]
+        top = np.concatenate([above, tied])
+
+    return top[np.lexsort((top, -scores[top]))]
+
+
+@timed_stage("select")
+def select_summary_sentences(scores, lengths, max_sentences=None,
+                             max_characters=None):
+    """
+    In:
+        scores = NumPy array of each sentence's inclusion probability (see
+            get_inclusion_probabilities)
+        lengths = NumPy array of each sentence's length in characters
+        max_sentences = Most sentences to select (None for no limit)
+        max_characters = Most characters the selected sentences may add up
+            to (None for no limit)
+
+    Out:
+        selected = Sorted NumPy array of the indices of the selected
+            sentences: the highest scoring sentences, skipping any that
+            would overflow max_characters
+    """
+    total_sents = len(scores)
+    if max_sentences is None or max_sentences > total_sents:
+        max_sentences = total_sents
+    if max_characters is None:
+        return np.sort(get_ranked_sentences(scores, max_sentences))
+
+    selected = []
+    characters = 0
+    shortest = lengths.min() if total_sents else 0
+
+    # Only rank as many sentences as could plausibly fit, ranking more (each
+    # time twice as many) if those run out before the budget does
+    ranked_count = 0
+    count = min(total_sents,
+                max(max_sentences,
+                    2 * max_characters // max(1, int(lengths.mean()))))
+    while (ranked_count < total_sents and len(selected) < max_sentences
+           and max_characters - characters >= shortest):
+        ranked = get_ranked_sentences(scores, count)
+        for i in ranked[ranked_count:]:
+            if characters + lengths[i] <= max_characters:
+                selected.append(i)
+                characters += lengths[i]
+                if len(selected) == max_sentences:
+                    break
+        ranked_count = count
+        count = min(total_sents, 2 * count)
+
+    return np.sort(np.array(selected, dtype=np.intp))
+
+
+def select_leading_sentences(model, sentences, features, topic_words,
+                             max_sentences=None, max_characters=None):
+    """
+    In:
+        model = Sentence classifier (e.g. from get_article_model)
+        sentences = List of sentences in the wikipedia article
+        features = Feature array of the article, with only the structure
+            columns filled in (see get_article_structure_features)
+        topic_words = Lowercased topic words (see get_topic_words)
+        max_sentences = Most sentences to select (None for no limit)
+        max_characters = Most characters the selected sentences may add up
+            to (None for no limit)
+
+    Out:
+        selected = List of the indices of the sentences the model includes,
+            in article order, up to the first one that would exceed the
+            budget. Sections are classified one at a time, so the text
+            features of the sections after the budget fills are never
+            computed
+    """
+    selected = []
+    characters = 0
+    if max_sentences is None:
+        max_sentences = len(sentences)
+    if max_characters is None:
+        max_characters = float("inf")
+
+    for start, end in get_section_bounds(features):
+        fill_sentence_text_features(features, sentences, topic_words, start,
+                                    end)
+        with timed_stage("predict"):
+            included = model.predict(features[start:end]) == 1
+
+        for i in start + np.flatnonzero(included):
+            if len(selected) == max_sentences or \
+                    characters + len(sentences[i]) > max_characters:
+                return selected
+            selected.append(i)
+            characters += len(sentences[i])
+
+    return selected
+
+
+def summarize_article_within_budget(article, topic, max_sentences=None,
+                                    max_characters=None, early_exit=False):
+    """
+    In:
+        article = Cleaned wikipedia article to summarize
+        topic = Topic of wikipedia article to summarize
+        max_sentences = Most sentences in the summary (None for no limit)
+        max_characters = Most sentence characters in the summary (None for
+            no limit)
+        early_exit = Whether to fill the budget from the leading sections
+            (see select_leading_sentences), skipping the features of the
+            rest of the article, rather than with the article's highest
+            scoring sentences (see select_summary_sentences)
+
+    Out:
+        summary = Summary string for article, its sentences kept in article
+            order
+    """
+    sentences, X = get_article_structure_features(article)
+    topic_words = get_article_topic_words(topic)
+    model = get_article_model()
+
+    if not sentences:
+        selected = []
+    elif early_exit:
+        selected = select_leading_sentences(model, sentences, X, topic_words,
+                                            max_sentences, max_characters)
+    else:
+        fill_sentence_text_features(X, sentences, topic_words)
+        lengths = np.array([len(sentence) for sentence in sentences])
+        selected = select_summary_sentences(
+            get_inclusion_probabilities(model, X), lengths, max_sentences,
+            max_characters)
+
+    included = np.zeros(len(sentences), dtype=int)
+    included[selected] = 1
+
+    summary = build_summary(sentences, X[:, PARAGRAPH_NUMBER_COLUMN],
+                            included)
     summary = add_html_tages_to_summary(summary)
 
     return summary
+
+
+def summarize_articles(articles, topics):
+    """
+    In:
+        articles = List of cleaned wikipedia articles to summarize
+        topics = List of topics of the wikipedia articles
+
+    Out:
+        summaries = List of summary strings, one per article
+    """
+    return summarize_article_features(
+        [get_article_features(article, topic)
+         for article, topic in zip(articles, topics)])
+
+
+def summarize_article_features(article_features):
+    """
+    In:
+        article_features = List of (sentences, features) tuples, one per
+            article (see get_article_features)
+
+    Out:
+        summaries = List of summary strings, one per article; the sentences
+            of all the articles are classified with a single model.predict
+            call
+    """
+    X = np.vstack([features for sentences, features in article_features])
+    with timed_stage("batch_predict"):
+        predictions = get_model().predict(X)
+
+    summaries = []
+    start = 0
+    for sentences, features in article_features:
+        end = start + len(sentences)
+        summary = build_summary(sentences,
+                                features[:, PARAGRAPH_NUMBER_COLUMN],
+                                predictions[start:end])
+        summaries.append(add_html_tages_to_summary(summary))
+        start = end
+
+    return summaries
@@ -0,0 +1,370 @@
+import re
+
+from request_tracing import timed_stage
+
+
+# Compiled patterns
+BOLD_PATTERN = re.compile(r"\'\'\'.*?\'\'\'")
+ITALIC_PATTERN = re.compile(r"\'\'.*?\'\'")
+ITALIC_HEADING_PATTERN = re.compile(r"\=\=\=\=.*?\=\=\=\=")
+BOLD_ITALIC_HEADING_PATTERN = re.compile(r"\=\=\=.*?\=\=\=")
+BOLD_HEADING_PATTERN = re.compile(r"\=\=.*?\=\=")
+UNORDERED_LIST_PATTERN = re.compile(r"\*.*?(?:\<br\>\<br\>|$)")
+ORDERED_LIST_PATTERN = re.compile(r"\#.*?(?:\<br\>\<br\>|$)")
+MERGE_UNORDERED_LIST_PATTERN = re.compile(r"\<ul\>.*\<\/ul\>")
+MERGE_ORDERED_LIST_PATTERN = re.compile(r"\<ol\>.*\<\/ol\>")
+
+# Spans, in the order they are replaced:
+#     (pattern, wiki markup delimiter, opening HTML tag, closing HTML tag)
+SPAN_TAGS = [
+    (BOLD_PATTERN, "'''", "<b>", "</b>"),
+    (ITALIC_PATTERN, "''", "<i>", "</i>"),
+    (ITALIC_HEADING_PATTERN, "====", "<i>", "</i>"),
+    (BOLD_ITALIC_HEADING_PATTERN, "===", "<b><i>", "</i></b>"),
+    (BOLD_HEADING_PATTERN, "==", "<b>", "</b>"),
+]
+
+
+# Main function
+@timed_stage("html")
+def add_html_tages_to_summary(summary):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+
+    Out:
+        summary = Summary string for article with Wiki markdown replaced by
+            HTML tags; same output as add_html_tages_to_summary_reference, but
+            each kind of markup is converted in a single pass over the summary
+    """
+    for pattern, delimiter, open_tag, close_tag in SPAN_TAGS:
+        summary = add_span_tags(summary, pattern, delimiter, open_tag,
+                                close_tag)
+
+    # Clean up any extra spaces
+    summary = summary.replace("<b> ", "<b>")
+    summary = summary.replace("<i> ", "<i>")
+    summary = summary.replace(" </b>", "</b>")
+    summary = summary.replace(" </i>", "</i>")
+
+    summary = add_list_tags(summary, UNORDERED_LIST_PATTERN, "*", "ul")
+    summary = add_list_tags(summary, ORDERED_LIST_PATTERN, "#", "ol")
+
+    summary = merge_list_tags(summary, MERGE_UNORDERED_LIST_PATTERN, "ul")
+    summary = merge_list_tags(summary, MERGE_ORDERED_LIST_PATTERN, "ol")
+
+    return summary
+
+
+# Sub-functions
+def add_span_tags(summary, pattern, delimiter, open_tag, close_tag):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+        pattern = Compiled regex matching one span, e.g. "'''...'''"
+        delimiter = Wiki markup around the span, e.g. "'''"
+        open_tag = HTML tag to open the span with, e.g. "<b>"
+        close_tag = HTML tag to close the span with, e.g. "</b>"
+
+    Out:
+        summary = Summary string with every span wrapped in the HTML tags
+
+        The original loop repeatedly replaced every copy of the leftmost span
+        in the whole summary. That gives the same result as replacing the
+        spans left to right, unless a copy of one span starts inside another
+        span; in that (rare) case the original loop is used instead.
+    """
+    spans = [match.span() for match in pattern.finditer(summary)]
+    if not spans:
+        return summary
+
+    if spans_overlap_copies(summary, pattern, delimiter, open_tag, spans):
+        return add_span_tags_iteratively(summary, pattern, delimiter,
+                                         open_tag, close_tag)
+
+    width = len(delimiter)
+    new_summary = []
+    position = 0
+    for start, end in spans:
+        new_summary.append(summary[position:start])
+        new_summary.append(open_tag)
+        new_summary.append(summary[start + width:end - width])
+        new_summary.append(close_tag)
+        position = end
+    new_summary.append(summary[position:])
+
+    return "".join(new_summary)
+
+
+def spans_overlap_copies(summary, pattern, delimiter, open_tag, spans):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+        pattern = Compiled regex matching one span
+        delimiter = Wiki markup around the span
+        open_tag = HTML tag the spans will be opened with
+        spans = List of (start, end) positions of the spans found left to
+            right
+
+    Out:
+        True if the spans can't be replaced left to right with the same
+            result as add_span_tags_iteratively, i.e. if a copy of one span
+            starts inside another span, or a span contains the opening tag
+            (so replacing one span could create a new copy of another)
+    """
+    instances = set(summary[start:end] for start, end in spans)
+
+    for start, end in spans:
+        if open_tag in summary[start:end]:
+            return True
+
+        # Delimiters starting anywhere after the span's start and before its
+        # end, including ones running past the end
+        search_end = end + len(delimiter) - 1
+        inner_start = summary.find(delimiter, start + 1, search_end)
+        while inner_start != -1:
+            inner_match = pattern.match(summary, inner_start)
+            if inner_match and inner_match.group() in instances:
+                return True
+            inner_start = summary.find(delimiter, inner_start + 1, search_end)
+
+    return False
+
+
+def add_span_tags_iteratively(summary, pattern, delimiter, open_tag,
+                              close_tag):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+        pattern = Compiled regex matching one span
+        delimiter = Wiki markup around the span
+        open_tag = HTML tag to open the span with
+        close_tag = HTML tag to close the span with
+
+    Out:
+        summary = Summary string with every span wrapped in the HTML tags,
+            replacing every copy of the leftmost span until none are left (as
+            the original loop did)
+    """
+    width = len(delimiter)
+    match = pattern.search(summary)
+    while match:
+        instance = match.group()
+        summary = summary.replace(instance, open_tag +
+                                  instance[width:-width] + close_tag)
+        match = pattern.search(summary)
+
+    return summary
+
+
+def add_list_tags(summary, pattern, marker, list_tag):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+        pattern = Compiled regex matching one list item, from its marker to
+            the end of its paragraph
+        marker = Wiki markup starting a list item ("*" or "#")
+        list_tag = HTML list tag ("ul" or "ol")
+
+    Out:
+        summary = Summary string with list items wrapped in list tags
+
+        Each marker opens a list item running to the end of its paragraph
+            (the next "<br><br>", or the end of the summary). Items opened by
+            later markers in the same paragraph are nested in the first and
+            all closed together, as the original loop did. Markers with a
+            newline before their paragraph ends are left as they are, unless
+            they start a copy of the list item running to the end of the
+            summary, which the original loop replaced too; in that (rare)
+            case the original loop is used instead.
+    """
+    open_tags = "<%s><li>" % list_tag
+    close_tags = "</li></%s>" % list_tag
+
+    # "$" also matches before a final newline
+    summary_end = len(summary)
+    if summary.endswith("\n"):
+        summary_end -= 1
+
+    new_summary = []
+    position = 0
+    items_open = 0
+    items_start = 0
+    items_end = 0
+    skipped_markers = []
+    paragraph_break = summary.find("<br><br>")
+    newline = summary.find("\n")
+
+    marker_start = summary.find(marker)
+    while marker_start != -1:
+        if items_open and marker_start >= items_end:
+            new_summary.append(summary[position:items_end])
+            new_summary.append(close_tags * items_open)
+            position = items_end
+            items_open = 0
+
+        if items_open:
+            new_summary.append(summary[position:marker_start])
+            new_summary.append(open_tags)
+            items_open += 1
+            position = marker_start + 1
+        else:
+            # Move on to the first paragraph break / newline after the marker
+            if 0 <= paragraph_break <= marker_start:
+                paragraph_break = summary.find("<br><br>", marker_start + 1)
+            if 0 <= newline <= marker_start:
+                newline = summary.find("\n", marker_start + 1)
+
+            if paragraph_break != -1:
+                item_text_end = paragraph_break
+                item_end = paragraph_break + len("<br><br>")
+            else:
+                item_text_end = summary_end
+                item_end = summary_end
+
+            if newline == -1 or newline >= item_text_end:
+                new_summary.append(summary[position:marker_start])
+                new_summary.append(open_tags)
+                items_open = 1
+                items_start = marker_start
+                items_end = item_end
+                position = marker_start + 1
+            else:
+                skipped_markers.append(marker_start)
+
+        marker_start = summary.find(marker, marker_start + 1)
+
+    if items_open and items_end == summary_end and skipped_markers:
+        last_item = summary[items_start:summary_end]
+        if close_tags in summary or any(
+                summary.startswith(last_item, skipped_marker)
+                for skipped_marker in skipped_markers):
+            return add_list_tags_iteratively(summary, pattern, list_tag)
+
+    if items_open:
+        new_summary.append(summary[position:items_end])
+        new_summary.append(close_tags * items_open)
+        position = items_end
+    new_summary.append(summary[position:])
+
+    return "".join(new_summary)
+
+
+def add_list_tags_iteratively(summary, pattern, list_tag):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+        pattern = Compiled regex matching one list item
+        list_tag = HTML list tag ("ul" or "ol")
+
+    Out:
+        summary = Summary string with list items wrapped in list tags,
+            replacing every copy of the leftmost list item until none are left
+            (as the original loop did)
+    """
+    match = pattern.search(summary)
+    while match:
+        instance = match.group()
+        summary = summary.replace(instance, "<%s><li>" % list_tag +
+                                  instance[1:] + "</li></%s>" % list_tag)
+        match = pattern.search(summary)
+
+    return summary
+
+
+def merge_list_tags(summary, pattern, list_tag):
+    """
+    In:
+        summary = Summary string for article with list tags
+        pattern = Compiled regex matching everything from the first opening
+            list tag to the last closing list tag
+        list_tag = HTML list tag ("ul" or "ol")
+
+    Out:
+        summary = Summary string with the list items merged into a single
+            list, with extra list tags and line breaks removed
+    """
+    match = pattern.search(summary)
+    if match:
+        instance = match.group()
+        new_instance = instance[4:-5].replace("<%s>" % list_tag, "")
+        new_instance = new_instance.replace("</%s>" % list_tag, "")
+        new_instance = new_instance.replace("<br>", "")
+        summary = summary.replace(instance, "<%s>" % list_tag +
+                                  new_instance + "</%s>" % list_tag)
+
+    return summary
+
+
+def add_html_tages_to_summary_reference(summary):
+    """
+    In:
+        summary = Summary string for article with Wiki markdown
+
+    Out:
+        summary = Summary string for article with Wiki markdown replaced by
+            HTML tags, produced with the original search-and-replace loops;
+            kept as the reference add_html_tages_to_summary must match
+    """
+    # Bold tags
+    while re.search(r"\'\'\'.*?\'\'\'", summary):
+        instance = re.search(r"\'\'\'.*?\'\'\'", summary).group()
+        summary = summary.replace(instance, "<b>" + instance[3:-3] + "</b>")
+
+    # Italic tags
+    while re.search(r"\'\'.*?\'\'", summary):
+        instance = re.search(r"\'\'.*?\'\'", summary).group()
+        summary = summary.replace(instance, "<i>" + instance[2:-2] + "</i>")
+
+    # Italic heading tags
+    while re.search(r"\=\=\=\=.*?\=\=\=\=", summary):
+        instance = re.search(r"\=\=\=\=.*?\=\=\=\=", summary).group()
+        summary = summary.replace(instance, "<i>" + instance[4:-4] + "</i>")
+
+    # Bold and italic heading tags
+    while re.search(r"\=\=\=.*?\=\=\=", summary):
+        instance = re.search(r"\=\=\=.*?\=\=\=", summary).group()
+        summary = summary.replace(instance, "<b><i>" + instance[3:-3] +
+                                  "</i></b>")
+
+    # Bold heading tags
+    while re.search(r"\=\=.*?\=\=", summary):
+        instance = re.search(r"\=\=.*?\=\=", summary).group()
+        summary = summary.replace(instance, "<b>" + instance[2:-2] +
+                                  "</b>")
+
+    # Clean up any extra spaces
+    summary = summary.replace("<b> ", "<b>")
+    summary = summary.replace("<i> ", "<i>")
+    summary = summary.replace(" </b>", "</b>")
+    summary = summary.replace(" </i>", "</i>")
+
+    # Unordered list tags
+    while re.search(r"\*.*?(?:\<br\>\<br\>|$)", summary):
+        instance = re.search(r"\*.*?(?:\<br\>\<br\>|$)", summary).group()
+        summary = summary.replace(instance, "<ul><li>" + instance[1:] +
+                                  "</li></ul>")
+
+    # Ordered list tags
+    while re.search(r"\#.*?(?:\<br\>\<br\>|$)", summary):
+        instance = re.search(r"\#.*?(?:\<br\>\<br\>|$)", summary).group()
+        summary = summary.replace(instance, "<ol><li>" + instance[1:] +
+                                  "</li></ol>")
+
+    # Clean up extra unordered list tags
+    if re.search(r"\<ul\>.*\<\/ul\>", summary):
+        instance = re.search(r"\<ul\>.*\<\/ul\>", summary).group()
+        new_instance = instance[4:-5].replace("<ul>", "")
+        new_instance = new_instance.replace("</ul>", "")
+        new_instance = new_instance.replace("<br>", "")
+        summary = summary.replace(instance, "<ul>" + new_instance + "</ul>")
+
+    # Clean up extra ordered list tags
+    if re.search(r"\<ol\>.*\<\/ol\>", summary):
+        instance = re.search(r"\<ol\>.*\<\/ol\>", summary).group()
+        new_instance = instance[4:-5].replace("<ol>", "")
+        new_instance = new_instance.replace("</ol>", "")
+        new_instance = new_instance.replace("<br>", "")
+        summary = summary.replace(instance, "<ol>" + new_instance + "</ol>")
+
+    return summary
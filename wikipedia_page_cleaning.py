@@ -1,7 +1,29 @@
 import re
 
+from request_tracing import timed_stage
+
+
+# Compiled patterns
+# Scanners match the second character of each opening / closing pair, so
+# overlapping pairs (e.g. "{{{") are all found, as in the original passes
+DOUBLE_CURLY_SCANNER = re.compile(r"(?<=\{)\{|(?<=\})\}")
+DOUBLE_SQUARE_SCANNER = re.compile(r"(?<=\[)\[|(?<=\])\]")
+WIKI_TABLE_SCANNER = re.compile(r"(?<=\{)\||(?<=\|)\}")
+
+TABLE_STYLE_PATTERN = re.compile(r"style.*?\|")
+REF_LINK_PATTERN = re.compile(r"\<ref.*?\<\/ref\>")
+SELF_CLOSING_REF_PATTERN = re.compile(r"\<ref.*?\/\>")
+SUPER_SCRIPT_PATTERN = re.compile(r"\<sup.*?\<\/sup\>")
+GALLERY_PATTERN = re.compile(r"\<gallery.*?\<\/gallery\>")
+HTML_COMMENT_PATTERN = re.compile(r"\<\!\-\-.*?\-\-\>")
+DIV_PATTERN = re.compile(r"\<div.*?\<\/div\>")
+
+SQUARE_CONTENTS_TO_REMOVE = ("File:", "file:", "Image:", "image:",
+                             "Category:", "category:")
+
 
 # Main function
+@timed_stage("clean")
 def clean_wiki_page(text):
     """
     In:
@@ -10,6 +32,35 @@ def clean_wiki_page(text):
     Out:
         text = Cleaned wikipedia article text
     """
+    with timed_stage("clean_templates"):
+        text = scan_double_curly(text)
+    with timed_stage("clean_links"):
+        text = scan_double_square(text)
+    with timed_stage("clean_tables"):
+        text = scan_wiki_tables(text)
+    with timed_stage("clean_markup"):
+        text = newline_to_br(text)
+        text = remove_ref_links(text)
+        text = remove_super_script(text)
+        text = remove_reference_and_more_sections(text)
+        text = remove_gallery(text)
+        text = remove_html_comments(text)
+        text = remove_divs(text)
+        text = regularize_newline_spacing(text)
+
+    return text
+
+
+def clean_wiki_page_reference(text):
+    """
+    In:
+        text = Raw wikipedia article text
+
+    Out:
+        text = Cleaned wikipedia article text, produced with the original
+            character-by-character passes; kept as the reference
+            implementation clean_wiki_page must match exactly
+    """
     text = remove_double_curly(text)
     text = parse_double_square(text)
     text = clean_wiki_tables(text)
@@ -75,17 +126,8 @@ def parse_double_square(text):
         elif last == "]" and char == "]" and squares_opened > 0:
             squares_opened -= 1
             if squares_opened == 0:
-                if square_contents[:5] == "File:" or \
-                   square_contents[:5] == "file:" or \
-                   square_contents[:6] == "Image:" or \
-                   square_contents[:6] == "image:" or \
-                   square_contents[:9] == "Category:" or \
-                   square_contents[:9] == "category:":
-                    square_contents = ""
-                else:
-                    square_contents = square_contents.split("|")[-1]
-                    new_text += square_contents[:-1]
-                    square_contents = ""
+                new_text += parse_square_contents(square_contents)
+                square_contents = ""
         elif squares_opened == 0:
             if char == "[" and text[i+1] == "[":
                 pass
@@ -123,26 +165,7 @@ def clean_wiki_tables(text):
         elif last == "|" and char == "}" and tables_opened > 0:
             tables_opened -= 1
             if tables_opened == 0:
-                table_contents = table_contents.split("\n")[1:]
-                table_contents = "\n".join(table_contents)
-                table_contents = table_contents.replace("\n", "")
-                table_contents = re.sub(r"style.*?\|", "|", table_contents)
-                table_contents = table_contents.replace("<br/>", " ")
-                table_contents = table_contents.replace("<br>", " ")
-                table_contents = table_contents.replace("!!", "||")
-                table_contents = table_contents.replace("! ", "")
-                table_contents = table_contents.replace("|-|", "||\n||")
-                table_contents = table_contents.replace("|-", "||")
-                table_contents = table_contents.replace("|- |", "||\n||")
-                table_contents = table_contents.replace("|+ |", "||")
-                table_contents = table_contents.replace(" |", "\n|")
-                table_contents = table_contents.replace("|", "||")
-                table_contents = table_contents.replace("\n", "")
-                table_contents = table_contents.replace("||||||||", "||\n||")
-                table_contents = table_contents.replace("||||||", "||\n||")
-                table_contents = table_contents.replace("||||", "||")
-                table_contents = table_contents.replace("|||", "||")
-                new_text += "TABLE:\n" + table_contents + "\n"
+                new_text += format_table_contents(table_contents)
                 table_contents = ""
         elif tables_opened == 0:
             if char == "{" and text[i+1] == "|":
@@ -157,6 +180,153 @@ def clean_wiki_tables(text):
     return new_text
 
 
+def parse_square_contents(square_contents):
+    """
+    In:
+        square_contents = Contents of a "[[...]]" link, including the first
+            of its two closing "]" characters
+
+    Out:
+        Text to keep in place of the link: "" for file, image, and category
+            links, otherwise the link's display text
+    """
+    if square_contents.startswith(SQUARE_CONTENTS_TO_REMOVE):
+        return ""
+    return square_contents.split("|")[-1][:-1]
+
+
+def format_table_contents(table_contents):
+    """
+    In:
+        table_contents = Contents of a "{|...|}" wiki table
+
+    Out:
+        table_contents = Table contents reformatted to have a consistent
+            format, prefixed by a "TABLE:" line
+    """
+    table_contents = table_contents.split("\n")[1:]
+    table_contents = "\n".join(table_contents)
+    table_contents = table_contents.replace("\n", "")
+    table_contents = TABLE_STYLE_PATTERN.sub("|", table_contents)
+    table_contents = table_contents.replace("<br/>", " ")
+    table_contents = table_contents.replace("<br>", " ")
+    table_contents = table_contents.replace("!!", "||")
+    table_contents = table_contents.replace("! ", "")
+    table_contents = table_contents.replace("|-|", "||\n||")
+    table_contents = table_contents.replace("|-", "||")
+    table_contents = table_contents.replace("|- |", "||\n||")
+    table_contents = table_contents.replace("|+ |", "||")
+    table_contents = table_contents.replace(" |", "\n|")
+    table_contents = table_contents.replace("|", "||")
+    table_contents = table_contents.replace("\n", "")
+    table_contents = table_contents.replace("||||||||", "||\n||")
+    table_contents = table_contents.replace("||||||", "||\n||")
+    table_contents = table_contents.replace("||||", "||")
+    table_contents = table_contents.replace("|||", "||")
+    return "TABLE:\n" + table_contents + "\n"
+
+
+# Single-pass scanners
+def scan_paired_markup(text, scanner, opener, on_close=None):
+    """
+    In:
+        text = Raw wikipedia article text
+        scanner = Compiled regex matching the second character of every
+            opening and closing pair (e.g. "{{" and "}}"), overlaps included
+        opener = First character of the opening pair (e.g. "{")
+        on_close = Function called with the contents of each outermost pair
+            once it closes, returning the text to keep in its place; if None,
+            pairs and their contents are dropped
+
+    Out:
+        new_text = Wikipedia article text with the paired markup replaced;
+            identical to the output of the character-by-character passes
+            (remove_double_curly, parse_double_square, clean_wiki_tables),
+            but only visits the pair positions found by the scanner and
+            copies the text in between as whole slices
+    """
+    new_text = []
+    contents = []
+    depth = 0
+    position = 0
+
+    for match in scanner.finditer(text):
+        i = match.start()
+        opening = text[i - 1] == opener
+
+        if depth == 0:
+            if opening:
+                # Drop the first character of the opening pair
+                new_text.append(text[position:i - 1])
+                depth = 1
+            else:
+                # Closing pair with nothing open is kept as plain text
+                new_text.append(text[position:i + 1])
+        else:
+            if on_close is not None:
+                contents.append(text[position:i])
+            if opening:
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0 and on_close is not None:
+                    new_text.append(on_close("".join(contents)))
+                    contents = []
+
+        position = i + 1
+
+    if depth == 0:
+        tail = text[position:]
+        if tail.endswith(opener):
+            # The character-by-character passes look one character past an
+            # unpaired opener at the very end of the text
+            raise IndexError("string index out of range")
+        new_text.append(tail)
+
+    return "".join(new_text)
+
+
+def scan_double_curly(text):
+    """
+    In:
+        text = Raw wikipedia article text
+
+    Out:
+        Wikipedia article text with all instances of "{{", "}}", and their
+            contents removed; same output as remove_double_curly
+    """
+    return scan_paired_markup(text, DOUBLE_CURLY_SCANNER, "{")
+
+
+def scan_double_square(text):
+    """
+    In:
+        text = Raw wikipedia article text
+
+    Out:
+        Wikipedia article text with all instances of "[[", "]]" parsed to keep
+            only desired word(s); same output as parse_double_square
+    """
+    new_text = scan_paired_markup(text, DOUBLE_SQUARE_SCANNER, "[",
+                                  parse_square_contents)
+
+    # Clean up "floating" / leftover square brackets (from instances of "]]]]")
+    return new_text.replace("\n]", "\n")
+
+
+def scan_wiki_tables(text):
+    """
+    In:
+        text = Raw wikipedia article text
+
+    Out:
+        Wikipedia article text with tables reformatted to have a consistent
+            format; same output as clean_wiki_tables
+    """
+    return scan_paired_markup(text, WIKI_TABLE_SCANNER, "{",
+                              format_table_contents)
+
+
 def remove_reference_and_more_sections(text):
     """
     In:
@@ -223,8 +393,8 @@ def remove_ref_links(text):
     Out:
         text = Wikipedia article text with ref tags ("<ref>...</ref>") removed
     """
-    text = re.sub(r"\<ref.*?\<\/ref\>", "", text)
-    text = re.sub(r"\<ref.*?\/\>", "", text)
+    text = REF_LINK_PATTERN.sub("", text)
+    text = SELF_CLOSING_REF_PATTERN.sub("", text)
     return text
 
 
@@ -236,7 +406,7 @@ def remove_super_script(text):
     Out:
         text = Wikipedia article text with sup tags ("<sup>...</sup>") removed
     """
-    return re.sub(r"\<sup.*?\<\/sup\>", "", text)
+    return SUPER_SCRIPT_PATTERN.sub("", text)
 
 
 def remove_gallery(text):
@@ -248,7 +418,7 @@ def remove_gallery(text):
         text = Wikipedia article text with gallery tags ("<gallery>...
             </gallery>") removed
     """
-    return re.sub(r"\<gallery.*?\<\/gallery\>", "", text)
+    return GALLERY_PATTERN.sub("", text)
 
 
 def remove_html_comments(text):
@@ -259,7 +429,7 @@ def remove_html_comments(text):
     Out:
         text = Wikipedia article text with html comments ("<!--...-->") removed
     """
-    return re.sub(r"\<\!\-\-.*?\-\-\>", "", text)
+    return HTML_COMMENT_PATTERN.sub("", text)
 
 
 def remove_divs(text):
@@ -270,7 +440,7 @@ def remove_divs(text):
     Out:
         text = Wikipedia article text with div tags ("<div>...</div>") removed
     """
-    return re.sub(r"\<div.*?\<\/div\>", "", text)
+    return DIV_PATTERN.sub("", text)
 
 
 def regularize_newline_spacing(text):